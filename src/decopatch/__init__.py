@@ -1,25 +1,89 @@
-from decopatch.utils_modes import DECORATED, WRAPPED, F_ARGS, F_KWARGS, InvalidSignatureError
-from decopatch.utils_disambiguation import FirstArgDisambiguation, with_parenthesis, no_parenthesis, is_decorator_call
-from decopatch.utils_calls import AmbiguousFirstArgumentTypeError, InvalidMandatoryArgError
+import sys
 
-from decopatch.main import function_decorator, class_decorator, decorator
+# The public symbols and submodules are only imported when they are first accessed (PEP 562), so that
+# `import decopatch` is almost free. See `__init__.pyi` for type checkers.
+_LAZY_SYMBOLS = {
+    'DECORATED': 'utils_modes', 'WRAPPED': 'utils_modes', 'F_ARGS': 'utils_modes', 'F_KWARGS': 'utils_modes',
+    'F_ITEM': 'utils_modes', 'F_BOUND': 'utils_modes', 'F_ARG': 'utils_modes', 'F_SELF': 'utils_modes',
+    'InvalidSignatureError': 'utils_modes',
+    'FirstArgDisambiguation': 'utils_disambiguation', 'with_parenthesis': 'utils_disambiguation',
+    'no_parenthesis': 'utils_disambiguation', 'is_decorator_call': 'utils_disambiguation',
+    'AmbiguousFirstArgumentTypeError': 'utils_calls', 'InvalidMandatoryArgError': 'utils_calls',
+    'InvalidParenthesisUsageError': 'utils_calls', 'ALWAYS_PARENTHESIS': 'utils_calls',
+    'NEVER_PARENTHESIS': 'utils_calls',
+    'set_default_codegen_engine': 'utils_codegen',
+    'set_code_cache_dir': 'utils_diskcache', 'warmup': 'utils_lazy',
+    'install_import_hook': 'utils_importhook', 'uninstall_import_hook': 'utils_importhook',
+    'function_decorator': 'main', 'class_decorator': 'main', 'decorator': 'main',
+}
 
-try:
-    # -- Distribution mode: import from _version.py generated by setuptools_scm during release
-    from ._version import version as __version__
-except ImportError:
-    # -- Source mode: use setuptools_scm to get the current version from src using git
-    from setuptools_scm import get_version as _gv
-    from os import path as _path
-    __version__ = _gv(_path.join(_path.dirname(__file__), _path.pardir))
+_SUBMODULES = ('main', 'utils_disambiguation', 'utils_modes', 'utils_calls', 'utils_codegen', 'utils_lazy',
+               'utils_introspection', 'utils_importhook', 'utils_aot', 'utils_diskcache')
 
 __all__ = [
     '__version__',
     # submodules
-    'main', 'utils_disambiguation', 'utils_modes', 'utils_calls',
+    'main', 'utils_disambiguation', 'utils_modes', 'utils_calls', 'utils_codegen', 'utils_lazy',
+    'utils_introspection', 'utils_importhook', 'utils_aot', 'utils_diskcache',
     # symbols
-    'DECORATED', 'WRAPPED', 'F_ARGS', 'F_KWARGS', 'InvalidSignatureError',
+    'DECORATED', 'WRAPPED', 'F_ARGS', 'F_KWARGS', 'F_ITEM', 'F_BOUND', 'F_ARG', 'F_SELF', 'InvalidSignatureError',
     'FirstArgDisambiguation', 'with_parenthesis', 'no_parenthesis',
-    'AmbiguousFirstArgumentTypeError', 'InvalidMandatoryArgError',
-    'function_decorator', 'class_decorator', 'decorator', 'is_decorator_call'
+    'AmbiguousFirstArgumentTypeError', 'InvalidMandatoryArgError', 'InvalidParenthesisUsageError',
+    'ALWAYS_PARENTHESIS', 'NEVER_PARENTHESIS',
+    'function_decorator', 'class_decorator', 'decorator', 'is_decorator_call',
+    'set_default_codegen_engine', 'set_code_cache_dir', 'install_import_hook', 'uninstall_import_hook', 'warmup'
 ]
+
+
+def _get_version():
+    """
+    Returns the version of decopatch, without importing setuptools_scm: from _version.py generated by setuptools_scm
+    during release, or from the installed distribution metadata.
+    """
+    try:
+        from ._version import version
+        return version
+    except ImportError:
+        pass
+    try:  # python 3.8+
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return 'unknown'
+    try:
+        return version('decopatch')
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+def _import_submodule(name):
+    """Imports and returns the submodule `name`"""
+    module_name = 'decopatch.' + name
+    __import__(module_name)
+    return sys.modules[module_name]
+
+
+def _load(name):
+    """Imports the public symbol or submodule `name`, and stores it in the package namespace"""
+    try:
+        value = getattr(_import_submodule(_LAZY_SYMBOLS[name]), name)
+    except KeyError:
+        if name == '__version__':
+            value = _get_version()
+        elif name in _SUBMODULES:
+            value = _import_submodule(name)
+        else:
+            raise AttributeError("module 'decopatch' has no attribute %r" % name)
+    globals()[name] = value
+    return value
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        return _load(name)
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+else:
+    for _name in __all__:
+        _load(_name)
+    del _name
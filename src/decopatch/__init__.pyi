@@ -0,0 +1,39 @@
+from decopatch import main as main
+from decopatch import utils_aot as utils_aot
+from decopatch import utils_calls as utils_calls
+from decopatch import utils_codegen as utils_codegen
+from decopatch import utils_disambiguation as utils_disambiguation
+from decopatch import utils_diskcache as utils_diskcache
+from decopatch import utils_importhook as utils_importhook
+from decopatch import utils_introspection as utils_introspection
+from decopatch import utils_lazy as utils_lazy
+from decopatch import utils_modes as utils_modes
+from decopatch.main import class_decorator as class_decorator
+from decopatch.main import decorator as decorator
+from decopatch.main import function_decorator as function_decorator
+from decopatch.utils_calls import ALWAYS_PARENTHESIS as ALWAYS_PARENTHESIS
+from decopatch.utils_calls import NEVER_PARENTHESIS as NEVER_PARENTHESIS
+from decopatch.utils_calls import AmbiguousFirstArgumentTypeError as AmbiguousFirstArgumentTypeError
+from decopatch.utils_calls import InvalidMandatoryArgError as InvalidMandatoryArgError
+from decopatch.utils_calls import InvalidParenthesisUsageError as InvalidParenthesisUsageError
+from decopatch.utils_codegen import set_default_codegen_engine as set_default_codegen_engine
+from decopatch.utils_disambiguation import FirstArgDisambiguation as FirstArgDisambiguation
+from decopatch.utils_disambiguation import is_decorator_call as is_decorator_call
+from decopatch.utils_disambiguation import no_parenthesis as no_parenthesis
+from decopatch.utils_disambiguation import with_parenthesis as with_parenthesis
+from decopatch.utils_diskcache import set_code_cache_dir as set_code_cache_dir
+from decopatch.utils_importhook import install_import_hook as install_import_hook
+from decopatch.utils_importhook import uninstall_import_hook as uninstall_import_hook
+from decopatch.utils_lazy import warmup as warmup
+from decopatch.utils_modes import DECORATED as DECORATED
+from decopatch.utils_modes import F_ARG as F_ARG
+from decopatch.utils_modes import F_ARGS as F_ARGS
+from decopatch.utils_modes import F_BOUND as F_BOUND
+from decopatch.utils_modes import F_ITEM as F_ITEM
+from decopatch.utils_modes import F_KWARGS as F_KWARGS
+from decopatch.utils_modes import F_SELF as F_SELF
+from decopatch.utils_modes import WRAPPED as WRAPPED
+from decopatch.utils_modes import InvalidSignatureError as InvalidSignatureError
+
+__version__: str
+__all__: list[str]
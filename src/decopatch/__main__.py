@@ -0,0 +1,37 @@
+"""
+Command line interface of decopatch:
+
+    python -m decopatch compile <package> [-o <output>]
+
+See `decopatch.utils_aot.compile_package`.
+"""
+import argparse
+import sys
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m decopatch")
+    subparsers = parser.add_subparsers(dest='command')
+    compile_parser = subparsers.add_parser('compile', help="compile ahead of time the decorators and wrappers created "
+                                                           "when a package is imported, into a companion module")
+    compile_parser.add_argument('package', help="the name of the top-level package to import")
+    compile_parser.add_argument('-o', '--output', default=None,
+                                help="the path of the companion module. Default: <package dir>/_decopatch_compiled.py")
+    options = parser.parse_args(args)
+
+    if options.command != 'compile':
+        parser.print_help()
+        return 2
+
+    from decopatch.utils_aot import compile_package
+    try:
+        path, nb_sources = compile_package(options.package, options.output)
+    except (ImportError, ValueError) as e:
+        sys.stderr.write("error: %s\n" % e)
+        return 1
+    print("Wrote %s function(s) generated by decopatch to %s" % (nb_sources, path))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
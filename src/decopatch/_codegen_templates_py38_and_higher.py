@@ -0,0 +1,33 @@
+# Templates used by the 'templates' code generation engine, see `decopatch.utils_codegen.get_template_code`.
+# Their code objects are adapted to each signature with `CodeType.replace`: the received arguments become their first
+# local variables, so their body should only use local variables with names reserved by decopatch. It only sends the
+# `locals()` dictionary (the received arguments) to the implementation.
+
+
+def function_template():
+    return _decopatch_impl_(_decopatch_locals_())  # noqa: F821
+
+
+async def coroutine_template():
+    return await _decopatch_impl_(_decopatch_locals_())  # noqa: F821
+
+
+def generator_template():
+    return (yield from _decopatch_impl_(_decopatch_locals_()))  # noqa: F821
+
+
+async def async_generator_template():
+    async for _decopatch_item_ in _decopatch_impl_(_decopatch_locals_()):  # noqa: F821
+        yield _decopatch_item_
+
+
+async def iterate_async_items(items, impl, impl_args, impl_kwargs, item_name, await_result):
+    """
+    Helper of the 'templates' engine for `F_ITEM` on asynchronous generators: calls `impl` on each item of the
+    asynchronous iterable `items`, injected in `impl_kwargs` as `item_name`, and yields the result (awaited if
+    `await_result` is True). `impl_kwargs` should be created for each call.
+    """
+    async for item in items:
+        impl_kwargs[item_name] = item
+        res = impl(*impl_args, **impl_kwargs)
+        yield (await res) if await_result else res
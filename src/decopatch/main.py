@@ -1,23 +1,37 @@
-from makefun import with_signature, add_signature_parameters
+from makefun import add_signature_parameters
+from decopatch.utils_codegen import with_signature, get_codegen_engine, TEMPLATES_ENGINE
+from decopatch.utils_aot import load_compiled_code
 from decopatch.utils_modes import SignatureInfo, make_decorator_spec
-from decopatch.utils_disambiguation import create_single_arg_callable_or_class_disambiguator, disambiguate_call, \
-    DecoratorUsageInfo, can_arg_be_a_decorator_target
-from decopatch.utils_calls import with_parenthesis_usage, no_parenthesis_usage, call_in_appropriate_mode
+from decopatch.utils_disambiguation import create_single_arg_callable_or_class_disambiguator, \
+    DecoratorUsageInfo, can_arg_be_a_decorator_target, are_other_args_default, FirstArgDisambiguation, is_function_like
+from decopatch.utils_calls import with_parenthesis_usage, no_parenthesis_usage, call_in_appropriate_mode, \
+    make_interning_impl, APPLIERS_CACHE_MAXSIZE, InvalidParenthesisUsageError, ALWAYS_PARENTHESIS, NEVER_PARENTHESIS
+from decopatch.utils_lazy import create_lazy_decorator
 
 try:  # python 3.3+
     from inspect import signature, Parameter
 except ImportError:
     from funcsigs import signature, Parameter
 
+from functools import partial
+from inspect import isclass
+
 try:  # python 3.5+
-    from typing import Callable, Any, Optional
+    from typing import Callable, Any, Optional, Union, Mapping
+    _CustomDisambiguatorT = Union[Callable[[Any], FirstArgDisambiguation], Mapping]
 except ImportError:
     pass
 
 
 def function_decorator(enable_stack_introspection=False,  # type: bool
-                       custom_disambiguator=None,         # type: Callable[[Any], FirstArgDisambiguation]
+                       custom_disambiguator=None,         # type: _CustomDisambiguatorT
                        flat_mode_decorated_name=None,     # type: Optional[str]
+                       codegen_engine=None,               # type: Optional[str]
+                       preserve_signature=True,           # type: bool
+                       lazy=False,                        # type: bool
+                       lazy_wrapping=False,               # type: bool
+                       intern_appliers=False,             # type: Union[bool, int]
+                       usage=None,                        # type: Optional[str]
                        ):
     """
     A decorator to create function decorators.
@@ -28,6 +42,12 @@ def function_decorator(enable_stack_introspection=False,  # type: bool
     :param enable_stack_introspection:
     :param custom_disambiguator:
     :param flat_mode_decorated_name:
+    :param codegen_engine:
+    :param preserve_signature:
+    :param lazy:
+    :param lazy_wrapping:
+    :param intern_appliers:
+    :param usage:
     :return:
     """
     if callable(enable_stack_introspection):
@@ -40,12 +60,24 @@ def function_decorator(enable_stack_introspection=False,  # type: bool
                          is_class_decorator=False,
                          enable_stack_introspection=enable_stack_introspection,
                          custom_disambiguator=custom_disambiguator,
-                         flat_mode_decorated_name=flat_mode_decorated_name)
+                         flat_mode_decorated_name=flat_mode_decorated_name,
+                         codegen_engine=codegen_engine,
+                         preserve_signature=preserve_signature,
+                         lazy=lazy,
+                         lazy_wrapping=lazy_wrapping,
+                         intern_appliers=intern_appliers,
+                         usage=usage)
 
 
 def class_decorator(enable_stack_introspection=False,  # type: bool
-                    custom_disambiguator=None,         # type: Callable[[Any], FirstArgDisambiguation]
+                    custom_disambiguator=None,         # type: _CustomDisambiguatorT
                     flat_mode_decorated_name=None,     # type: Optional[str]
+                    codegen_engine=None,               # type: Optional[str]
+                    preserve_signature=True,           # type: bool
+                    lazy=False,                        # type: bool
+                    lazy_wrapping=False,               # type: bool
+                    intern_appliers=False,             # type: Union[bool, int]
+                    usage=None,                        # type: Optional[str]
                     ):
     """
     A decorator to create class decorators
@@ -56,6 +88,12 @@ def class_decorator(enable_stack_introspection=False,  # type: bool
     :param enable_stack_introspection:
     :param custom_disambiguator:
     :param flat_mode_decorated_name:
+    :param codegen_engine:
+    :param preserve_signature:
+    :param lazy:
+    :param lazy_wrapping:
+    :param intern_appliers:
+    :param usage:
     :return:
     """
     if callable(enable_stack_introspection):
@@ -68,15 +106,27 @@ def class_decorator(enable_stack_introspection=False,  # type: bool
                          is_class_decorator=True,
                          enable_stack_introspection=enable_stack_introspection,
                          custom_disambiguator=custom_disambiguator,
-                         flat_mode_decorated_name=flat_mode_decorated_name)
+                         flat_mode_decorated_name=flat_mode_decorated_name,
+                         codegen_engine=codegen_engine,
+                         preserve_signature=preserve_signature,
+                         lazy=lazy,
+                         lazy_wrapping=lazy_wrapping,
+                         intern_appliers=intern_appliers,
+                         usage=usage)
 
 
 def decorator(is_function_decorator=True,  # type: bool
               is_class_decorator=True,  # type: bool
               enable_stack_introspection=False,  # type: bool
-              custom_disambiguator=None,  # type: Callable[[Any], FirstArgDisambiguation]
+              custom_disambiguator=None,  # type: _CustomDisambiguatorT
               use_signature_trick=True,  # type: bool
               flat_mode_decorated_name=None,  # type: str
+              codegen_engine=None,  # type: str
+              preserve_signature=True,  # type: bool
+              lazy=False,  # type: bool
+              lazy_wrapping=False,  # type: bool
+              intern_appliers=False,  # type: Union[bool, int]
+              usage=None,  # type: Optional[str]
               ):
     """
     A decorator to create decorators.
@@ -128,12 +178,46 @@ def decorator(is_function_decorator=True,  # type: bool
     :param is_function_decorator:
     :param is_class_decorator:
     :param enable_stack_introspection:
-    :param custom_disambiguator:
+    :param custom_disambiguator: a function returning a `FirstArgDisambiguation` for an ambiguous first argument, or a
+        mapping from types or ABCs to `FirstArgDisambiguation` values (or to such functions). Mappings are resolved
+        according to the MRO and cached per type, see `utils_disambiguation.create_type_dispatch_disambiguator`.
     :param use_signature_trick: if set to `True`, generated decorators will have a generic signature but the `help`
         and `signature` modules will still think that they have the specific signature, because by default they
         follow the `__wrapped__` attribute if it is set. See
         https://docs.python.org/3/library/inspect.html#inspect.signature for details.
     :param flat_mode_decorated_name:
+    :param codegen_engine: the code generation engine used to create the decorator and the signature-preserving
+        wrappers. `'compile'` (default) generates source code and compiles it, while `'templates'` (python 3.8+)
+        adapts precompiled code objects and never calls `compile` nor `exec`: this makes decorator creation and
+        application faster, at the price of a slightly slower call. If None, the default engine set with
+        `decopatch.set_default_codegen_engine` is used.
+    :param preserve_signature: only used in double-flat mode. If set to `False`, the created wrappers will have a
+        generic `(*args, **kwargs)` signature, as with `functools.wraps`, instead of the exact signature of the
+        decorated function. They are cheaper to create and to call, and the arguments are validated only once, by the
+        decorated function. `help()` and `signature()` still report the decorated function's signature thanks to
+        `__wrapped__`.
+    :param lazy: if set to `True`, a cheap stub function is returned instead of the decorator. The decorator is only
+        created (signature analysis and code generation) when it is used for the first time. This reduces the import
+        time of modules defining many decorators, when only some of them are used. `help()` and `signature()` still
+        report the decorator's signature, that is also computed lazily. This can not be used together with
+        `enable_stack_introspection`.
+    :param lazy_wrapping: only used in double-flat mode. If set to `True`, applying the decorator only creates a
+        minimal trampoline function. The signature-preserving wrapper is created when the decorated function is called
+        for the first time, and then replaces the code of the trampoline. This reduces import time when many decorated
+        functions are never called. Note that in this case, errors related to the decorated function's signature (for
+        example an `F_ARG` with an unknown name) are only raised when it is first called.
+    :param intern_appliers: if set to `True` (or to a maximum cache size), the applier returned when the decorator is
+        used with arguments is interned: when the decorator is used again with the same hashable arguments, for example
+        `@my_deco(level=3)` on many functions, the same applier is reused and the decorator implementation is not
+        called again. This should only be used if the appliers returned by your implementation can be applied several
+        times, which is always the case in flat and double-flat modes. See `utils_calls.make_interning_impl`.
+    :param usage: if set to `ALWAYS_PARENTHESIS` (`'always_parenthesis'`) or `NEVER_PARENTHESIS`
+        (`'never_parenthesis'`), the decorator can only be used in this form, for example `@my_deco(...)` or
+        `@my_deco`. No disambiguation is performed at all, so that each usage is as cheap as possible. Misuses raise an
+        `InvalidParenthesisUsageError`. Note that in `ALWAYS_PARENTHESIS` mode, a single positional argument that is a
+        callable or a class is considered as a misuse (`@my_deco` without parenthesis): it has to be passed as a
+        keyword argument. `NEVER_PARENTHESIS` requires all arguments of the decorator to be optional. Neither can be
+        used together with `enable_stack_introspection` or `custom_disambiguator`.
     :return:
     """
 
@@ -143,14 +227,37 @@ def decorator(is_function_decorator=True,  # type: bool
         return create_decorator(f)
     else:
         # called with argument. Return a decorator function
+        if lazy and enable_stack_introspection:
+            raise ValueError("`lazy=True` can not be used together with `enable_stack_introspection=True`")
+
         def _apply_on(f):
+            if lazy:
+                # the engine is fixed when the decorator is defined, not when it is created
+                engine = get_codegen_engine(codegen_engine)
+                return create_lazy_decorator(partial(create_decorator, f,
+                                                     is_function_decorator=is_function_decorator,
+                                                     is_class_decorator=is_class_decorator,
+                                                     custom_disambiguator=custom_disambiguator,
+                                                     flat_mode_decorated_name=flat_mode_decorated_name,
+                                                     use_signature_trick=use_signature_trick,
+                                                     codegen_engine=engine,
+                                                     preserve_signature=preserve_signature,
+                                                     lazy_wrapping=lazy_wrapping,
+                                                     intern_appliers=intern_appliers,
+                                                     usage=usage), f, engine=engine)
+
             return create_decorator(f,
                                     is_function_decorator=is_function_decorator,
                                     is_class_decorator=is_class_decorator,
                                     enable_stack_introspection=enable_stack_introspection,
                                     custom_disambiguator=custom_disambiguator,
                                     flat_mode_decorated_name=flat_mode_decorated_name,
-                                    use_signature_trick=use_signature_trick)
+                                    use_signature_trick=use_signature_trick,
+                                    codegen_engine=codegen_engine,
+                                    preserve_signature=preserve_signature,
+                                    lazy_wrapping=lazy_wrapping,
+                                    intern_appliers=intern_appliers,
+                                    usage=usage)
         return _apply_on
 
 
@@ -158,9 +265,14 @@ def create_decorator(impl_function,
                      is_function_decorator=True,  # type: bool
                      is_class_decorator=True,  # type: bool
                      enable_stack_introspection=False,  # type: bool
-                     custom_disambiguator=None,  # type: Callable[[Any], FirstArgDisambiguation]
+                     custom_disambiguator=None,  # type: _CustomDisambiguatorT
                      use_signature_trick=True,  # type: bool
                      flat_mode_decorated_name=None,  # type: Optional[str]
+                     codegen_engine=None,  # type: Optional[str]
+                     preserve_signature=True,  # type: bool
+                     lazy_wrapping=False,  # type: bool
+                     intern_appliers=False,  # type: Union[bool, int]
+                     usage=None,  # type: Optional[str]
                      ):
     """
     Main function to create a decorator implemented with the `decorator_function` implementation.
@@ -172,17 +284,48 @@ def create_decorator(impl_function,
     :param custom_disambiguator:
     :param use_signature_trick:
     :param flat_mode_decorated_name:
+    :param codegen_engine:
+    :param preserve_signature:
+    :param lazy_wrapping:
+    :param intern_appliers:
+    :param usage:
     :return:
     """
     # input checks
     if not is_function_decorator and not is_class_decorator:
         raise ValueError("At least one of `is_function_decorator` and `is_class_decorator` must be True")
+    if usage is not None:
+        if usage not in (ALWAYS_PARENTHESIS, NEVER_PARENTHESIS):
+            raise ValueError("Invalid `usage`: %r. Supported values are None, %r and %r"
+                             "" % (usage, ALWAYS_PARENTHESIS, NEVER_PARENTHESIS))
+        if enable_stack_introspection or custom_disambiguator is not None:
+            raise ValueError("`usage=%r` can not be used together with `enable_stack_introspection` or "
+                             "`custom_disambiguator` since it does not perform any disambiguation" % usage)
+
+    # the engine is fixed when the decorator is created
+    codegen_engine = get_codegen_engine(codegen_engine)
+    if codegen_engine != TEMPLATES_ENGINE:
+        # use the code compiled ahead of time for this package, if any
+        load_compiled_code(getattr(impl_function, '__module__', None))
 
     # (1) --- Detect mode and prepare signature to generate --------
-    sig_info, f_for_metadata, nested_impl_function = make_decorator_spec(impl_function, flat_mode_decorated_name)
+    sig_info, f_for_metadata, nested_impl_function = make_decorator_spec(impl_function, flat_mode_decorated_name,
+                                                                         codegen_engine=codegen_engine,
+                                                                         preserve_signature=preserve_signature,
+                                                                         lazy_wrapping=lazy_wrapping)
     sig_info.use_signature_trick = use_signature_trick
+    if intern_appliers:
+        maxsize = APPLIERS_CACHE_MAXSIZE if intern_appliers is True else intern_appliers
+        nested_impl_function = make_interning_impl(nested_impl_function, maxsize)
 
     # (2) --- Generate according to the situation--------
+    if usage is not None:
+        # (0) strict usage: no disambiguation at all
+        return create_strict_decorator(sig_info, nested_impl_function, usage,
+                                       function_for_metadata=f_for_metadata, codegen_engine=codegen_engine,
+                                       is_function_decorator=is_function_decorator,
+                                       is_class_decorator=is_class_decorator)
+
     # check if the resulting function has any parameter at all
     if len(sig_info.exposed_signature.parameters) == 0:
         # (A) no argument at all. Special handling.
@@ -204,11 +347,93 @@ def create_decorator(impl_function,
             # in this case the decorator *can* be used without arguments but *cannot* with one positional argument,
             # which will happen in the no-parenthesis case. We have to modify the signature to allow no-parenthesis
             return create_kwonly_decorator(sig_info, nested_impl_function, disambiguator,
-                                           function_for_metadata=f_for_metadata)
+                                           function_for_metadata=f_for_metadata, codegen_engine=codegen_engine)
 
         # general case
         return create_general_case_decorator(sig_info, nested_impl_function, disambiguator,
-                                             function_for_metadata=f_for_metadata)
+                                             function_for_metadata=f_for_metadata, codegen_engine=codegen_engine)
+
+
+def create_strict_decorator(sig_info,  # type: SignatureInfo
+                            impl_function,
+                            usage,  # type: str
+                            function_for_metadata,
+                            codegen_engine=None,  # type: str
+                            is_function_decorator=True,  # type: bool
+                            is_class_decorator=True,  # type: bool
+                            ):
+    """
+    Utility method to create a decorator that can only be used in the form specified by `usage`, without any
+    disambiguation.
+
+     - with `ALWAYS_PARENTHESIS`, all calls are with-parenthesis calls, except if the decorator receives a single
+       positional argument that can be a decorator target: this is the no-parenthesis misuse.
+     - with `NEVER_PARENTHESIS`, the decorator has to receive exactly one positional argument, the decorated object. It
+       has to be a class if `is_class_decorator`, or a function-like object if `is_function_decorator`.
+
+    In both cases the created decorator has a generic `(*args, **kwargs)` signature.
+
+    :param sig_info:
+    :param impl_function:
+    :param usage:
+    :param function_for_metadata: an alternate function to use for the documentation and module metadata of the
+        generated function
+    :param codegen_engine:
+    :param is_function_decorator:
+    :param is_class_decorator:
+    :return:
+    """
+    func_name = function_for_metadata.__name__
+
+    if usage == ALWAYS_PARENTHESIS:
+        def new_decorator(*args, **kwargs):
+            """
+            Code for your decorator, generated by decopatch to handle the case when it is called without parenthesis
+            """
+            if len(args) == 1 and not kwargs and can_arg_be_a_decorator_target(args[0]):
+                raise InvalidParenthesisUsageError("Decorator '%s' can only be used with parenthesis: @%s(...). If you "
+                                                   "wish to pass a callable or a class as first argument, please pass "
+                                                   "it as a keyword argument." % (func_name, func_name))
+            return impl_function(*args, **kwargs)
+    else:
+        mandatory = [p.name for p in sig_info.exposed_signature.parameters.values() if p.default is Parameter.empty
+                     and p.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)]
+        if mandatory:
+            raise ValueError("Decorator '%s' can not be created with `usage=%r` since it has mandatory arguments: %s"
+                             "" % (func_name, usage, mandatory))
+
+        target_kinds = ' or '.join(kind for kind, ok in (('function', is_function_decorator),
+                                                         ('class', is_class_decorator)) if ok)
+
+        def new_decorator(*args, **kwargs):
+            """
+            Code for your decorator, generated by decopatch to handle the case when it is called without parenthesis
+            """
+            if len(args) != 1 or kwargs:
+                raise InvalidParenthesisUsageError("Decorator '%s' can only be used without parenthesis nor arguments:"
+                                                   " @%s" % (func_name, func_name))
+            target = args[0]
+            if isclass(target):
+                is_valid_target = is_class_decorator
+            else:
+                is_valid_target = is_function_decorator and is_function_like(target)
+            if not is_valid_target:
+                raise InvalidParenthesisUsageError("Decorator '%s' can only be used without parenthesis nor arguments:"
+                                                   " @%s. It received %r, which is not a %s it can decorate"
+                                                   "" % (func_name, func_name, target, target_kinds))
+            return impl_function()(target)
+
+    new_decorator = with_signature(None,
+                                   func_name=func_name,
+                                   doc=function_for_metadata.__doc__,
+                                   module_name=function_for_metadata.__module__,
+                                   engine=codegen_engine)(new_decorator)
+
+    if usage == ALWAYS_PARENTHESIS:
+        # help() and signature() report the signature of the decorator arguments
+        new_decorator.__wrapped__ = impl_function
+
+    return new_decorator
 
 
 def create_no_args_decorator(decorator_function,
@@ -264,6 +489,7 @@ def create_kwonly_decorator(sig_info,  # type: SignatureInfo
                             decorator_function,
                             disambiguator,
                             function_for_metadata,
+                            codegen_engine=None,  # type: str
                             ):
     """
     Utility method to create a decorator that has only keyword arguments and is implemented by `decorator_function`, in
@@ -287,6 +513,7 @@ def create_kwonly_decorator(sig_info,  # type: SignatureInfo
     :param decorator_function:
     :param function_for_metadata: an alternate function to use for the documentation and module metadata of the
         generated function
+    :param codegen_engine:
     :return:
     """
     if sig_info.is_first_arg_mandatory:
@@ -296,7 +523,8 @@ def create_kwonly_decorator(sig_info,  # type: SignatureInfo
         @with_signature(sig_info.exposed_signature,
                         func_name=function_for_metadata.__name__,
                         doc=function_for_metadata.__doc__,
-                        modulename=function_for_metadata.__module__)
+                        module_name=function_for_metadata.__module__,
+                        engine=codegen_engine)
         def new_decorator(*no_args, **kwargs):
             """
             Code for your decorator, generated by decopatch to handle the case when it is called without parenthesis
@@ -315,13 +543,14 @@ def create_kwonly_decorator(sig_info,  # type: SignatureInfo
 
     # we can fallback to the same case than varpositional
     return create_general_case_decorator(sig_info, decorator_function, disambiguator,
-                                         function_for_metadata=function_for_metadata)
+                                         function_for_metadata=function_for_metadata, codegen_engine=codegen_engine)
 
 
 def create_general_case_decorator(sig_info,  # type: SignatureInfo
                                   impl_function,
                                   disambiguator,
                                   function_for_metadata,
+                                  codegen_engine=None,  # type: str
                                   ):
     """
     This method supports both with-trick and without-trick
@@ -331,6 +560,7 @@ def create_general_case_decorator(sig_info,  # type: SignatureInfo
     :param disambiguator:
     :param function_for_metadata: an alternate function to use for the documentation and module metadata of the
         generated function
+    :param codegen_engine:
     :return:
     """
     # Note: since we expose a decorator with a preserved signature and not (*args, **kwargs)
@@ -340,21 +570,90 @@ def create_general_case_decorator(sig_info,  # type: SignatureInfo
     # receive several kwargs
     # - even if user did not provide them
     # - and even if user provided them as positional !! (except for var-positional and fuutre positional-only args)
+    #
+    # The dispatcher is specialized for the shape of the signature, so that the cases that can be decided from the
+    # number of arguments received are handled inline, without any allocation. Note that the disambiguator should
+    # always be called directly from `new_decorator`, since stack introspection relies on the depth of the stack.
+    first_arg_name = sig_info.first_arg_name
+    first_arg_default = sig_info.first_arg_def.default
+    first_arg_mandatory = sig_info.is_first_arg_mandatory
 
-    @with_signature(None if sig_info.use_signature_trick else sig_info.exposed_signature,
-                    func_name=function_for_metadata.__name__,
-                    doc=function_for_metadata.__doc__,
-                    module_name=function_for_metadata.__module__)
-    def new_decorator(*args, **kwargs):
-        """
-        Code for your decorator, generated by decopatch to handle the case when it is called without parenthesis
-        """
-        # disambiguate
-        dk = DecoratorUsageInfo(sig_info, args, kwargs)
-        disambiguation_result = disambiguate_call(dk, disambiguator)
+    if sig_info.use_signature_trick:
+        # we expose a *args, **kwargs signature so we see exactly what the user has provided.
+        def new_decorator(*args, **kwargs):
+            """
+            Code for your decorator, generated by decopatch to handle the case when it is called without parenthesis
+            """
+            if kwargs or len(args) != 1:
+                # with parenthesis: @foo_decorator(), @foo_decorator(a, b) or @foo_decorator(a=1)
+                return impl_function(*args, **kwargs)
+
+            first_arg_value = args[0]
+            if not can_arg_be_a_decorator_target(first_arg_value):
+                # the first argument can NOT be decorated: we are sure that this was a WITH-parenthesis call
+                return impl_function(first_arg_value)
+
+            # still ambiguous
+            res = disambiguator(first_arg_value)
+            if res is _NO_PARENTHESIS and not first_arg_mandatory:
+                return impl_function()(first_arg_value)
+            elif res is _WITH_PARENTHESIS:
+                return impl_function(first_arg_value)
+            else:
+                return _handle_error(impl_function, sig_info, first_arg_value, args, kwargs, res)
+
+    elif sig_info.contains_varpositional or sig_info.is_first_arg_positional_only:
+        # we expose the true signature: the only arguments that remain in *args are the ones that CANNOT become kw
+        def new_decorator(*args, **kwargs):
+            """
+            Code for your decorator, generated by decopatch to handle the case when it is called without parenthesis
+            """
+            if len(args) != 1:
+                # with parenthesis: @foo_decorator(**kwargs) or @foo_decorator(a, b, **kwargs)
+                return impl_function(*args, **kwargs)
+
+            # no parenthesis: @foo_decorator -OR- with 1 positional argument: @foo_decorator(a, **kwargs).
+            # reminder: we can not count the kwargs because they always contain all the arguments
+            first_arg_value = args[0]
+            if not can_arg_be_a_decorator_target(first_arg_value) or first_arg_value is first_arg_default \
+                    or not are_other_args_default(sig_info, args, kwargs):
+                return impl_function(*args, **kwargs)
+
+            # still ambiguous
+            res = disambiguator(first_arg_value)
+            if res is _NO_PARENTHESIS and not first_arg_mandatory:
+                return impl_function()(first_arg_value)
+            elif res is _WITH_PARENTHESIS:
+                return impl_function(*args, **kwargs)
+            else:
+                return _handle_error(impl_function, sig_info, first_arg_value, args, kwargs, res)
 
-        # call
-        return call_in_appropriate_mode(impl_function, dk, disambiguation_result)
+    else:
+        # we expose the true signature: the first arg can be keyword. So it will be in kwargs (even if it was provided
+        # as positional).
+        def new_decorator(**kwargs):
+            """
+            Code for your decorator, generated by decopatch to handle the case when it is called without parenthesis
+            """
+            first_arg_value = kwargs[first_arg_name]
+            if not can_arg_be_a_decorator_target(first_arg_value) or first_arg_value is first_arg_default \
+                    or not are_other_args_default(sig_info, (), kwargs):
+                return impl_function(**kwargs)
+
+            # still ambiguous
+            res = disambiguator(first_arg_value)
+            if res is _NO_PARENTHESIS and not first_arg_mandatory:
+                return impl_function()(first_arg_value)
+            elif res is _WITH_PARENTHESIS:
+                return impl_function(**kwargs)
+            else:
+                return _handle_error(impl_function, sig_info, first_arg_value, (), kwargs, res)
+
+    new_decorator = with_signature(None if sig_info.use_signature_trick else sig_info.exposed_signature,
+                                   func_name=function_for_metadata.__name__,
+                                   doc=function_for_metadata.__doc__,
+                                   module_name=function_for_metadata.__module__,
+                                   engine=codegen_engine)(new_decorator)
 
     # trick to declare that our true signature is different than our actual one
     if sig_info.use_signature_trick:
@@ -365,3 +664,17 @@ def create_general_case_decorator(sig_info,  # type: SignatureInfo
         new_decorator.__wrapped__ = impl_function
 
     return new_decorator
+
+
+_WITH_PARENTHESIS = FirstArgDisambiguation.is_normal_arg
+_NO_PARENTHESIS = FirstArgDisambiguation.is_decorated_target
+
+
+def _handle_error(impl_function, sig_info, first_arg_value, args, kwargs, disambiguation_result):
+    """
+    Called by the dispatchers created in `create_general_case_decorator` when the disambiguation result is not a valid
+    one. `call_in_appropriate_mode` raises the appropriate error.
+    """
+    dk = DecoratorUsageInfo(sig_info, args, kwargs)
+    dk._first_arg_value = first_arg_value
+    return call_in_appropriate_mode(impl_function, dk, disambiguation_result)
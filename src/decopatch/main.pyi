@@ -1,4 +1,4 @@
-from typing import Any, Callable, Optional, Protocol, TypeVar, overload
+from typing import Any, Callable, Mapping, Optional, Protocol, TypeVar, Union, overload
 
 try:
     # We're importing typing_extensions version first, becouse it will
@@ -12,7 +12,12 @@ from decopatch.utils_modes import SignatureInfo
 
 _P = ParamSpec("_P")
 _F = TypeVar("_F", bound=Callable[..., Any])
-_CustomDisambugatorT = Optional[Callable[[Any], FirstArgDisambiguation]]
+_CustomDisambugatorT = Optional[
+    Union[
+        Callable[[Any], FirstArgDisambiguation],
+        Mapping[type, Union[FirstArgDisambiguation, Callable[[Any], FirstArgDisambiguation]]],
+    ]
+]
 
 class _Decorator(Protocol[_P]):
     """
@@ -33,6 +38,12 @@ def function_decorator(
     enable_stack_introspection: Callable[_P, Any],
     custom_disambiguator: _CustomDisambugatorT = ...,
     flat_mode_decorated_name: Optional[str] = ...,
+    codegen_engine: Optional[str] = ...,
+    preserve_signature: bool = ...,
+    lazy: bool = ...,
+    lazy_wrapping: bool = ...,
+    intern_appliers: Union[bool, int] = ...,
+    usage: Optional[str] = ...,
 ) -> _Decorator[_P]: ...
 
 # @function_decorator() is called with options or parenthesis.
@@ -41,11 +52,23 @@ def function_decorator(
     enable_stack_introspection: bool = ...,
     custom_disambiguator: _CustomDisambugatorT = ...,
     flat_mode_decorated_name: Optional[str] = ...,
+    codegen_engine: Optional[str] = ...,
+    preserve_signature: bool = ...,
+    lazy: bool = ...,
+    lazy_wrapping: bool = ...,
+    intern_appliers: Union[bool, int] = ...,
+    usage: Optional[str] = ...,
 ) -> Callable[[Callable[_P, Any]], _Decorator[_P]]: ...
 def class_decorator(
     enable_stack_introspection: bool = ...,
     custom_disambiguator: _CustomDisambugatorT = ...,
     flat_mode_decorated_name: Optional[str] = ...,
+    codegen_engine: Optional[str] = ...,
+    preserve_signature: bool = ...,
+    lazy: bool = ...,
+    lazy_wrapping: bool = ...,
+    intern_appliers: Union[bool, int] = ...,
+    usage: Optional[str] = ...,
 ): ...
 def decorator(
     is_function_decorator: bool = ...,
@@ -54,6 +77,12 @@ def decorator(
     custom_disambiguator: _CustomDisambugatorT = ...,
     use_signature_trick: bool = ...,
     flat_mode_decorated_name: Optional[str] = ...,
+    codegen_engine: Optional[str] = ...,
+    preserve_signature: bool = ...,
+    lazy: bool = ...,
+    lazy_wrapping: bool = ...,
+    intern_appliers: Union[bool, int] = ...,
+    usage: Optional[str] = ...,
 ): ...
 def create_decorator(
     impl_function,
@@ -63,13 +92,35 @@ def create_decorator(
     custom_disambiguator: _CustomDisambugatorT = ...,
     use_signature_trick: bool = ...,
     flat_mode_decorated_name: Optional[str] = ...,
+    codegen_engine: Optional[str] = ...,
+    preserve_signature: bool = ...,
+    lazy_wrapping: bool = ...,
+    intern_appliers: Union[bool, int] = ...,
+    usage: Optional[str] = ...,
+): ...
+def create_strict_decorator(
+    sig_info: SignatureInfo,
+    impl_function,
+    usage: str,
+    function_for_metadata,
+    codegen_engine: Optional[str] = ...,
+    is_function_decorator: bool = ...,
+    is_class_decorator: bool = ...,
 ): ...
 def create_no_args_decorator(
     decorator_function, function_for_metadata: Any | None = ...
 ): ...
 def create_kwonly_decorator(
-    sig_info: SignatureInfo, decorator_function, disambiguator, function_for_metadata
+    sig_info: SignatureInfo,
+    decorator_function,
+    disambiguator,
+    function_for_metadata,
+    codegen_engine: Optional[str] = ...,
 ): ...
 def create_general_case_decorator(
-    sig_info: SignatureInfo, impl_function, disambiguator, function_for_metadata
+    sig_info: SignatureInfo,
+    impl_function,
+    disambiguator,
+    function_for_metadata,
+    codegen_engine: Optional[str] = ...,
 ): ...
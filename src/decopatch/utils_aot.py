@@ -0,0 +1,206 @@
+import os
+import sys
+import warnings
+
+from decopatch import utils_codegen
+
+try:  # python 3.5+
+    from typing import Any, Dict, Optional, Tuple
+except ImportError:
+    pass
+
+
+COMPANION_MODULE_NAME = '_decopatch_compiled'
+"""Name of the companion module written in a package by `compile_package`"""
+
+_AOT_FORMAT = 1
+
+_checked_modules = set()
+"""Names of the modules for which the companion module of the package was already looked for"""
+
+_checked_packages = set()
+"""Names of the top-level packages whose companion module was already looked for"""
+
+_enabled = True
+"""Companion modules are not loaded while `compile_package` records the generated sources"""
+
+
+def load_compiled_code(module_name  # type: Optional[str]
+                       ):
+    # type: (...) -> bool
+    """
+    Loads the code objects compiled ahead of time for the top-level package of module `module_name`, if it has a
+    companion module created with `python -m decopatch compile <package>`. They are added to the cache of
+    `get_function_code`, so that the corresponding sources are not compiled at runtime.
+
+    This is called by decopatch each time a decorator is created or a double-flat wrapper is generated, with the module
+    of the implementation (resp. of the decorated function). The companion module is only looked for once per package.
+    Packages that are not already imported are ignored.
+
+    :param module_name:
+    :return: True if a companion module was loaded by this call
+    """
+    if module_name in _checked_modules or not _enabled:
+        return False
+    _checked_modules.add(module_name)
+
+    if module_name is None:
+        return False
+    package = module_name.partition('.')[0]
+    if package in _checked_packages:
+        return False
+    _checked_packages.add(package)
+
+    if getattr(sys.modules.get(package), '__path__', None) is None:
+        # not an imported package (plain module, '__main__', exec-ed code...)
+        return False
+
+    companion_name = "%s.%s" % (package, COMPANION_MODULE_NAME)
+    try:
+        __import__(companion_name)
+    except ImportError:
+        return False
+
+    companion = sys.modules[companion_name]
+    if getattr(companion, 'DECOPATCH_AOT_FORMAT', None) != _AOT_FORMAT:
+        warnings.warn("Ignoring %r: it was created by an incompatible version of decopatch. Please run "
+                      "`python -m decopatch compile %s` again." % (companion_name, package))
+        return False
+
+    register_compiled_code(companion.COMPILED_CODES)
+    return True
+
+
+def register_compiled_code(codes  # type: Dict[str, Any]
+                           ):
+    """
+    Adds the code objects in `codes` (a dictionary of generated source -> code object) to the cache of
+    `get_function_code`, as long as the cache is not full.
+
+    :param codes:
+    :return:
+    """
+    cache = utils_codegen._code_cache
+    for source, code in codes.items():
+        if len(cache) >= utils_codegen.CODE_CACHE_MAXSIZE:
+            break
+        cache.setdefault(source, code)
+
+
+def record_generated_sources(package_name  # type: str
+                             ):
+    # type: (...) -> Tuple[str, ...]
+    """
+    Imports package `package_name` and all its submodules, and returns all the sources that decopatch compiled in the
+    meantime with `get_function_code`: the ones of the decorators and of the double-flat wrappers created at import
+    time. Decorators and wrappers created lazily (`lazy=True`, `lazy_wrapping=True`) are therefore not recorded.
+
+    The package should not be imported yet. Submodules that can not be imported are skipped with a warning.
+
+    :param package_name:
+    :return: a sorted tuple of sources
+    """
+    import importlib
+    import pkgutil
+
+    global _enabled
+    previous_cache = dict(utils_codegen._code_cache)
+    previous_maxsize = utils_codegen.CODE_CACHE_MAXSIZE
+    _enabled = False
+    utils_codegen._code_cache.clear()
+    utils_codegen.CODE_CACHE_MAXSIZE = sys.maxsize
+    try:
+        package = importlib.import_module(package_name)
+        if not hasattr(package, '__path__'):
+            raise ValueError("%r is not a package" % package_name)
+
+        def _on_error(name):
+            warnings.warn("Skipping %r: it can not be imported" % name)
+
+        for module_info in pkgutil.walk_packages(package.__path__, package_name + '.', onerror=_on_error):
+            name = module_info[1]
+            if name.rpartition('.')[2] == COMPANION_MODULE_NAME:
+                continue
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                warnings.warn("Skipping %r: it can not be imported (%r)" % (name, e))
+
+        return tuple(sorted(s for s in utils_codegen._code_cache if isinstance(s, str)))
+    finally:
+        _enabled = True
+        utils_codegen.CODE_CACHE_MAXSIZE = previous_maxsize
+        utils_codegen._code_cache.update(previous_cache)
+
+
+def write_companion_module(path,         # type: str
+                           sources,      # type: Tuple[str, ...]
+                           package_name  # type: str
+                           ):
+    """
+    Writes a companion module at `path`, defining a function for each of the generated `sources`, and a
+    `COMPILED_CODES` dictionary of source -> code object. The file is replaced atomically.
+
+    :param path:
+    :param sources:
+    :param package_name:
+    :return:
+    """
+    lines = ['"""',
+             "Functions generated by decopatch when %s is imported." % package_name,
+             "This module was written by `python -m decopatch compile %s`, do not edit it." % package_name,
+             '"""',
+             "",
+             "DECOPATCH_AOT_FORMAT = %s" % _AOT_FORMAT,
+             "",
+             "COMPILED_CODES = dict()"]
+    for source in sources:
+        lines += ["", "", source.rstrip("\n"),
+                  "COMPILED_CODES[%r] = %s.__code__" % (source, utils_codegen._GENERATED_CO_NAME)]
+    if sources:
+        lines += ["", "del %s" % utils_codegen._GENERATED_CO_NAME]
+
+    tmp_path = "%s.%s.tmp" % (path, os.getpid())
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def compile_package(package_name,  # type: str
+                    output=None    # type: Optional[str]
+                    ):
+    # type: (...) -> Tuple[str, int]
+    """
+    Ahead-of-time compilation of the decorators and double-flat wrappers created when package `package_name` is
+    imported. Their generated sources are recorded (see `record_generated_sources`), and written as plain functions in a
+    companion module `_decopatch_compiled.py` inside the package (see `write_companion_module`).
+
+    At runtime, the first time decopatch creates a decorator or a wrapper for a module of the package, it imports the
+    companion module and adds its code objects to the cache of `get_function_code`. Since the companion module is
+    itself stored in the bytecode cache by python, nothing is compiled at runtime for these sources.
+
+    The companion module is only valid for the version of decopatch that created it: sources that do not match anymore
+    are simply compiled at runtime as usual. This is also the case for all sources not recorded.
+
+    This is the implementation of `python -m decopatch compile <package>`.
+
+    :param package_name: the name of a top-level package
+    :param output: an optional path where to write the companion module. By default it is written in the package
+        directory
+    :return: a tuple (path of the companion module, number of recorded sources)
+    """
+    if '.' in package_name:
+        raise ValueError("Companion modules are only supported for top-level packages, found %r" % package_name)
+
+    sources = record_generated_sources(package_name)
+    if output is None:
+        output = os.path.join(list(sys.modules[package_name].__path__)[0], COMPANION_MODULE_NAME + '.py')
+    write_companion_module(output, sources, package_name)
+    return output, len(sources)
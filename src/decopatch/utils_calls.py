@@ -9,6 +9,17 @@ class InvalidMandatoryArgError(TypeError):
     pass
 
 
+class InvalidParenthesisUsageError(TypeError):
+    pass
+
+
+ALWAYS_PARENTHESIS = 'always_parenthesis'
+"""Strict `usage` where the decorator can only be used with parenthesis: @foo_decorator(...)"""
+
+NEVER_PARENTHESIS = 'never_parenthesis'
+"""Strict `usage` where the decorator can only be used without parenthesis: @foo_decorator"""
+
+
 def call_in_appropriate_mode(impl_function,
                              dk,  # type: DecoratorUsageInfo
                              disambiguation_result  # type: FirstArgDisambiguation
@@ -59,6 +70,79 @@ def call_in_appropriate_mode(impl_function,
         raise ValueError("single-argument disambiguation did not return properly: received %s" % disambiguation_result)
 
 
+APPLIERS_CACHE_MAXSIZE = 256
+"""Default maximum number of interned appliers per decorator, see `make_interning_impl`"""
+
+
+def _get_key_item(value):
+    """
+    Returns the part of the interning key representing `value`: a tuple (type, value), where the items of tuples and
+    frozensets are themselves represented recursively. Values that are equal but of distinct types, such as `1`, `1.0`
+    and `True`, therefore lead to distinct keys.
+    """
+    t = type(value)
+    if t is tuple:
+        return (t,) + tuple(map(_get_key_item, value))
+    elif t is frozenset:
+        return t, frozenset(map(_get_key_item, value))
+    else:
+        return t, value
+
+
+def make_interning_impl(impl_function,
+                        maxsize=APPLIERS_CACHE_MAXSIZE  # type: int
+                        ):
+    """
+    Returns a version of the nested implementation `impl_function` that interns the appliers it returns: when it is
+    called several times with the same arguments, the same applier is returned, and `impl_function` is not called
+    again. The appliers are kept in a bounded cache, the oldest entries being evicted first.
+
+    The cache key is made of the arguments and their types, recursively inside tuples and frozensets, so that for
+    example `1`, `1.0` and `True` (or `(0,)` and `(False,)`) are not mixed up. Calls with at least one unhashable
+    argument are not interned. Note that when the decorator exposes its true signature (`use_signature_trick=False`),
+    all arguments are received by `impl_function` in a normalized form, so that for example `@my_deco(3)` and
+    `@my_deco(level=3)` share the same applier. Otherwise the arguments are used as received, so such equivalent usages
+    are interned separately.
+
+    Building the key costs about as much as creating a simple applier: this is only worth it when `impl_function` does
+    some significant work, or when the identity of the appliers matters.
+
+    This is only safe if the appliers returned by `impl_function` can be applied several times, which is always the
+    case for the flat and double-flat modes.
+
+    :param impl_function:
+    :param maxsize:
+    :return:
+    """
+    cache = dict()
+
+    def _interning_impl(*args, **kwargs):
+        try:
+            key = tuple(map(_get_key_item, args))
+            if kwargs:
+                key = key, tuple((k, _get_key_item(v)) for k, v in kwargs.items())
+            return cache[key]
+        except TypeError:
+            # unhashable argument
+            return impl_function(*args, **kwargs)
+        except KeyError:
+            pass
+
+        applier = impl_function(*args, **kwargs)
+        if len(cache) >= maxsize:
+            try:
+                del cache[next(iter(cache))]
+            except (KeyError, RuntimeError, StopIteration):
+                pass
+        cache[key] = applier
+        return applier
+
+    _interning_impl.__name__ = impl_function.__name__
+    _interning_impl.__wrapped__ = impl_function
+    _interning_impl.cache = cache
+    return _interning_impl
+
+
 def no_parenthesis_usage(decorator_function, decorated):
     """
     called with no arg NOR parenthesis: @foo_decorator
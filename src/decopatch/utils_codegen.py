@@ -0,0 +1,580 @@
+import sys
+from functools import partial
+from inspect import CO_VARARGS, CO_VARKEYWORDS
+from itertools import count
+from keyword import iskeyword
+from types import CodeType, FunctionType
+
+from decopatch import utils_diskcache
+
+try:  # python 3.3+
+    from inspect import Parameter
+except ImportError:
+    from funcsigs import Parameter
+
+try:  # python 3+
+    isidentifier = str.isidentifier
+except AttributeError:
+    import re
+    _IDENTIFIER_PATTERN = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
+
+    def isidentifier(name):
+        return _IDENTIFIER_PATTERN.match(name) is not None
+
+try:  # python 3.5+
+    from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+except ImportError:
+    pass
+
+
+GENERATED_PREFIX = '_decopatch_'
+"""Prefix of all names defined by decopatch in the namespace of the functions it generates"""
+
+IMPL_NAME = GENERATED_PREFIX + 'impl_'
+"""Name of the implementation called by a generated function, in its namespace"""
+
+_GENERATED_CO_NAME = GENERATED_PREFIX + 'gen_'
+"""Name used to define all generated functions. It is replaced with the actual name afterwards, if possible"""
+
+_gen_count = count()
+"""Atomic counter used to give each compiled code a unique filename, for profilers"""
+
+_code_cache = dict()
+"""The cache of compiled code objects, by generated source"""
+
+CODE_CACHE_MAXSIZE = 4096
+"""Maximum number of code objects kept in cache. Oldest entries are evicted first"""
+
+LOCALS_NAME = GENERATED_PREFIX + 'locals_'
+"""Name of the `locals` builtin in the namespace of functions created from templates"""
+
+DICT_NAME = GENERATED_PREFIX + 'dict_'
+"""Name of the `dict` builtin in the namespace of wrappers using the `f_kwargs` expression on python < 3.5, see
+`get_wrapper_params_and_call_exprs`. Builtins are not available in the namespace of generated functions"""
+
+
+ASYNC_FOR_BUILTINS = dict()
+"""Builtins used by `async for` loops, to add to the namespace of the generated functions that contain one: before
+python 3.8, `async for` looks up `StopAsyncIteration` by name. Builtins are not available in the namespace of generated
+functions"""
+if (3, 5) <= sys.version_info < (3, 8):
+    ASYNC_FOR_BUILTINS['StopAsyncIteration'] = StopAsyncIteration  # noqa: F821
+
+
+COMPILE_ENGINE = 'compile'
+"""Code generation engine generating source code and compiling it with `compile`. This is the default"""
+
+TEMPLATES_ENGINE = 'templates'
+"""Code generation engine adapting precompiled templates with `CodeType.replace`: it never calls `compile` nor `exec`.
+Generated functions receive their arguments exactly as with `COMPILE_ENGINE`, but they are slightly slower to call"""
+
+_ENGINES = (COMPILE_ENGINE, TEMPLATES_ENGINE)
+
+_default_engine = COMPILE_ENGINE
+
+
+def set_default_codegen_engine(engine  # type: str
+                               ):
+    """
+    Sets the code generation engine used by default by all decorators created afterwards, when they do not explicitly
+    specify a `codegen_engine`.
+
+    :param engine: one of `'compile'` (default) or `'templates'`. See `COMPILE_ENGINE` and `TEMPLATES_ENGINE`
+    :return:
+    """
+    global _default_engine
+    _default_engine = _check_engine(engine)
+
+
+def get_codegen_engine(engine=None  # type: Optional[str]
+                       ):
+    # type: (...) -> str
+    """
+    Returns `engine` if it is not None, or the default code generation engine.
+
+    :param engine:
+    :return:
+    """
+    return _default_engine if engine is None else _check_engine(engine)
+
+
+def _check_engine(engine):
+    if engine not in _ENGINES:
+        raise ValueError("Invalid code generation engine: %r. It should be one of %r" % (engine, _ENGINES))
+    if engine == TEMPLATES_ENGINE and sys.version_info < (3, 8):
+        raise NotImplementedError("The 'templates' code generation engine requires python 3.8+")
+    return engine
+
+
+def get_function_code(params_str,  # type: str
+                      body_lines,  # type: Iterable[str]
+                      is_async=False  # type: bool
+                      ):
+    # type: (...) -> CodeType
+    """
+    Returns the code object of a function with parameters `params_str` and body `body_lines`.
+
+    The source does not depend on the name of the function, nor on the values of its defaults: they are set on each
+    function created with `make_function`. Therefore functions with structurally identical signatures (parameter kinds
+    and names, presence of defaults) share the same source, and this source is only compiled once: code objects are
+    kept in a bounded cache, by source.
+
+    If the on-disk code cache is enabled (see `utils_diskcache.set_code_cache_dir`), sources that are not in memory are
+    looked up there before being compiled.
+
+    :param params_str: the parameters string, without defaults. See `get_wrapper_params_and_call_exprs`
+    :param body_lines: the lines of the function body, without indentation
+    :param is_async: a boolean indicating if the function should be defined with `async def`
+    :return:
+    """
+    source = "%sdef %s(%s):\n%s\n" % ("async " if is_async else "", _GENERATED_CO_NAME, params_str,
+                                      "\n".join("    " + line for line in body_lines))
+    try:
+        return _code_cache[source]
+    except KeyError:
+        pass
+
+    code = None
+    if utils_diskcache._cache_dir is not None:
+        code = utils_diskcache.load_code(source)
+    if code is None:
+        module_code = compile(source, "<decopatch-gen-%s>" % next(_gen_count), 'exec')
+        code = next(c for c in module_code.co_consts if isinstance(c, CodeType))
+        if utils_diskcache._cache_dir is not None:
+            utils_diskcache.save_code(source, code)
+
+    if len(_code_cache) >= CODE_CACHE_MAXSIZE:
+        try:
+            del _code_cache[next(iter(_code_cache))]
+        except (KeyError, RuntimeError, StopIteration):
+            # concurrent modification: ignore, we'll evict next time
+            pass
+    _code_cache[source] = code
+
+    return code
+
+
+def get_template_code(sig,               # type: Signature
+                      kind='function',    # type: str
+                      impl_name=IMPL_NAME  # type: str
+                      ):
+    # type: (...) -> CodeType
+    """
+    Returns a code object with signature `sig`, adapted from a precompiled template with `CodeType.replace`. This is
+    used by the 'templates' engine, and neither calls `compile` nor `exec`.
+
+    The created code sends the dictionary of its received arguments (`locals()`) to the implementation, found under
+    name `IMPL_NAME` in its namespace. It is therefore the responsibility of the implementation to dispatch them, for
+    example with `split_arguments`. Note that arguments are validated by python before entering the code, exactly
+    as for any function with signature `sig`.
+
+    Code objects are cached by signature shape, with the same cache as `get_function_code`.
+
+    :param sig:
+    :param kind: 'function', 'coroutine' (the implementation returns an awaitable), 'generator' (the implementation
+        returns an iterable) or 'async_generator' (the implementation returns an asynchronous iterable)
+    :param impl_name: the name of the implementation in the namespace of the code, if not `IMPL_NAME`
+    :return:
+    """
+    varnames = []
+    nb_posonly = nb_pos = nb_kwonly = 0
+    flags = 0
+    varpos_name = varkw_name = None
+    for p_name, p in sig.parameters.items():
+        if p.kind is Parameter.VAR_POSITIONAL:
+            varpos_name = p_name
+            flags |= CO_VARARGS
+        elif p.kind is Parameter.VAR_KEYWORD:
+            varkw_name = p_name
+            flags |= CO_VARKEYWORDS
+        else:
+            varnames.append(p_name)
+            if p.kind is Parameter.KEYWORD_ONLY:
+                nb_kwonly += 1
+            else:
+                nb_pos += 1
+                if p.kind is Parameter.POSITIONAL_ONLY:
+                    nb_posonly += 1
+    if varpos_name is not None:
+        varnames.append(varpos_name)
+    if varkw_name is not None:
+        varnames.append(varkw_name)
+    varnames = tuple(varnames)
+
+    key = (kind, impl_name, varnames, nb_posonly, nb_pos, nb_kwonly, flags)
+    try:
+        return _code_cache[key]
+    except KeyError:
+        pass
+
+    from decopatch import _codegen_templates_py38_and_higher as templates
+    template_code = getattr(templates, "%s_template" % kind).__code__
+    # the local variables of the template body, if any, come after the arguments
+    varnames += template_code.co_varnames
+    names = tuple(impl_name if n == IMPL_NAME else n for n in template_code.co_names)
+    code = template_code.replace(co_argcount=nb_pos, co_posonlyargcount=nb_posonly, co_kwonlyargcount=nb_kwonly,
+                                 co_nlocals=len(varnames), co_varnames=varnames, co_names=names,
+                                 co_flags=(template_code.co_flags & ~(CO_VARARGS | CO_VARKEYWORDS)) | flags,
+                                 co_name=_GENERATED_CO_NAME)
+
+    if len(_code_cache) >= CODE_CACHE_MAXSIZE:
+        try:
+            del _code_cache[next(iter(_code_cache))]
+        except (KeyError, RuntimeError, StopIteration):
+            pass
+    _code_cache[key] = code
+
+    return code
+
+
+def get_arguments_names(sig  # type: Signature
+                        ):
+    """
+    Returns the names of the arguments that should be forwarded as positional, and the ones that should be forwarded
+    as keywords, when a function with signature `sig` calls another one. As in `makefun`, arguments are forwarded as
+    keywords whenever possible: so all the time, except for positional-only arguments and arguments located before a
+    var-positional.
+
+    :param sig:
+    :return: a tuple (pos_names, varpos_name, kw_names, varkw_name)
+    """
+    pos_names = []
+    kw_names = []
+    varpos_name = varkw_name = None
+    for p_name, p in sig.parameters.items():
+        if p.kind is Parameter.VAR_POSITIONAL:
+            pos_names += kw_names
+            kw_names = []
+            varpos_name = p_name
+        elif p.kind is Parameter.VAR_KEYWORD:
+            varkw_name = p_name
+        elif p.kind is Parameter.POSITIONAL_ONLY:
+            pos_names.append(p_name)
+        else:
+            kw_names.append(p_name)
+
+    return tuple(pos_names), varpos_name, tuple(kw_names), varkw_name
+
+
+def split_arguments(arguments,    # type: Dict[str, Any]
+                    pos_names,    # type: Tuple[str, ...]
+                    varpos_name,  # type: Optional[str]
+                    kw_names,     # type: Tuple[str, ...]
+                    varkw_name,   # type: Optional[str]
+                    ):
+    """
+    Splits the `arguments` dictionary received by a function created from a template (see `get_template_code`) into
+    the positional and keyword arguments to forward, according to the names returned by `get_arguments_names`.
+
+    :return: a tuple (args, kwargs)
+    """
+    args = tuple(arguments[n] for n in pos_names)
+    if varpos_name is not None:
+        args += arguments[varpos_name]
+    kwargs = {n: arguments[n] for n in kw_names}
+    if varkw_name is not None:
+        kwargs.update(arguments[varkw_name])
+    return args, kwargs
+
+
+def clear_code_cache():
+    """Clears the cache of compiled code objects used by `get_function_code`."""
+    _code_cache.clear()
+
+
+def make_function(code,                # type: CodeType
+                  evaldict,            # type: Dict[str, Any]
+                  sig,                 # type: Signature
+                  func_name=None,      # type: Optional[str]
+                  qualname=None,       # type: Optional[str]
+                  doc=None,            # type: Optional[str]
+                  module_name=None,    # type: Optional[str]
+                  attrs=None,          # type: Optional[Dict[str, Any]]
+                  ):
+    """
+    Creates a new function from `code`, with `evaldict` as its globals, and the defaults, annotations and metadata
+    corresponding to `sig`, `func_name`, `qualname`, `doc`, `module_name` and `attrs`. No code is compiled nor executed.
+
+    :param code: a code object obtained with `get_function_code`
+    :param evaldict: the namespace of the created function, containing all the symbols used in its body
+    :param sig: the signature of the created function
+    :param func_name:
+    :param qualname:
+    :param doc:
+    :param module_name:
+    :param attrs: the attributes to set on the created function, if any
+    :return:
+    """
+    if func_name is not None:
+        code = _rename_code(code, func_name, qualname)
+
+    annotations, defaults, kwonlydefaults = get_signature_details(sig)
+    f = FunctionType(code, evaldict, func_name or code.co_name, defaults)
+    if kwonlydefaults is not None:
+        f.__kwdefaults__ = kwonlydefaults
+    if annotations:
+        f.__annotations__ = annotations
+    if qualname is not None:
+        f.__qualname__ = qualname
+    f.__doc__ = doc
+    f.__module__ = module_name
+    if attrs is not None:
+        f.__dict__ = attrs
+
+    return f
+
+
+def get_wrapper_attrs(wrapped):
+    # type: (...) -> Dict[str, Any]
+    """
+    Returns the attributes to set on a function wrapping `wrapped`, as `functools.wraps` would do: a copy of its
+    `__dict__`, and `__wrapped__`. The dictionary is created in one step, so that it is allocated with the right size.
+
+    :param wrapped:
+    :return:
+    """
+    attrs = getattr(wrapped, '__dict__', None)
+    if attrs:
+        return dict(attrs, __wrapped__=wrapped)
+    else:
+        return {'__wrapped__': wrapped}
+
+
+def get_wrapper_metadata(wrapped):
+    # type: (...) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+    """
+    Returns the name, qualified name, docstring and module to set on a function wrapping `wrapped`. If `wrapped` is a
+    `functools.partial`, they are the ones of the underlying function, since the partial object has none of its own.
+
+    :param wrapped:
+    :return: a tuple (name, qualname, doc, module_name)
+    """
+    while isinstance(wrapped, partial) and getattr(wrapped, '__name__', None) is None:
+        wrapped = wrapped.func
+    return (getattr(wrapped, '__name__', None), getattr(wrapped, '__qualname__', None),
+            getattr(wrapped, '__doc__', None), getattr(wrapped, '__module__', None))
+
+
+if sys.version_info >= (3, 11):
+    def _rename_code(code, func_name, qualname):
+        return code.replace(co_name=func_name, co_qualname=qualname or func_name)
+elif sys.version_info >= (3, 8):
+    def _rename_code(code, func_name, qualname):
+        return code.replace(co_name=func_name)
+elif sys.version_info >= (3, 0):
+    def _rename_code(code, func_name, qualname):
+        return CodeType(code.co_argcount, code.co_kwonlyargcount, code.co_nlocals, code.co_stacksize, code.co_flags,
+                        code.co_code, code.co_consts, code.co_names, code.co_varnames, code.co_filename, func_name,
+                        code.co_firstlineno, code.co_lnotab, code.co_freevars, code.co_cellvars)
+else:
+    def _rename_code(code, func_name, qualname):
+        return CodeType(code.co_argcount, code.co_nlocals, code.co_stacksize, code.co_flags, code.co_code,
+                        code.co_consts, code.co_names, code.co_varnames, code.co_filename, str(func_name),
+                        code.co_firstlineno, code.co_lnotab, code.co_freevars, code.co_cellvars)
+
+
+def with_signature(func_signature,   # type: Optional[Signature]
+                   func_name=None,   # type: Optional[str]
+                   doc=None,         # type: Optional[str]
+                   module_name=None,  # type: Optional[str]
+                   qualname=None,    # type: Optional[str]
+                   engine=None,      # type: Optional[str]
+                   ):
+    # type: (...) -> Callable[[Callable], Callable]
+    """
+    Equivalent of `makefun.with_signature` for the functions generated by decopatch: the created function has
+    signature `func_signature` and calls the decorated implementation with the received arguments, passed as keywords
+    whenever possible. Its code is obtained from `get_function_code` (or `get_template_code` if `engine` is
+    'templates'), so it is only created once per signature shape.
+
+    As in `makefun`, if `func_signature` is None the decorated implementation is returned with its metadata updated.
+
+    :param func_signature:
+    :param func_name: the name of the created function. By default the name of the implementation is used
+    :param doc: the docstring of the created function. By default the docstring of the implementation is used
+    :param module_name: the module name of the created function. By default the module of the implementation is used
+    :param qualname: the qualified name of the created function. By default the one of the implementation is used
+    :param engine: the code generation engine to use. By default the one set with `set_default_codegen_engine`
+    :return:
+    """
+    if func_signature is None:
+        def replace_f(f):
+            if func_name is not None:
+                f.__name__ = func_name
+            if doc is not None:
+                f.__doc__ = doc
+            if qualname is not None:
+                f.__qualname__ = qualname
+            if module_name is not None:
+                f.__module__ = module_name
+            return f
+    elif get_codegen_engine(engine) == TEMPLATES_ENGINE:
+        check_reserved_names(func_signature, func_name)
+        code = get_template_code(func_signature)
+        names = get_arguments_names(func_signature)
+
+        def replace_f(f):
+            def _forward(arguments):
+                args, kwargs = split_arguments(arguments, *names)
+                return f(*args, **kwargs)
+
+            return make_function(code, {IMPL_NAME: _forward, LOCALS_NAME: locals}, func_signature,
+                                 func_name=func_name if func_name is not None else f.__name__,
+                                 qualname=qualname if qualname is not None else getattr(f, '__qualname__', None),
+                                 doc=doc if doc is not None else f.__doc__,
+                                 module_name=module_name if module_name is not None else f.__module__)
+    else:
+        check_reserved_names(func_signature, func_name)
+        params_str, _, _, forward_str = get_wrapper_params_and_call_exprs(func_signature)
+        code = get_function_code(params_str, ["return %s(%s)" % (IMPL_NAME, forward_str)])
+
+        def replace_f(f):
+            return make_function(code, {IMPL_NAME: f}, func_signature,
+                                 func_name=func_name if func_name is not None else f.__name__,
+                                 qualname=qualname if qualname is not None else getattr(f, '__qualname__', None),
+                                 doc=doc if doc is not None else f.__doc__,
+                                 module_name=module_name if module_name is not None else f.__module__)
+
+    return replace_f
+
+
+def get_wrapper_params_and_call_exprs(sig  # type: Signature
+                                      ):
+    """
+    Returns the parameters string to use in the definition of a wrapper with signature `sig`, the expressions creating
+    the `f_args` and `f_kwargs` objects from inside that wrapper, and the arguments string to use to forward the
+    received arguments to a function with signature `sig`.
+
+    Default values are not included in the parameters string, they have to be set on the created function afterwards
+    (with `__defaults__` and `__kwdefaults__`). Arguments are sent to `f_kwargs` whenever possible, exactly like
+    `makefun` does: so all the time, except for positional-only arguments and arguments located before a var-positional.
+
+    Note: on python < 3.5 the `f_kwargs` expression may call `dict`, under name `DICT_NAME`. It has to be bound in the
+    namespace of the wrapper.
+
+    :param sig:
+    :return: params_str, f_args_expr, f_kwargs_expr, forward_str
+    """
+    params = []
+    pos_names = []
+    kw_names = []
+    varpos_name = None
+    varkw_name = None
+    in_posonly = False
+    for p_name, p in sig.parameters.items():
+        kind = p.kind
+        if in_posonly and kind is not Parameter.POSITIONAL_ONLY:
+            params.append('/')
+            in_posonly = False
+
+        if kind is Parameter.VAR_POSITIONAL:
+            params.append('*' + p_name)
+            # all arguments before the var-positional have to be passed as positional
+            pos_names += kw_names
+            kw_names = []
+            varpos_name = p_name
+            continue
+        elif kind is Parameter.VAR_KEYWORD:
+            params.append('**' + p_name)
+            varkw_name = p_name
+            continue
+        elif kind is Parameter.POSITIONAL_ONLY:
+            in_posonly = True
+            pos_names.append(p_name)
+        elif kind is Parameter.KEYWORD_ONLY:
+            if varpos_name is None and '*' not in params:
+                params.append('*')
+            kw_names.append(p_name)
+        else:
+            kw_names.append(p_name)
+
+        # the actual default value will be set afterwards
+        params.append(p_name if p.default is Parameter.empty else ("%s=None" % p_name))
+
+    if in_posonly:
+        params.append('/')
+
+    # f_args
+    if len(pos_names) > 0:
+        f_args_expr = "(%s,)" % ", ".join(pos_names)
+        if varpos_name is not None:
+            f_args_expr += " + " + varpos_name
+    elif varpos_name is not None:
+        f_args_expr = varpos_name
+    else:
+        f_args_expr = "()"
+
+    # f_kwargs. Note: the var-keyword dict is created by python for each call, we can reuse it
+    if len(kw_names) > 0:
+        if varkw_name is None:
+            f_kwargs_expr = "{%s}" % ", ".join("%r: %s" % (n, n) for n in kw_names)
+        elif sys.version_info >= (3, 5):
+            f_kwargs_expr = "{%s, **%s}" % (", ".join("%r: %s" % (n, n) for n in kw_names), varkw_name)
+        else:
+            f_kwargs_expr = "%s(%s, %s)" % (DICT_NAME, varkw_name, ", ".join("%s=%s" % (n, n) for n in kw_names))
+    elif varkw_name is not None:
+        f_kwargs_expr = varkw_name
+    else:
+        f_kwargs_expr = "{}"
+
+    # forward
+    forward = list(pos_names)
+    if varpos_name is not None:
+        forward.append("*" + varpos_name)
+    forward += ["%s=%s" % (n, n) for n in kw_names]
+    if varkw_name is not None:
+        forward.append("**" + varkw_name)
+
+    return ", ".join(params), f_args_expr, f_kwargs_expr, ", ".join(forward)
+
+
+def get_signature_details(sig  # type: Signature
+                          ):
+    """
+    Returns the annotations, defaults and kwonlydefaults to set on a function created with signature `sig`.
+
+    :param sig:
+    :return: annotations, defaults, kwonlydefaults
+    """
+    annotations = dict()
+    defaults = []
+    kwonlydefaults = dict()
+    if sig.return_annotation is not sig.empty:
+        annotations['return'] = sig.return_annotation
+    for p_name, p in sig.parameters.items():
+        if p.annotation is not sig.empty:
+            annotations[p_name] = p.annotation
+        if p.default is not sig.empty:
+            if p.kind is Parameter.KEYWORD_ONLY:
+                kwonlydefaults[p_name] = p.default
+            else:
+                defaults.append(p.default)
+
+    return annotations, (tuple(defaults) if len(defaults) > 0 else None), \
+        (kwonlydefaults if len(kwonlydefaults) > 0 else None)
+
+
+def check_reserved_names(sig,       # type: Signature
+                         func_name,  # type: Optional[str]
+                         ):
+    """
+    Raises a `NameError` if a parameter in `sig` uses a name reserved by decopatch in the generated functions.
+
+    :param sig:
+    :param func_name:
+    :return:
+    """
+    for p_name in sig.parameters:
+        if p_name.startswith(GENERATED_PREFIX):
+            raise NameError("Argument name '%s' is reserved by decopatch and can not be used in '%s'"
+                            % (p_name, func_name))
+
+
+def is_valid_identifier(name):
+    """
+    Returns True if `name` can be used as a variable or argument name in generated code.
+
+    :param name:
+    :return:
+    """
+    return isidentifier(name) and not iskeyword(name)
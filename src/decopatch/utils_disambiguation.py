@@ -4,7 +4,25 @@ from inspect import isclass
 from linecache import getline
 from warnings import warn
 
+try:  # python 3.4+
+    from functools import singledispatch
+except ImportError:
+    from singledispatch import singledispatch
+
+try:  # python 3.3+
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:  # python 3.5+
+    from typing import Union, Callable
+except ImportError:
+    pass
+
 from decopatch.utils_modes import SignatureInfo
+from decopatch.utils_codegen import IMPL_NAME
+from decopatch.utils_introspection import SUPPORTS_BYTECODE_INTROSPECTION, is_bare_decorator_application
+from decopatch import utils_importhook
 
 
 class FirstArgDisambiguation(Enum):
@@ -43,7 +61,18 @@ def can_arg_be_a_decorator_target(arg):
     :param arg:
     :return:
     """
-    return callable(arg) or isclass(arg)
+    return is_function_like(arg) or isclass(arg)
+
+
+def is_function_like(arg):
+    """
+    Returns True if the argument received is a callable, or a `classmethod` or `staticmethod` object. Indeed these
+    objects are not callable in all python versions, but they can be decorated by function decorators.
+
+    :param arg:
+    :return:
+    """
+    return callable(arg) or isinstance(arg, (classmethod, staticmethod))
 
 
 class DecoratorUsageInfo(object):
@@ -108,6 +137,7 @@ def disambiguate_call(dk,  # type: DecoratorUsageInfo
             # first arg can be keyword. So it will be in kwargs (even if it was provided as positional).
             if nb_posonly_received > 0:
                 raise Exception("Internal error - this should not happen, please file an issue on the github page")
+            dk._first_arg_value = dk.kwargs[dk.sig_info.first_arg_name]
 
     # (2) Now work on the values themselves
     if not can_arg_be_a_decorator_target(dk.first_arg_value):
@@ -120,15 +150,8 @@ def disambiguate_call(dk,  # type: DecoratorUsageInfo
             return _WITH_PARENTHESIS
         else:
             # check if there is another argument that is different from its default value
-            # skip first entry
-            params = iter(dk.sig_info.exposed_signature.parameters.items())
-            next(params)
-            for p_name, p_def in params:
-                try:
-                    if dk.bound.arguments[p_name] is not p_def.default:
-                        return _WITH_PARENTHESIS
-                except KeyError:
-                    pass  # this can happen when the argument is **kwargs and not filled: it does not even appear.
+            if not are_other_args_default(dk.sig_info, dk.args, dk.kwargs):
+                return _WITH_PARENTHESIS
 
     # (3) still-ambiguous case, the first parameter is the single non-default one and is a callable or class
     # at this point a no-parenthesis call is still possible.
@@ -136,6 +159,40 @@ def disambiguate_call(dk,  # type: DecoratorUsageInfo
     return disambiguator(dk.first_arg_value)
 
 
+def are_other_args_default(sig_info,  # type: SignatureInfo
+                           args,
+                           kwargs,
+                           ):
+    """
+    Returns True if all the arguments received by a decorator exposing its true signature (`use_signature_trick=False`)
+    are equal to their default value, except the first one.
+
+    The arguments are received as sent by the function generated with `with_signature`, so their layout is known in
+    advance: no need to bind them to the signature. They are directly compared to the precomputed
+    `sig_info.defaults_vector`. A non-empty var-positional or var-keyword is never considered as a default value.
+
+    :param sig_info:
+    :param args: the positional arguments received
+    :param kwargs: the keyword arguments received
+    :return:
+    """
+    nb_pos, pos_defaults, nb_kw, kw_defaults = sig_info.defaults_vector
+
+    if len(args) > nb_pos or len(kwargs) > nb_kw:
+        # the var-positional or the var-keyword is not empty
+        return False
+
+    for i, default in pos_defaults:
+        if args[i] is not default:
+            return False
+
+    for name, default in kw_defaults:
+        if kwargs[name] is not default:
+            return False
+
+    return True
+
+
 def create_single_arg_callable_or_class_disambiguator(impl_function,
                                                       is_function_decorator,
                                                       is_class_decorator,
@@ -150,6 +207,8 @@ def create_single_arg_callable_or_class_disambiguator(impl_function,
     :param first_arg_received:
     :return:
     """
+    if isinstance(custom_disambiguator, Mapping):
+        custom_disambiguator = create_type_dispatch_disambiguator(custom_disambiguator)
 
     def _disambiguate_call(first_arg_received):
         """
@@ -160,11 +219,19 @@ def create_single_arg_callable_or_class_disambiguator(impl_function,
         :return:
         """
 
+        # the disambiguator is called directly by the dispatcher, which is called by the user (with signature trick)
+        # or by the generated signature-preserving function, that is skipped. So the user frame is at depth 3.
+
+        # index-based, if the import hook is installed
+        if utils_importhook._finder is not None:
+            res = disambiguate_using_import_index(3, first_arg_received)
+            if res is not None:
+                return res
+
         # introspection-based
         if enable_stack_introspection:
-            depth = 4 if signature_knowledge.use_signature_trick else 5
             try:
-                res = disambiguate_using_introspection(depth, first_arg_received)
+                res = disambiguate_using_introspection(3, first_arg_received)
                 if res is not None:
                     return res
             except IPythonException as e:
@@ -177,7 +244,7 @@ def create_single_arg_callable_or_class_disambiguator(impl_function,
                 pass
 
         # we want to eliminate as much as possible the args that cannot be first args
-        if callable(first_arg_received) and not isclass(first_arg_received) and not is_function_decorator:
+        if is_function_like(first_arg_received) and not isclass(first_arg_received) and not is_function_decorator:
             # that function cannot be a decorator target so it has to be the first argument
             return FirstArgDisambiguation.is_normal_arg
 
@@ -199,13 +266,96 @@ def create_single_arg_callable_or_class_disambiguator(impl_function,
     return _disambiguate_call
 
 
+def create_type_dispatch_disambiguator(table  # type: Mapping[type, Union[FirstArgDisambiguation, Callable]]
+                                       ):
+    """
+    Creates a disambiguator from a declarative `table` mapping types or ABCs to `FirstArgDisambiguation` values (or to
+    disambiguators, for types that require further inspection). This is what is used when a mapping is provided as
+    `custom_disambiguator`.
+
+    If the ambiguous argument is a class, the entry of its closest base class in the table is used. Otherwise the entry
+    of the closest base class of its type is used. When there is no matching entry, the argument is considered as the
+    decorated target, as when there is no custom disambiguator; an `object` entry can be used to change this.
+
+    The table is resolved with `functools.singledispatch`, so the result of the resolution is cached per type (and
+    invalidated when ABCs are registered): repeated disambiguation of the same type is a dictionary lookup.
+
+    :param table:
+    :return:
+    """
+    dispatcher = singledispatch(no_parenthesis)
+    for typ, res in table.items():
+        if isinstance(res, FirstArgDisambiguation):
+            res = _constant_disambiguator(res)
+        dispatcher.register(typ, res)
+    dispatch = dispatcher.dispatch
+
+    def _disambiguate_by_type(arg):
+        return dispatch(arg if isclass(arg) else type(arg))(arg)
+
+    _disambiguate_by_type.registry = dispatcher.registry
+    return _disambiguate_by_type
+
+
+def _constant_disambiguator(res  # type: FirstArgDisambiguation
+                            ):
+    """Returns a disambiguator always returning `res`"""
+    if res is _WITH_PARENTHESIS:
+        return with_parenthesis
+    elif res is _NO_PARENTHESIS:
+        return no_parenthesis
+    else:
+        return lambda arg: res
+
+
 class IPythonException(Exception):
     """Exception raised by `disambiguate_using_introspection` when the file where the decorator was used seems to be
     an ipython one"""
     pass
 
 
-SUPPORTS_INTROSPECTION = sys.version_info < (3, 8)
+SUPPORTS_INTROSPECTION = True
+"""Stack introspection is supported on all python versions: python 3.8+ relies on the bytecode of the caller, see
+`utils_introspection`, while older versions rely on line numbers and source code."""
+
+
+_SKIPPED_MODULES = ('decopatch.utils_codegen', 'decopatch.utils_lazy')
+"""Modules whose frames are skipped by `get_calling_frame`"""
+
+
+def get_calling_frame(depth):
+    """
+    Returns the frame at `depth` in the call stack (0 being the caller of this function), skipping the frames of the
+    signature-preserving functions generated by decopatch, and of the lazy decorator stubs.
+
+    :param depth:
+    :return:
+    """
+    calframe = sys._getframe(depth + 1)
+    while IMPL_NAME in calframe.f_globals or calframe.f_globals.get('__name__') in _SKIPPED_MODULES:
+        # signature-preserving function generated by decopatch, or `LazyDecorator.__call__`
+        calframe = calframe.f_back
+    return calframe
+
+
+def disambiguate_using_import_index(depth, first_arg):
+    """
+    Disambiguates the call situation between with-parenthesis and without-parenthesis using the decorator usage index
+    created by the import hook, see `utils_importhook.install_import_hook`. Returns None if the index is not available
+    for the calling module.
+
+    :param depth: the depth of the calling frame. Frames of functions generated by decopatch are skipped.
+    :param first_arg:
+    :return:
+    """
+    calframe = get_calling_frame(depth)
+    is_bare = utils_importhook.is_bare_decorator_line(calframe.f_code.co_filename, calframe.f_lineno)
+    if is_bare is None:
+        return None
+    elif is_bare:
+        return FirstArgDisambiguation.is_decorated_target
+    else:
+        return FirstArgDisambiguation.is_normal_arg
 
 
 def disambiguate_using_introspection(depth, first_arg):
@@ -213,18 +363,17 @@ def disambiguate_using_introspection(depth, first_arg):
     Tries to disambiguate the call situation betwen with-parenthesis and without-parenthesis using call stack
     introspection.
 
-    Uses inpect.stack() to get the source code where the decorator is being used. If the line starts with a '@' and does
-    not contain any '(', this is a no-parenthesis call. Otherwise it is a with-parenthesis call.
-    TODO it could be worth investigating how to improve this logic.. but remember that the decorator can also be renamed
-      so we can not check a full string expression
+    On python 3.8+, the bytecode of the calling frame is analyzed to determine if the call being executed is a bare
+    decorator application, see `utils_introspection.is_bare_decorator_application`. This does not require access to
+    the source code, and the result is cached per call site. If this can not be determined, None is returned.
 
-    :param depth:
+    On older versions, uses the line number of the calling frame and the source code where the decorator is being
+    used. If the line starts with a '@' and does not contain any '(', this is a no-parenthesis call. Otherwise it is a
+    with-parenthesis call.
+
+    :param depth: the depth of the calling frame. Frames of functions generated by decopatch are skipped.
     :return:
     """
-    if not SUPPORTS_INTROSPECTION:
-        # This does not seem to work reliably.
-        raise NotImplementedError("The beta stack introspection feature does not support python 3.8+. Please set"
-                                  " `enable_stack_introspection=False`.")
 
     # Unfortunately inspect.stack and inspect.currentframe are extremely slow
     # see https://gist.github.com/JettJones/c236494013f22723c1822126df944b12
@@ -236,7 +385,16 @@ def disambiguate_using_introspection(depth, first_arg):
     # filename = calframe[depth][1]
     # ----
     # this is fast :)
-    calframe = sys._getframe(depth)
+    calframe = get_calling_frame(depth)
+
+    if SUPPORTS_BYTECODE_INTROSPECTION:
+        is_decorator_call_ = is_bare_decorator_application(calframe.f_code, calframe.f_lasti)
+        if is_decorator_call_ is None:
+            return None
+        elif is_decorator_call_:
+            return FirstArgDisambiguation.is_decorated_target
+        else:
+            return FirstArgDisambiguation.is_normal_arg
 
     try:
         # if target is a function that should work
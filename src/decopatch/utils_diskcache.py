@@ -0,0 +1,193 @@
+import marshal
+import os
+import sys
+import threading
+from zlib import adler32, crc32
+
+try:  # python 3.4+
+    from importlib.util import MAGIC_NUMBER
+except ImportError:
+    from imp import get_magic
+    MAGIC_NUMBER = get_magic()
+
+try:  # python 3.5+
+    from typing import Any, Optional
+except ImportError:
+    pass
+
+
+CACHE_DIR_ENV_VAR = 'DECOPATCH_CODE_CACHE_DIR'
+"""Environment variable enabling the on-disk code cache when set, with the path of the cache directory"""
+
+CACHE_MAXSIZE_ENV_VAR = 'DECOPATCH_CODE_CACHE_MAXSIZE'
+"""Environment variable setting the maximum size of the on-disk code cache, in bytes"""
+
+DEFAULT_CACHE_MAXSIZE = 32 * 1024 * 1024
+"""Default maximum size of the on-disk code cache, in bytes"""
+
+CACHE_SUFFIX = '.decopatch-code'
+"""Suffix of the cache entry files"""
+
+_EVICTION_PERIOD = 64
+"""Number of entries written by a process between two checks of the size of the cache directory"""
+
+_CACHE_TAG = getattr(getattr(sys, 'implementation', None), 'cache_tag', None) or 'py%s%s' % sys.version_info[:2]
+
+_cache_dir = None  # type: Optional[str]
+_maxsize = DEFAULT_CACHE_MAXSIZE
+_nb_writes = 0
+
+
+def set_code_cache_dir(path,         # type: Optional[str]
+                       maxsize=None  # type: Optional[int]
+                       ):
+    """
+    Enables the on-disk cache of the code objects compiled by decopatch, in directory `path`, or disables it if `path`
+    is None. It can also be enabled with environment variable `DECOPATCH_CODE_CACHE_DIR`.
+
+    When it is enabled, each source compiled by `get_function_code` is stored in the cache directory with `marshal`, in
+    a file named after the hash of the source and of the interpreter version (like `__pycache__`). Subsequent processes
+    load the code object from this file instead of compiling the source again. Entries are written atomically, so the
+    directory can safely be shared by several processes. When its size exceeds `maxsize`, the least recently used
+    entries are removed.
+
+    :param path: the cache directory. It is created if needed
+    :param maxsize: the maximum size of the cache directory in bytes. By default, the value of environment variable
+        `DECOPATCH_CODE_CACHE_MAXSIZE`, or 32MiB
+    :return:
+    """
+    global _cache_dir, _maxsize
+    if maxsize is None:
+        maxsize = int(os.environ.get(CACHE_MAXSIZE_ENV_VAR, DEFAULT_CACHE_MAXSIZE))
+    _maxsize = maxsize
+    _cache_dir = None if path is None else os.path.abspath(path)
+
+
+def get_code_cache_dir():
+    # type: (...) -> Optional[str]
+    """Returns the directory of the on-disk code cache, or None if it is disabled. See `set_code_cache_dir`"""
+    return _cache_dir
+
+
+def _get_entry_path(source  # type: str
+                    ):
+    # type: (...) -> str
+    """Returns the path of the cache entry for `source`"""
+    # zlib is much cheaper to import than hashlib. Collisions are detected in `load_code`
+    data = MAGIC_NUMBER + source.encode('utf-8')
+    key = "%08x%08x" % (crc32(data) & 0xffffffff, adler32(data) & 0xffffffff)
+    return os.path.join(_cache_dir, "%s.%s%s" % (key, _CACHE_TAG, CACHE_SUFFIX))
+
+
+def load_code(source  # type: str
+              ):
+    # type: (...) -> Optional[Any]
+    """
+    Returns the code object stored in the on-disk cache for `source`, or None if there is none.
+
+    :param source:
+    :return:
+    """
+    path = _get_entry_path(source)
+    try:
+        with open(path, 'rb') as f:
+            stored_source, code = marshal.load(f)
+    except (OSError, IOError, EOFError, ValueError, TypeError):
+        return None
+    if stored_source != source:
+        # hash collision
+        return None
+
+    # mark the entry as recently used
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return code
+
+
+def save_code(source,  # type: str
+              code     # type: Any
+              ):
+    """
+    Stores `code`, the code object compiled from `source`, in the on-disk cache. The entry file is replaced atomically,
+    and errors are ignored: if the cache directory is not writable, sources will simply be compiled each time.
+
+    :param source:
+    :param code:
+    :return:
+    """
+    global _nb_writes
+    path = _get_entry_path(source)
+    tmp_path = "%s.%s.%s.tmp" % (path, os.getpid(), threading.current_thread().ident)
+    try:
+        try:
+            with open(tmp_path, 'wb') as f:
+                marshal.dump((source, code), f)
+        except (OSError, IOError):
+            # the directory may not exist yet
+            os.makedirs(_cache_dir)
+            with open(tmp_path, 'wb') as f:
+                marshal.dump((source, code), f)
+        os.replace(tmp_path, path)
+    except (OSError, IOError):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return
+
+    _nb_writes += 1
+    if _nb_writes % _EVICTION_PERIOD == 1:
+        evict()
+
+
+def evict(maxsize=None  # type: Optional[int]
+          ):
+    # type: (...) -> int
+    """
+    Removes the least recently used entries of the on-disk code cache, until its size is below `maxsize`. This is
+    done automatically from time to time when entries are written.
+
+    :param maxsize: the maximum size of the cache directory in bytes. By default the one set with `set_code_cache_dir`.
+        Use 0 to clear the cache.
+    :return: the number of entries removed
+    """
+    if _cache_dir is None:
+        return 0
+    if maxsize is None:
+        maxsize = _maxsize
+
+    entries = []
+    total_size = 0
+    try:
+        names = os.listdir(_cache_dir)
+    except OSError:
+        return 0
+    for name in names:
+        if name.endswith(CACHE_SUFFIX):
+            try:
+                st = os.stat(os.path.join(_cache_dir, name))
+            except OSError:
+                # removed concurrently
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+            total_size += st.st_size
+
+    nb_removed = 0
+    if total_size > maxsize:
+        entries.sort()
+        for _, size, name in entries:
+            try:
+                os.remove(os.path.join(_cache_dir, name))
+                nb_removed += 1
+            except OSError:
+                pass
+            total_size -= size
+            if total_size <= maxsize:
+                break
+    return nb_removed
+
+
+if os.environ.get(CACHE_DIR_ENV_VAR):
+    set_code_cache_dir(os.environ[CACHE_DIR_ENV_VAR])
@@ -0,0 +1,227 @@
+import ast
+import marshal
+import os
+import sys
+
+try:  # python 3.4+
+    from importlib.machinery import PathFinder, SourceFileLoader
+    from importlib.util import cache_from_source
+except ImportError:
+    PathFinder = SourceFileLoader = object
+
+try:  # python 3.5+
+    from typing import Optional, Dict, Iterable, Set
+except ImportError:
+    pass
+
+
+SUPPORTS_IMPORT_HOOK = sys.version_info >= (3, 8)
+"""The index relies on the line numbers of the decorator calls, that are the ones of the decorator expressions since
+python 3.8"""
+
+INDEX_SUFFIX = '.decopatch'
+"""Suffix of the decorator usage index files, stored next to the bytecode cache files"""
+
+_INDEX_FORMAT = 1
+
+_finder = None
+"""The `_DecoratorIndexFinder` installed in `sys.meta_path`, if any"""
+
+_indexes = dict()  # type: Dict[str, Optional[Dict[int, Optional[bool]]]]
+"""In-memory cache of the decorator usage indexes, by source file name"""
+
+_hooked_files = set()  # type: Set[str]
+"""Source file names of the modules loaded by the import hook. Only these modules are indexed"""
+
+
+def install_import_hook(*packages  # type: str
+                        ):
+    """
+    Installs an import hook that parses the source of each module when it is compiled, and records for each decorator
+    expression whether it is bare (`@foo_decorator`) or called (`@foo_decorator(...)`). The generated decorators then
+    rely on this index to disambiguate their usage by call site, instead of inspecting their arguments. Usages that
+    are not decorator expressions, such as `foo_decorator(a)`, and usages in modules that were not loaded by the hook
+    are disambiguated as usual.
+
+    The index of each module is stored next to its bytecode cache file, so that warm imports (from the bytecode cache)
+    do not parse the source. If a module was already compiled before the hook was installed, its index is created the
+    first time it is needed.
+
+    :param packages: the names of the packages whose modules should be indexed at import time. At least one is
+        required: modules of other packages are not handled by the hook.
+    :return:
+    """
+    global _finder
+    if not SUPPORTS_IMPORT_HOOK:
+        raise NotImplementedError("The decopatch import hook requires python 3.8+")
+    if not packages:
+        raise ValueError("At least one package name should be provided to `install_import_hook`")
+    uninstall_import_hook()
+    _finder = _DecoratorIndexFinder(packages)
+    sys.meta_path.insert(0, _finder)
+
+
+def uninstall_import_hook():
+    """
+    Uninstalls the import hook installed with `install_import_hook`, if any. Decorators do not rely on the decorator
+    usage index anymore.
+
+    :return:
+    """
+    global _finder
+    if _finder is not None:
+        try:
+            sys.meta_path.remove(_finder)
+        except ValueError:
+            pass
+        _finder = None
+    _indexes.clear()
+    _hooked_files.clear()
+
+
+def is_import_hook_installed():
+    """Returns True if the import hook is installed, see `install_import_hook`"""
+    return _finder is not None
+
+
+class _DecoratorIndexFinder(object):
+    """
+    A meta path finder delegating to the default `PathFinder`, but replacing the loader of source modules with an
+    `_IndexingSourceFileLoader`
+    """
+    def __init__(self,
+                 packages  # type: Iterable[str]
+                 ):
+        self.packages = tuple(packages)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if not any(fullname == p or fullname.startswith(p + '.') for p in self.packages):
+            return None
+        spec = PathFinder.find_spec(fullname, path, target)
+        if spec is not None and type(spec.loader) is SourceFileLoader:
+            spec.loader = _IndexingSourceFileLoader(spec.loader.name, spec.loader.path)
+        return spec
+
+
+class _IndexingSourceFileLoader(SourceFileLoader):
+    """A source file loader that creates the decorator usage index of the modules it compiles"""
+
+    def get_code(self, fullname):
+        _hooked_files.add(self.path)
+        return super(_IndexingSourceFileLoader, self).get_code(fullname)
+
+    def source_to_code(self, data, path, **kwargs):
+        try:
+            tree = ast.parse(data, path)
+        except SyntaxError:
+            # let the default implementation raise the error
+            return super(_IndexingSourceFileLoader, self).source_to_code(data, path, **kwargs)
+
+        index = _create_index(tree)
+        try:
+            st = self.path_stats(path)
+            _save_index(path, int(st['mtime']), st['size'], index)
+        except (OSError, NotImplementedError):
+            pass
+        _indexes[path] = index
+
+        # compile the tree, so that the source is only parsed once
+        return compile(tree, path, 'exec', dont_inherit=True, optimize=kwargs.get('_optimize', -1))
+
+
+def _create_index(tree):
+    # type: (...) -> Dict[int, Optional[bool]]
+    """
+    Creates the decorator usage index of a module from its AST: a dictionary where each line number spanned by a
+    decorator expression is associated with True if the decorator is bare, and False if it is called. The first line of
+    decorated `def`/`class` statements is associated with None, since calls on this line can not be attributed. Other
+    lines are not in the index.
+    """
+    index = dict()
+    for node in ast.walk(tree):
+        decorators = getattr(node, 'decorator_list', None)
+        if decorators:
+            for d in decorators:
+                is_bare = not isinstance(d, ast.Call)
+                for lineno in range(d.lineno, d.end_lineno + 1):
+                    index[lineno] = is_bare
+            index[node.lineno] = None
+    return index
+
+
+def _get_index_path(source_path):
+    """Returns the path of the decorator usage index file for `source_path`, next to its bytecode cache file"""
+    return os.path.splitext(cache_from_source(source_path))[0] + INDEX_SUFFIX
+
+
+def _save_index(source_path, mtime, size, index):
+    """Saves the decorator usage index of `source_path`. The index file is replaced atomically."""
+    index_path = _get_index_path(source_path)
+    tmp_path = "%s.%s.tmp" % (index_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            marshal.dump((_INDEX_FORMAT, mtime, size, index), f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # read-only location: the index will be kept in memory only
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _load_or_create_index(source_path):
+    # type: (...) -> Optional[Dict[int, Optional[bool]]]
+    """
+    Returns the decorator usage index of `source_path`, from its index file if it is up to date, or by parsing the
+    source. Returns None if the source is not available.
+    """
+    try:
+        st = os.stat(source_path)
+    except OSError:
+        # not a file, for example '<string>'
+        return None
+    mtime, size = int(st.st_mtime), st.st_size
+
+    try:
+        with open(_get_index_path(source_path), 'rb') as f:
+            fmt, index_mtime, index_size, index = marshal.load(f)
+        if (fmt, index_mtime, index_size) == (_INDEX_FORMAT, mtime, size):
+            return index
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    try:
+        with open(source_path, 'rb') as f:
+            tree = ast.parse(f.read(), source_path)
+    except (OSError, SyntaxError, ValueError):
+        return None
+    index = _create_index(tree)
+    _save_index(source_path, mtime, size, index)
+    return index
+
+
+def is_bare_decorator_line(filename,  # type: str
+                           lineno     # type: int
+                           ):
+    # type: (...) -> Optional[bool]
+    """
+    Returns True if a call made at line `lineno` of `filename` is the application of a bare decorator, False if it is
+    the call of a decorator with parenthesis, and None if this can not be determined: if the line is not part of a
+    decorator expression, or if `filename` is not the source of a module loaded by the import hook.
+
+    :param filename:
+    :param lineno:
+    :return:
+    """
+    if filename not in _hooked_files:
+        return None
+    try:
+        index = _indexes[filename]
+    except KeyError:
+        index = _indexes[filename] = _load_or_create_index(filename)
+
+    if index is None:
+        return None
+    return index.get(lineno)
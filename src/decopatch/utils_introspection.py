@@ -0,0 +1,205 @@
+import sys
+from collections import namedtuple
+
+try:  # python 3.4+
+    from dis import get_instructions, stack_effect, HAVE_ARGUMENT
+except ImportError:
+    get_instructions = None
+
+try:  # python 3.5+
+    from typing import Optional, List, Any
+except ImportError:
+    pass
+
+
+SUPPORTS_BYTECODE_INTROSPECTION = sys.version_info >= (3, 8)
+"""The bytecode-based introspection engine is only used on python 3.8+, where the source-based one is not reliable"""
+
+USES_POSITIONS = SUPPORTS_BYTECODE_INTROSPECTION and hasattr((lambda: None).__code__, 'co_positions')
+"""On python 3.11+ the positions of the instructions are used. On 3.8 to 3.10 the instruction stream is analyzed"""
+
+INTROSPECTION_CACHE_MAXSIZE = 4096
+"""Maximum number of call sites for which the verdict of `is_bare_decorator_application` is kept"""
+
+_introspection_cache = dict()
+_introspection_cache_stats = [0, 0]  # hits, misses
+
+IntrospectionCacheInfo = namedtuple('IntrospectionCacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+
+_SKIPPED_OPNAMES = {'PRECALL', 'KW_NAMES', 'CACHE', 'EXTENDED_ARG', 'NOP'}
+"""Instructions that can lie between the instruction producing the last argument and the call itself"""
+
+
+def get_introspection_cache_info():
+    """
+    Returns statistics about the cache of `is_bare_decorator_application`.
+
+    :return: an `IntrospectionCacheInfo` namedtuple (hits, misses, maxsize, currsize)
+    """
+    return IntrospectionCacheInfo(_introspection_cache_stats[0], _introspection_cache_stats[1],
+                                  INTROSPECTION_CACHE_MAXSIZE, len(_introspection_cache))
+
+
+def clear_introspection_cache():
+    """
+    Clears the cache of `is_bare_decorator_application` and its statistics.
+
+    :return:
+    """
+    _introspection_cache.clear()
+    _introspection_cache_stats[0] = _introspection_cache_stats[1] = 0
+
+
+def is_bare_decorator_application(code,
+                                  lasti  # type: int
+                                  ):
+    # type: (...) -> Optional[bool]
+    """
+    Returns True if the call being executed at offset `lasti` of `code` is the application of a decorator written
+    without parenthesis (`@foo_decorator` on top of a `def` or `class` statement), False if it is any other call (for
+    example `@foo_decorator(a)` or `foo_decorator(a)`), and None if this can not be determined.
+
+    The decision only relies on the bytecode, so it does not require access to the source file. It is made by looking
+    at the instruction producing the single argument of the call: in a bare decorator application, this argument is
+    the function created by a `def` statement, the class created by a `class` statement, or the result of the next
+    decorator. On python 3.11+ this is determined from the positions of the instructions (`co_positions`), otherwise
+    from the instruction stream.
+
+    The verdict is cached per (code object, offset), so this has a near-constant cost per call site.
+
+    :param code: the code object of the calling frame
+    :param lasti: the offset of the last instruction executed in the calling frame (`frame.f_lasti`)
+    :return:
+    """
+    key = id(code), lasti
+    try:
+        cached_code, res = _introspection_cache[key]
+        if cached_code is code:
+            _introspection_cache_stats[0] += 1
+            return res
+    except KeyError:
+        pass
+
+    _introspection_cache_stats[1] += 1
+    try:
+        instructions = list(get_instructions(code))
+        call_idx = _get_instruction_index(instructions, lasti)
+        if USES_POSITIONS:
+            res = _is_bare_application_using_positions(instructions, call_idx)
+        else:
+            res = _is_bare_application_using_stream(instructions, call_idx)
+    except Exception:
+        # be conservative: unknown bytecode patterns should never break the decorators
+        res = None
+
+    if len(_introspection_cache) >= INTROSPECTION_CACHE_MAXSIZE:
+        try:
+            del _introspection_cache[next(iter(_introspection_cache))]
+        except (KeyError, RuntimeError, StopIteration):
+            pass
+    # the code object is stored so that a recycled id is never mistaken for the same call site
+    _introspection_cache[key] = code, res
+    return res
+
+
+def _get_instruction_index(instructions,  # type: List[Any]
+                           lasti          # type: int
+                           ):
+    """
+    Returns the index of the instruction executed at offset `lasti`. Note that on python 3.11+ `lasti` may point to
+    one of the inline cache entries following the instruction, that are not listed by `get_instructions`.
+    """
+    idx = None
+    for i, ins in enumerate(instructions):
+        if ins.offset > lasti:
+            break
+        idx = i
+    if idx is None or not instructions[idx].opname.startswith('CALL'):
+        raise ValueError("Offset %s is not a call" % lasti)
+    return idx
+
+
+def _get_producer_index(instructions,  # type: List[Any]
+                        call_idx       # type: int
+                        ):
+    """Returns the index of the instruction producing the last argument of the call at `call_idx`"""
+    idx = call_idx - 1
+    while instructions[idx].opname in _SKIPPED_OPNAMES:
+        idx -= 1
+    return idx
+
+
+def _is_bare_application_using_positions(instructions,  # type: List[Any]
+                                         call_idx       # type: int
+                                         ):
+    # type: (...) -> Optional[bool]
+    """
+    Python 3.11+ version. The positions of a call span the callee and the parenthesis if any. In a bare decorator
+    application, the instruction producing the argument (the function or class creation, or the next decorator) is
+    located after the decorator expression, while all the arguments of a usual call are located inside the call.
+    """
+    call_pos = instructions[call_idx].positions
+    producer_pos = instructions[_get_producer_index(instructions, call_idx)].positions
+    if None in (call_pos.end_lineno, call_pos.end_col_offset, producer_pos.lineno, producer_pos.col_offset):
+        # positions are not available, for example with -X no_debug_ranges
+        return None
+
+    return (producer_pos.lineno, producer_pos.col_offset) >= (call_pos.end_lineno, call_pos.end_col_offset)
+
+
+def _is_bare_application_using_stream(instructions,  # type: List[Any]
+                                      call_idx       # type: int
+                                      ):
+    # type: (...) -> Optional[bool]
+    """
+    Python 3.8 to 3.10 version. The call is a bare decorator application if it receives a single argument, and this
+    argument is the function created by a `def` statement (a `MAKE_FUNCTION` of a code object that is not a lambda nor
+    a comprehension), the class created by a `class` statement (a call to `LOAD_BUILD_CLASS`), or the result of another
+    bare decorator application.
+    """
+    call = instructions[call_idx]
+    producer_idx = _get_producer_index(instructions, call_idx)
+    if call.opname != 'CALL_FUNCTION' or call.arg != 1:
+        # a decorator application is always a call with a single positional argument
+        return False
+
+    producer = instructions[producer_idx]
+    if producer.opname == 'MAKE_FUNCTION':
+        # find the code object of the function: it is loaded just before its qualname
+        for ins in instructions[max(producer_idx - 2, 0):producer_idx][::-1]:
+            if ins.opname == 'LOAD_CONST' and hasattr(ins.argval, 'co_name'):
+                return not ins.argval.co_name.startswith('<')
+        return None
+
+    elif producer.opname.startswith('CALL'):
+        callee_idx = _get_expression_start(instructions, producer_idx)
+        if callee_idx is None:
+            return None
+        elif instructions[callee_idx].opname == 'LOAD_BUILD_CLASS':
+            return True
+        # stacked decorators: the argument is the result of the next decorator
+        return _is_bare_application_using_stream(instructions, producer_idx)
+
+    else:
+        return False
+
+
+def _get_expression_start(instructions,  # type: List[Any]
+                          end_idx        # type: int
+                          ):
+    # type: (...) -> Optional[int]
+    """
+    Returns the index of the first instruction of the expression whose value is produced by the instruction at
+    `end_idx`, by walking back the instruction stream until exactly one item has been pushed on the stack. Returns None
+    if there is a jump target in between.
+    """
+    pushed = 0
+    for idx in range(end_idx, -1, -1):
+        ins = instructions[idx]
+        pushed += stack_effect(ins.opcode, ins.arg if ins.opcode >= HAVE_ARGUMENT else None)
+        if pushed == 1:
+            return idx
+        elif ins.is_jump_target:
+            # the expression does not execute linearly
+            return None
+    return None
@@ -0,0 +1,333 @@
+import gc
+import sys
+from collections import namedtuple
+from inspect import isgeneratorfunction
+from types import FunctionType
+from weakref import WeakSet
+
+try:  # python 3.3+
+    from inspect import signature, Parameter, Signature
+except ImportError:
+    from funcsigs import signature, Parameter, Signature
+
+try:  # python 3.5+
+    from inspect import iscoroutinefunction
+except ImportError:
+    def iscoroutinefunction(f):
+        return False
+
+try:  # python 3.6+
+    from inspect import isasyncgenfunction
+except ImportError:
+    def isasyncgenfunction(f):
+        return False
+
+try:  # python 3.5+
+    from typing import Any, Callable, Dict, Optional, Tuple
+except ImportError:
+    pass
+
+from decopatch.utils_codegen import GENERATED_PREFIX, IMPL_NAME, LOCALS_NAME, ASYNC_FOR_BUILTINS, TEMPLATES_ENGINE, \
+    get_codegen_engine, get_function_code, get_template_code, make_function, get_wrapper_attrs, get_wrapper_metadata, \
+    _code_cache
+
+
+_pending_decorators = WeakSet()
+"""The `LazyDecorator` objects whose decorator has not been created yet"""
+
+_pending_trampolines = WeakSet()
+"""The trampolines created by `create_trampoline` that have not been replaced by their wrapper yet"""
+
+
+class LazyDecorator(object):
+    """
+    Holds the state of a stub created by `create_lazy_decorator`: the decorator is created by `get_decorator` when it
+    is needed for the first time. It is the `__wrapped__` attribute of the stub.
+
+    The name, docstring and module of the implementation function are copied on this object, and its `__signature__`
+    is computed lazily.
+
+    When the decorator is created, the stub *becomes* the decorator if possible, see `get_decorator`.
+
+    Note: if the decorator is needed concurrently for the first time from several threads, it may be created several
+    times. This is harmless since all are equivalent.
+    """
+    def __init__(self,
+                 create,         # type: Callable[[], Callable]
+                 impl_function,  # type: Callable
+                 ):
+        """
+        :param create: a function without arguments, creating the actual decorator
+        :param impl_function: the decorator implementation function, used for the metadata
+        """
+        self._create = create
+        self._decorator = None
+        self._stub = None
+        _pending_decorators.add(self)
+        self.__name__ = impl_function.__name__
+        self.__doc__ = impl_function.__doc__
+        self.__module__ = impl_function.__module__
+        try:
+            self.__qualname__ = impl_function.__qualname__
+        except AttributeError:
+            pass
+
+    def get_decorator(self):
+        """
+        Returns the actual decorator, creating it if needed.
+
+        When it is created, if the decorator is a function generated by decopatch without closure, the stub *becomes*
+        the decorator as trampolines do (see `create_trampoline`), so that subsequent calls to the stub do not go
+        through any indirection. Otherwise the stub keeps delegating to the decorator.
+
+        :return:
+        """
+        d = self._decorator
+        if d is None:
+            create = self._create
+            if create is None:
+                # created concurrently by another thread
+                return self._decorator
+            d = self._decorator = create()
+            self._create = None
+            _pending_decorators.discard(self)
+            if self._stub is not None and _can_become(d):
+                _become(self._stub, d)
+        return d
+
+    @property
+    def __signature__(self):
+        return signature(self.get_decorator())
+
+    def __call__(self, *args, **kwargs):
+        return self.get_decorator()(*args, **kwargs)
+
+    def __repr__(self):
+        return "<lazy decorator %s.%s>" % (self.__module__, getattr(self, '__qualname__', self.__name__))
+
+
+_STUB_SIGNATURE = Signature([Parameter('args', kind=Parameter.VAR_POSITIONAL),
+                             Parameter('kwargs', kind=Parameter.VAR_KEYWORD)])
+"""Signature of the lazy decorator stubs and of the trampolines"""
+
+
+def create_lazy_decorator(create,         # type: Callable[[], Callable]
+                          impl_function,  # type: Callable
+                          engine=None,    # type: Optional[str]
+                          ):
+    """
+    Creates the cheap stub returned by `decorator(lazy=True)` (and `function_decorator`/`class_decorator`). The
+    signature analysis and the code generation performed by `create_decorator` are deferred until the decorator is
+    used for the first time. After that, the stub becomes the created decorator when possible, or only delegates to
+    it (see `LazyDecorator.get_decorator`).
+
+    The stub is a minimal generated function carrying the name, docstring and module of `impl_function`, so that it
+    behaves as the actual decorator when it is used as a class attribute for example. Its `__wrapped__` is the
+    `LazyDecorator` holding its state, whose `__signature__` is computed lazily: `help()` and `inspect.signature`
+    follow it, and report the signature of the actual decorator.
+
+    :param create: a function without arguments, creating the actual decorator
+    :param impl_function: the decorator implementation function, used for the metadata
+    :param engine: the code generation engine used to create the stub, or None for the default one
+    :return:
+    """
+    lazy_decorator = LazyDecorator(create, impl_function)
+
+    def _materialize(args, kwargs):
+        """Creates the actual decorator, and calls it"""
+        return lazy_decorator.get_decorator()(*args, **kwargs)
+
+    # note: `IMPL_NAME` is in the namespace of the stub so that `get_calling_frame` skips its frames, as the ones of
+    # all functions generated by decopatch
+    lazy_decorator._stub = _create_stub('function', _materialize, {IMPL_NAME: lazy_decorator}, engine,
+                                        func_name=impl_function.__name__,
+                                        qualname=getattr(impl_function, '__qualname__', None),
+                                        doc=impl_function.__doc__, module_name=impl_function.__module__,
+                                        attrs={'__wrapped__': lazy_decorator})
+    return lazy_decorator._stub
+
+
+def _can_become(f):
+    """Returns True if a stub can *become* `f` with `_become`: `f` should be a function generated by decopatch, that
+    does not use closures"""
+    return isinstance(f, FunctionType) and f.__closure__ is None and IMPL_NAME in f.__globals__
+
+
+def _become(stub, f):
+    """
+    Makes `stub` *become* function `f`: its code, defaults and annotations are replaced with the ones of `f`, and its
+    namespace is updated with the namespace of `f`. All references to `stub` remain valid.
+
+    Note: the names in the namespace of `f` should not conflict with `_MATERIALIZE_NAME`, so that frames that are still
+    executing the stub code concurrently will correctly call the materialization function again.
+    """
+    stub.__globals__.update(f.__globals__)
+    for name in ('__defaults__', '__kwdefaults__', '__annotations__'):
+        try:
+            setattr(stub, name, getattr(f, name))
+        except AttributeError:
+            # python 2: no keyword-only arguments nor annotations
+            pass
+    stub.__code__ = f.__code__
+
+
+_MATERIALIZE_NAME = GENERATED_PREFIX + 'materialize_'
+"""Name of the function creating the actual decorator or wrapper and calling it, in the namespace of lazy decorator
+stubs and of trampolines. It has to be different from all the names used in the decorators and wrappers"""
+
+_REPLACE_NAME = GENERATED_PREFIX + 'replace_'
+"""Name of the function creating the actual wrapper without calling it, in the namespace of trampolines"""
+
+if sys.version_info >= (3, 3):
+    _GENERATOR_STUB_BODY = ["return (yield from %s(args, kwargs))" % _MATERIALIZE_NAME]
+else:
+    _GENERATOR_STUB_BODY = ["for %sitem_ in %s(args, kwargs):" % (GENERATED_PREFIX, _MATERIALIZE_NAME),
+                            "    yield %sitem_" % GENERATED_PREFIX]
+
+_STUB_BODIES = {
+    'function': ["return %s(args, kwargs)" % _MATERIALIZE_NAME],
+    'coroutine': ["return await %s(args, kwargs)" % _MATERIALIZE_NAME],
+    'generator': _GENERATOR_STUB_BODY,
+    'async_generator': ["async for %sitem_ in %s(args, kwargs):" % (GENERATED_PREFIX, _MATERIALIZE_NAME),
+                        "    yield %sitem_" % GENERATED_PREFIX],
+}
+"""Body of the stubs created by `_create_stub` with the 'compile' engine, for each kind"""
+
+
+def _create_stub(kind,         # type: str
+                 materialize,  # type: Callable[[Tuple[Any, ...], Dict[str, Any]], Any]
+                 evaldict,     # type: Dict[str, Any]
+                 engine,       # type: Optional[str]
+                 func_name, qualname, doc, module_name, attrs
+                 ):
+    """
+    Creates a function with signature `(*args, **kwargs)` calling `materialize(args, kwargs)`, with the code
+    generation engine `engine`. With the 'templates' engine, no code is compiled.
+
+    :param kind: 'function', 'coroutine' (`materialize` returns an awaitable), 'generator' (`materialize` returns an
+        iterable) or 'async_generator' (`materialize` returns an asynchronous iterable)
+    :param materialize:
+    :param evaldict: the namespace of the stub. `materialize` is added to it under name `_MATERIALIZE_NAME`.
+    :param engine: the code generation engine, or None for the default one
+    :return:
+    """
+    if get_codegen_engine(engine) == TEMPLATES_ENGINE:
+        def _materialize_arguments(arguments):
+            """The template code sends the dictionary of its arguments"""
+            return materialize(arguments['args'], arguments['kwargs'])
+
+        evaldict[_MATERIALIZE_NAME] = _materialize_arguments
+        evaldict[LOCALS_NAME] = locals
+        code = get_template_code(_STUB_SIGNATURE, kind, impl_name=_MATERIALIZE_NAME)
+    else:
+        evaldict[_MATERIALIZE_NAME] = materialize
+        if kind == 'async_generator':
+            evaldict.update(ASYNC_FOR_BUILTINS)
+        code = get_function_code("*args, **kwargs", _STUB_BODIES[kind],
+                                 is_async=kind in ('coroutine', 'async_generator'))
+
+    return make_function(code, evaldict, _STUB_SIGNATURE, func_name=func_name, qualname=qualname, doc=doc,
+                         module_name=module_name, attrs=attrs)
+
+
+def create_trampoline(decorated,
+                      create_wrapper,  # type: Callable[[], Callable]
+                      kind_of=(),      # type: Tuple[Any, ...]
+                      engine=None,     # type: Optional[str]
+                      ):
+    """
+    Creates a minimal trampoline function to use instead of the wrapper of `decorated`, until it is called for the
+    first time. At that time, `create_wrapper()` is called to create the actual wrapper, and the trampoline *becomes*
+    this wrapper: its code, defaults and annotations are replaced with the wrapper's ones, and its namespace is
+    updated with the wrapper's namespace. This is possible because functions generated by decopatch do not use
+    closures. So all references to the trampoline remain valid and subsequent calls do not go through any indirection.
+
+    The trampoline carries the metadata of `decorated` (name, docstring, module, attributes, `__wrapped__`). Since
+    `inspect.signature` and `help()` follow `__wrapped__`, they report the right signature without the need to create
+    the wrapper. Note that the signature of `decorated` is not even computed when the trampoline is created.
+
+    :param decorated: the object to wrap
+    :param create_wrapper: a function without arguments creating the actual wrapper, that should not use closures.
+    :param kind_of: the functions that determine the kind of the trampoline: if one of them is an asynchronous
+        generator function (resp. a generator function, a coroutine function), the trampoline will be one too.
+    :param engine: the code generation engine used to create the trampoline, or None for the default one
+    :return:
+    """
+    if any(isasyncgenfunction(f) for f in kind_of):
+        kind = 'async_generator'
+    elif any(isgeneratorfunction(f) for f in kind_of):
+        kind = 'generator'
+    elif any(iscoroutinefunction(f) for f in kind_of):
+        kind = 'coroutine'
+    else:
+        kind = 'function'
+
+    def _replace():
+        """Replaces the trampoline with the actual wrapper, if this was not already done. Returns True if it was"""
+        if trampoline.__code__ is not trampoline_code:
+            return False
+        _become(trampoline, create_wrapper())
+        _pending_trampolines.discard(trampoline)
+        return True
+
+    def _materialize(args, kwargs):
+        """Replaces the trampoline with the actual wrapper, and calls it"""
+        _replace()
+        return trampoline(*args, **kwargs)
+
+    func_name, qualname, doc, module_name = get_wrapper_metadata(decorated)
+    trampoline = _create_stub(kind, _materialize, {_REPLACE_NAME: _replace}, engine, func_name=func_name,
+                              qualname=qualname, doc=doc, module_name=module_name, attrs=get_wrapper_attrs(decorated))
+    trampoline_code = trampoline.__code__
+    _pending_trampolines.add(trampoline)
+    return trampoline
+
+
+WarmupReport = namedtuple('WarmupReport', ('decorators', 'wrappers', 'codes', 'specs', 'collected', 'frozen'))
+
+
+def warmup(freeze=False  # type: bool
+           ):
+    # type: (...) -> WarmupReport
+    """
+    Performs now all the work that decopatch would otherwise perform lazily: creates the decorators of all the
+    `LazyDecorator` stubs that were not used yet (`lazy=True`), and replaces all the trampolines that were not called
+    yet with their wrapper (`lazy_wrapping=True`). This fills the caches of decorator specifications and of code
+    objects as well.
+
+    This is meant to be called in the master process of pre-fork servers (gunicorn, celery...), after the application
+    has been imported and before the workers are forked. Otherwise each worker would create these objects separately,
+    which breaks the sharing of memory pages between processes (copy-on-write).
+
+    Once everything is created, a full garbage collection is performed so that the temporary objects created meanwhile
+    are not kept. If `freeze` is True, `gc.freeze()` (python 3.7+) is then called, so that all the objects that
+    currently exist are ignored by future collections, and their memory pages are not written to by the garbage
+    collector of the workers. Note that this concerns all the objects of the process, not only decopatch's ones.
+
+    Errors raised when creating a decorator or a wrapper are propagated, as they would be on first use.
+
+    :param freeze: if True, `gc.freeze()` is called at the end
+    :return: a `WarmupReport` named tuple (decorators, wrappers, codes, specs, collected, frozen): the number of
+        decorators and wrappers created, the number of code objects and of decorator specifications in cache, the
+        number of objects collected by the garbage collector, and a boolean indicating if `gc.freeze()` was called.
+    """
+    from decopatch.utils_modes import get_spec_cache_info
+
+    nb_decorators = 0
+    for lazy_decorator in list(_pending_decorators):
+        if lazy_decorator._decorator is None:
+            lazy_decorator.get_decorator()
+            nb_decorators += 1
+
+    nb_wrappers = 0
+    for trampoline in list(_pending_trampolines):
+        if trampoline.__globals__[_REPLACE_NAME]():
+            nb_wrappers += 1
+
+    collected = gc.collect()
+    frozen = freeze and hasattr(gc, 'freeze')
+    if frozen:
+        gc.freeze()
+
+    return WarmupReport(nb_decorators, nb_wrappers, len(_code_cache), get_spec_cache_info().currsize, collected,
+                        frozen)
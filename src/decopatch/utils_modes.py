@@ -1,12 +1,53 @@
-from makefun import remove_signature_parameters, with_signature, wraps
+import sys
+from collections import namedtuple
+from functools import partial
+from weakref import WeakKeyDictionary
+
+from makefun import remove_signature_parameters
+
+from decopatch.utils_lazy import create_trampoline
+from decopatch.utils_aot import load_compiled_code
+from decopatch.utils_codegen import GENERATED_PREFIX, IMPL_NAME, LOCALS_NAME, DICT_NAME, ASYNC_FOR_BUILTINS, \
+    TEMPLATES_ENGINE, get_function_code, get_template_code, make_function, get_wrapper_params_and_call_exprs, \
+    get_arguments_names, split_arguments, is_valid_identifier, check_reserved_names, with_signature, \
+    get_codegen_engine, get_wrapper_attrs, get_wrapper_metadata
 
 try:  # python 3.3+
-    from inspect import signature, Parameter
+    from inspect import signature, Parameter, Signature
     funcsigs_used = False
 except ImportError:
-    from funcsigs import signature, Parameter
+    from funcsigs import signature, Parameter, Signature
     funcsigs_used = True
 
+from inspect import isgeneratorfunction
+
+try:  # python 3.3+
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:  # python 3.5+
+    from inspect import iscoroutinefunction
+except ImportError:
+    def iscoroutinefunction(f):
+        return False
+
+try:  # python 3.6+
+    from inspect import isasyncgenfunction
+except ImportError:
+    def isasyncgenfunction(f):
+        return False
+
+try:  # python 3+
+    from sys import intern
+except ImportError:
+    pass
+
+try:  # python 3.5+
+    from typing import Any, Callable, Dict, Optional, Tuple
+except ImportError:
+    pass
+
 
 class _Symbol:
     """
@@ -38,8 +79,52 @@ F_KWARGS = _Symbol('F_KWARGS')
 # A symbol used in your double flat-mode signatures to declare where the wrapper kwargs should be injected
 
 
+F_ITEM = _Symbol('F_ITEM')
+# A symbol used in your double flat-mode signatures to declare where each item yielded by the wrapped generator should
+# be injected. The implementation is then called once per item, and should return the item to yield.
+
+
+F_BOUND = _Symbol('F_BOUND')
+# A symbol used in your double flat-mode signatures to declare where the wrapper arguments should be injected, as a
+# read-only mapping of argument name -> value with defaults applied. See `FBoundArguments`
+
+
+class _ArgSymbol(_Symbol):
+    """
+    The parametrized symbols created with `F_ARG`, and `F_SELF`. The latter has an `arg_name` of None.
+    """
+    __slots__ = ('arg_name', )
+
+    def __init__(self, arg_name, repr_=None):
+        _Symbol.__init__(self, repr_ if repr_ is not None else "F_ARG(%r)" % arg_name)
+        self.arg_name = arg_name
+
+
+def F_ARG(arg_name  # type: str
+          ):
+    """
+    Creates a symbol used in your double flat-mode signatures to declare where the value received by the wrapper for
+    its argument named `arg_name` should be injected. Where to find this value is resolved once, when the decorator is
+    applied: so if the decorated object has no argument named `arg_name`, a `TypeError` is raised at that time.
+
+    :param arg_name: the name of an argument in the decorated object's signature
+    :return:
+    """
+    if not isinstance(arg_name, str):
+        raise TypeError("`F_ARG` should receive an argument name, found %r" % (arg_name, ))
+    return _ArgSymbol(arg_name)
+
+
+F_SELF = _ArgSymbol(None, 'F_SELF')
+# A symbol used in your double flat-mode signatures to declare where the first argument of the decorated method (`self`,
+# or `cls` for class methods) should be injected. It is resolved when the decorator is applied, as `F_ARG`.
+
+
 def make_decorator_spec(impl_function,
-                        flat_mode_decorated_name=None  # type: str
+                        flat_mode_decorated_name=None,  # type: str
+                        codegen_engine=None,            # type: str
+                        preserve_signature=True,        # type: bool
+                        lazy_wrapping=False,            # type: bool
                         ):
     """
     Analyzes the implementation function
@@ -50,56 +135,165 @@ def make_decorator_spec(impl_function,
 
     :param impl_function:
     :param flat_mode_decorated_name:
+    :param codegen_engine: the code generation engine to use for the generated functions. See
+        `utils_codegen.set_default_codegen_engine`
+    :param preserve_signature: in double-flat mode, if False the wrappers will have a generic `(*args, **kwargs)`
+        signature instead of the exact signature of the decorated object. See `create_wrapper`
+    :param lazy_wrapping: in double-flat mode, if True the wrappers will only be created when first called. See
+        `utils_lazy.create_trampoline`
     :return: sig_info, function_for_metadata, nested_impl_function
     """
+    # analyze the implementation's signature: determine the mode (nested, flat, double-flat) and the signature to expose
+    mode, injected_name, contains_varpositional, injected_pos, f_args_name, f_kwargs_name, f_item_name, f_bound_name, \
+        f_arg_names, exposed_signature = analyze_impl_function(impl_function, flat_mode_decorated_name)
+
+    # use the original function for the docstring/module metadata
+    function_for_metadata = impl_function
+
+    # create the nested implementation, according to mode
+    if mode is None:
+        # *nested: keep it 'as is'
+        nested_impl_function = impl_function
+
+    elif mode is DECORATED:  # flat mode
+        # generate the corresponding nested decorator
+        nested_impl_function = make_nested_impl_for_flat_mode(exposed_signature, impl_function, injected_name,
+                                                              injected_pos, codegen_engine=codegen_engine)
+
+    elif mode is WRAPPED:
+        # generate the corresponding nested decorator
+        nested_impl_function = make_nested_impl_for_doubleflat_mode(exposed_signature, impl_function, injected_name,
+                                                                    f_args_name, f_kwargs_name, injected_pos,
+                                                                    f_item_name, codegen_engine=codegen_engine,
+                                                                    preserve_signature=preserve_signature,
+                                                                    f_bound_name=f_bound_name, f_arg_names=f_arg_names,
+                                                                    lazy_wrapping=lazy_wrapping)
+
+    else:
+        raise ValueError("Unknown mode: %s" % mode)
+
+    # create an object to easily access the exposed signature information afterwards
+    sig_info = SignatureInfo(exposed_signature, contains_varpositional, injected_pos)
+
+    return sig_info, function_for_metadata, nested_impl_function
+
+
+SPEC_CACHE_MAXSIZE = 1024
+"""Maximum number of implementation functions for which the analysis is kept in cache. Oldest entries are evicted
+first"""
+
+_spec_cache = WeakKeyDictionary()
+_spec_cache_stats = [0, 0]  # hits, misses
+
+SpecCacheInfo = namedtuple('SpecCacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+
+
+def get_spec_cache_info():
+    # type: (...) -> SpecCacheInfo
+    """
+    Returns the statistics of the cache used by `analyze_impl_function`, similar to `functools.lru_cache`'s
+    `cache_info()`.
+
+    :return: a `SpecCacheInfo` named tuple (hits, misses, maxsize, currsize)
+    """
+    return SpecCacheInfo(_spec_cache_stats[0], _spec_cache_stats[1], SPEC_CACHE_MAXSIZE, len(_spec_cache))
+
+
+def clear_spec_cache():
+    """
+    Clears the cache used by `analyze_impl_function`, and resets its statistics.
+
+    :return:
+    """
+    _spec_cache.clear()
+    _spec_cache_stats[0] = _spec_cache_stats[1] = 0
+
+
+def analyze_impl_function(impl_function,
+                          flat_mode_decorated_name=None  # type: str
+                          ):
+    """
+    Analyzes the signature of a decorator implementation function with `extract_mode_info`, and computes the signature
+    of the decorator to expose.
+
+    The result only depends on `impl_function` and `flat_mode_decorated_name`, so it is memoized: the same
+    implementation can be turned into decorators several times, with different options, at no additional cost. The
+    cache holds weak references to the implementation functions, and is bounded by `SPEC_CACHE_MAXSIZE`. Objects that
+    can not be weakly referenced are analyzed each time. See `get_spec_cache_info` and `clear_spec_cache`.
+
+    Note that if the signature of `impl_function` is modified after it has been analyzed (for example by modifying its
+    `__defaults__`), `clear_spec_cache` should be called.
+
+    :param impl_function:
+    :param flat_mode_decorated_name:
+    :return: a tuple (mode, injected_name, contains_varpositional, injected_pos, f_args_name, f_kwargs_name,
+        f_item_name, f_bound_name, f_arg_names, exposed_signature)
+    """
+    try:
+        res = _spec_cache[impl_function][flat_mode_decorated_name]
+    except (KeyError, TypeError):
+        # not in cache, or not weakly referenceable
+        pass
+    else:
+        _spec_cache_stats[0] += 1
+        return res
+
+    _spec_cache_stats[1] += 1
+
     # extract the implementation's signature
     implementors_signature = signature(impl_function)
 
     # determine the mode (nested, flat, double-flat) and check signature
     mode, injected_name, contains_varpositional, injected_pos, \
-    injected_arg, f_args_name, f_kwargs_name = extract_mode_info(implementors_signature, flat_mode_decorated_name)
+    injected_arg, f_args_name, f_kwargs_name, f_item_name, f_bound_name, \
+    f_arg_names = extract_mode_info(implementors_signature, flat_mode_decorated_name)
 
     # create the signature of the decorator function to create, according to mode
     if mode is None:
         # *nested: keep the signature 'as is'
         exposed_signature = implementors_signature
-        function_for_metadata = impl_function
-        nested_impl_function = impl_function
 
     elif mode is DECORATED:  # flat mode
         # use the same signature, but remove the injected arg.
         exposed_signature = remove_signature_parameters(implementors_signature, injected_name)
 
-        # use the original function for the docstring/module metadata
-        function_for_metadata = impl_function
-
-        # generate the corresponding nested decorator
-        nested_impl_function = make_nested_impl_for_flat_mode(exposed_signature, impl_function, injected_name,
-                                                              injected_pos)
-
     elif mode is WRAPPED:
         # *double-flat: the same signature, but we remove the injected args.
         args_to_remove = (injected_name,) + ((f_args_name,) if f_args_name is not None else ()) \
-                         + ((f_kwargs_name,) if f_kwargs_name is not None else ())
+                         + ((f_kwargs_name,) if f_kwargs_name is not None else ()) \
+                         + ((f_item_name,) if f_item_name is not None else ()) \
+                         + ((f_bound_name,) if f_bound_name is not None else ()) \
+                         + (tuple(f_arg_names) if f_arg_names is not None else ())
         exposed_signature = remove_signature_parameters(implementors_signature, *args_to_remove)
 
-        # use the original function for the docstring/module metadata
-        function_for_metadata = impl_function
-
-        # generate the corresponding nested decorator
-        nested_impl_function = make_nested_impl_for_doubleflat_mode(exposed_signature, impl_function, injected_name,
-                                                                    f_args_name, f_kwargs_name, injected_pos)
-
     else:
         raise ValueError("Unknown mode: %s" % mode)
 
-    # create an object to easily access the exposed signature information afterwards
-    sig_info = SignatureInfo(exposed_signature, contains_varpositional, injected_pos)
-
-    return sig_info, function_for_metadata, nested_impl_function
+    res = mode, injected_name, contains_varpositional, injected_pos, f_args_name, f_kwargs_name, f_item_name, \
+        f_bound_name, f_arg_names, exposed_signature
 
-
-def make_nested_impl_for_flat_mode(decorator_signature, user_provided_applier, injected_name, injected_pos):
+    try:
+        _spec_cache[impl_function][flat_mode_decorated_name] = res
+    except KeyError:
+        if len(_spec_cache) >= SPEC_CACHE_MAXSIZE:
+            try:
+                del _spec_cache[next(iter(_spec_cache))]
+            except (KeyError, RuntimeError, StopIteration):
+                pass
+        try:
+            _spec_cache[impl_function] = {flat_mode_decorated_name: res}
+        except TypeError:
+            # not weakly referenceable
+            pass
+    except TypeError:
+        # not weakly referenceable
+        pass
+
+    return res
+
+
+def make_nested_impl_for_flat_mode(decorator_signature, user_provided_applier, injected_name, injected_pos,
+                                   codegen_engine=None):
     """
     Creates the nested-mode decorator to be used when the implementation is provided in flat mode.
 
@@ -111,33 +305,57 @@ def make_nested_impl_for_flat_mode(decorator_signature, user_provided_applier, i
     :param user_provided_applier:
     :param injected_name:
     :param argnames_before_varpos_arg:
+    :param codegen_engine:
     :return:
     """
 
-    @with_signature(decorator_signature)
+    # the data shared by all usages of the decorator
+    spec = (user_provided_applier, injected_name, injected_pos)
+
+    @with_signature(decorator_signature, engine=codegen_engine)
     def _decorator(*args, **kwargs):
         """ The decorator. Its signature will be overriden by `generated_signature` """
+        return _FlatModeApplier(spec, args, kwargs)
 
-        def _apply_decorator(decorated):
-            """ This is called when the decorator is applied to an object `decorated` """
-
-            # inject `decorated` under the correct name
-            # fix in case of var-positional arguments
-            if injected_pos >= 0:
-                new_args = args[:injected_pos] + (decorated, ) + args[injected_pos:]
-            else:
-                new_args = args
-                kwargs[injected_name] = decorated
+    return _decorator
 
-            return user_provided_applier(*new_args, **kwargs)
 
-        return _apply_decorator
+class _FlatModeApplier(object):
+    """
+    The object returned by a flat-mode decorator used with arguments, for example `foo_decorator(a)`. When it is applied
+    to an object `decorated`, the user-provided implementation is called with `decorated` injected.
 
-    return _decorator
+    The data that is the same for all usages of the decorator is shared by all appliers in a `spec` tuple
+    (user_provided_applier, injected_name, injected_pos), so that each applier only holds the arguments it received.
+    """
+    __slots__ = ('spec', 'args', 'kwargs')
+
+    def __init__(self, spec, args, kwargs):
+        self.spec = spec
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self, decorated):
+        """ This is called when the decorator is applied to an object `decorated` """
+        user_provided_applier, injected_name, injected_pos = self.spec
+
+        # inject `decorated` under the correct name
+        # fix in case of var-positional arguments
+        if injected_pos >= 0:
+            args = self.args
+            new_args = args[:injected_pos] + (decorated, ) + args[injected_pos:]
+            return user_provided_applier(*new_args, **self.kwargs)
+        else:
+            # note: we do not modify `kwargs`, as it is shared by all usages of this applier
+            new_kwargs = self.kwargs.copy()
+            new_kwargs[injected_name] = decorated
+            return user_provided_applier(*self.args, **new_kwargs)
 
 
 def make_nested_impl_for_doubleflat_mode(decorator_signature, user_provided_wrapper, injected_name,
-                                         f_args_name, f_kwargs_name, injected_pos):
+                                         f_args_name, f_kwargs_name, injected_pos, f_item_name=None,
+                                         codegen_engine=None, preserve_signature=True, f_bound_name=None,
+                                         f_arg_names=None, lazy_wrapping=False):
     """
     Creates the nested-mode decorator to be used when the implementation is provided in double-flat mode.
 
@@ -145,47 +363,605 @@ def make_nested_impl_for_doubleflat_mode(decorator_signature, user_provided_wrap
     exceptions raised when the arguments are incorrect. Since the external method is called only once per decorator
     usage and does not impact the decorated object / created wrappe, we can afford.
 
+    The wrapper created for each decorated object is generated by `create_wrapper`, so that each call to the decorated
+    object goes through a single frame before entering `user_provided_wrapper`.
+
     :param decorator_signature:
     :param user_provided_wrapper:
     :param injected_name:
     :param f_args_name:
     :param f_kwargs_name:
+    :param injected_pos:
+    :param f_item_name:
+    :param codegen_engine:
+    :param preserve_signature:
+    :param f_bound_name:
+    :param f_arg_names:
+    :param lazy_wrapping:
     :return:
     """
 
-    @with_signature(decorator_signature)
+    # the data shared by all usages of the decorator
+    spec = (user_provided_wrapper, injected_name, f_args_name, f_kwargs_name, injected_pos, f_item_name, codegen_engine,
+            preserve_signature, f_bound_name, f_arg_names, lazy_wrapping)
+
+    @with_signature(decorator_signature, engine=codegen_engine)
     def _decorator(*args, **kwargs):
         """ The decorator. Its signature will be overriden by `generated_signature` """
+        return _DoubleFlatModeApplier(spec, args, kwargs)
+
+    return _decorator
+
+
+class _DoubleFlatModeApplier(object):
+    """
+    The object returned by a double-flat-mode decorator used with arguments, for example `foo_decorator(a)`. When it is
+    applied to an object `decorated`, it creates a signature-preserving wrapper calling the user-provided
+    implementation, with `create_wrapper` (or `create_trampoline` if `lazy_wrapping` is True).
 
-        def _apply_decorator(decorated):
-            """ This is called when the decorator is applied to an object `decorated` """
+    As in `_FlatModeApplier`, the data that is the same for all usages of the decorator is shared by all appliers in a
+    `spec` tuple, see `make_nested_impl_for_doubleflat_mode`.
+    """
+    __slots__ = ('spec', 'args', 'kwargs')
+
+    def __init__(self, spec, args, kwargs):
+        self.spec = spec
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self, decorated):
+        """ This is called when the decorator is applied to an object `decorated` """
+        user_provided_wrapper, injected_name, f_args_name, f_kwargs_name, injected_pos, f_item_name, codegen_engine, \
+            preserve_signature, f_bound_name, f_arg_names, lazy_wrapping = self.spec
+
+        if isinstance(decorated, (classmethod, staticmethod)):
+            # the decorator is applied on top of @classmethod or @staticmethod: wrap the underlying function and
+            # wrap the result again, so that the descriptor protocol still works as expected
+            if isinstance(decorated, staticmethod) and f_arg_names is not None and None in f_arg_names.values():
+                raise TypeError("`F_SELF` can not be used to decorate static method '%s'"
+                                % getattr(decorated.__func__, '__name__', decorated.__func__))
+            return decorated.__class__(self(decorated.__func__))
+
+        # inject `decorated` under the correct name
+        # fix in case of var-positional arguments
+        # note: we do not modify `kwargs`, as it is shared by all usages of this applier
+        args = self.args
+        if injected_pos >= 0:
+            new_args = args[:injected_pos] + (decorated,) + args[injected_pos:]
+            new_injected_name = None
+        else:
+            new_args = args
+            new_injected_name = injected_name
+
+        # use the code compiled ahead of time for the package of `decorated`, if any
+        load_compiled_code(getattr(decorated, '__module__', None))
+
+        # create a signature-preserving wrapper calling the user-provided implementation directly
+        _create_wrapper = partial(create_wrapper, decorated, user_provided_wrapper, new_args, self.kwargs,
+                                  new_injected_name, f_args_name, f_kwargs_name, f_item_name, engine=codegen_engine,
+                                  preserve_signature=preserve_signature, f_bound_name=f_bound_name,
+                                  f_arg_names=f_arg_names)
+        if lazy_wrapping:
+            # only create it on first call
+            kind_of = (decorated,) if f_item_name is not None else (decorated, user_provided_wrapper)
+            return create_trampoline(decorated, _create_wrapper, kind_of=kind_of, engine=codegen_engine)
+        else:
+            return _create_wrapper()
+
+
+# ----------- WRAPPED mode: generated wrappers
+
+
+_DECORATED_NAME = GENERATED_PREFIX + 'decorated_'
+"""Name of the decorated object in the namespace of the generated wrappers"""
+
+_GENERIC_SIGNATURE = Signature([Parameter('args', kind=Parameter.VAR_POSITIONAL),
+                                Parameter('kwargs', kind=Parameter.VAR_KEYWORD)])
+"""Signature of the wrappers created when `preserve_signature=False`"""
+
+
+def create_wrapper(decorated,
+                   user_provided_wrapper,
+                   impl_args,      # type: Tuple[Any, ...]
+                   impl_kwargs,    # type: Dict[str, Any]
+                   injected_name,  # type: Optional[str]
+                   f_args_name,    # type: Optional[str]
+                   f_kwargs_name,  # type: Optional[str]
+                   f_item_name=None,  # type: Optional[str]
+                   engine=None,       # type: Optional[str]
+                   preserve_signature=True,  # type: bool
+                   f_bound_name=None,  # type: Optional[str]
+                   f_arg_names=None,   # type: Optional[Dict[str, str]]
+                   ):
+    """
+    Creates a signature-preserving wrapper for `decorated`, that calls `user_provided_wrapper` directly.
+
+    As opposed to `makefun.wraps`, the generated function does not delegate to an intermediate generic closure: its
+    body is specialized for the signature of `decorated` and for the arguments of the decorator, so that each call goes
+    through a single frame before entering `user_provided_wrapper`. The `f_args` and `f_kwargs` objects are only built
+    if the implementation declares them, and are always passed as keyword arguments. The code of the wrapper is
+    obtained with `get_function_code`, so it is only compiled once for all structurally identical signatures.
+
+    The generated wrapper does not store any per-call state: all arguments are passed to `user_provided_wrapper` in
+    the call expression itself, and the objects received as `impl_args` and `impl_kwargs` are never modified. It is
+    therefore safe to call it concurrently from several threads, or recursively.
+
+    If `decorated` or `user_provided_wrapper` is a coroutine function, the generated wrapper is a native coroutine
+    function (`async def`) awaiting the result of `user_provided_wrapper`. So `user_provided_wrapper` can either be
+    itself a coroutine function, or a normal function returning an awaitable such as `f(*f_args, **f_kwargs)`.
+
+    Similarly if `decorated` or `user_provided_wrapper` is a generator function (resp. an asynchronous generator
+    function), the generated wrapper is a generator function that delegates to the iterable returned by
+    `user_provided_wrapper` with `yield from` (resp. `async for`), so that items are streamed lazily.
+
+    The wrapper is always a plain function, even if `decorated` is a class: as with `makefun.wraps`, it has the
+    signature of the constructor and the metadata of the class, but it is not a class itself. If `decorated` is a
+    `functools.partial`, the wrapper has the name, docstring and module of the underlying function.
+
+    Finally if `f_item_name` is not None, `decorated` has to be a generator or asynchronous generator function. In that
+    case the generated wrapper iterates on `decorated` itself, and calls `user_provided_wrapper` once for each item,
+    injected as `f_item_name`. The value returned by `user_provided_wrapper` (or awaited, if it is a coroutine function)
+    is yielded instead of the item. Note that in this case the `f_args` and `f_kwargs` objects are created once per
+    call of the wrapper, and are shared by all the items.
+
+    If `f_bound_name` is not None, a `FBoundArguments` mapping is created for each call and injected as `f_bound_name`.
+    The wrapper only packs its received arguments in a tuple: the mapping from names to positions in this tuple is
+    computed once, when the wrapper is created.
+
+    If `f_arg_names` is not None, for each of its items `(impl_arg_name, arg_name)` the value received by the wrapper
+    for its argument `arg_name` is injected as `impl_arg_name`. Since the wrapper has the same signature as `decorated`,
+    this value is simply the wrapper's local variable `arg_name`: no lookup is needed at all. When `preserve_signature`
+    is False, a getter is created with `make_arg_getter` instead. An `arg_name` of None (`F_SELF`) designates the first
+    argument of `decorated`, that is, `self` or `cls` if it is a method. Since the wrapper is a plain function, python
+    binds it to instances exactly as it would bind `decorated`, and `self` is never repacked.
+
+    If `engine` is 'templates', the wrapper is created with `_create_wrapper_from_template` instead. It receives the
+    same arguments, but no source code is generated.
+
+    If `preserve_signature` is False, the wrapper has a generic `(*args, **kwargs)` signature, like the ones created
+    with `functools.wraps`: the signature of `decorated` is not even computed. Arguments are therefore validated only
+    once, by `decorated` itself, and `f_args` and `f_kwargs` are exactly the positional and keyword arguments received.
+    The wrapper code is the same for all decorated objects. Since `__wrapped__` is set, `inspect.signature` and
+    `help` still report the signature of `decorated`.
+
+    :param decorated: the object to wrap
+    :param user_provided_wrapper: the double-flat implementation
+    :param impl_args: the positional arguments to pass to `user_provided_wrapper`
+    :param impl_kwargs: the keyword arguments to pass to `user_provided_wrapper`
+    :param injected_name: the name of the argument where to inject `decorated`, or None if it is already present in
+        `impl_args`
+    :param f_args_name: the name of the argument where to inject the wrapper's positional args, or None
+    :param f_kwargs_name: the name of the argument where to inject the wrapper's keyword args, or None
+    :param f_item_name: the name of the argument where to inject each item yielded by `decorated`, or None
+    :param f_bound_name: the name of the argument where to inject the `FBoundArguments`, or None
+    :param f_arg_names: an optional dictionary of argument name in the implementation -> argument name in the decorated
+        object, used to inject the values of specific arguments
+    :param engine: the code generation engine to use. By default the one set with `set_default_codegen_engine`
+    :param preserve_signature: if False, the wrapper will have a generic `(*args, **kwargs)` signature
+    :return:
+    """
+    wrapped_sig = signature(decorated) if preserve_signature else _GENERIC_SIGNATURE
+    metadata = get_wrapper_metadata(decorated)
+    func_name = metadata[0]
+
+    if f_arg_names is not None:
+        # resolve the arguments now, so as to fail fast
+        decorated_sig = wrapped_sig if preserve_signature else signature(decorated)
+        if None in f_arg_names.values():
+            # F_SELF: note that we do not modify `f_arg_names` since it is shared by all usages of the decorator
+            self_name = get_self_arg_name(decorated_sig, func_name)
+            f_arg_names = dict((k, self_name if v is None else v) for k, v in f_arg_names.items())
+        f_arg_getters = dict((impl_arg_name, make_arg_getter(decorated_sig, arg_name, func_name))
+                             for impl_arg_name, arg_name in f_arg_names.items())
+    else:
+        f_arg_getters = None
+
+    if get_codegen_engine(engine) == TEMPLATES_ENGINE:
+        return _create_wrapper_from_template(decorated, wrapped_sig, user_provided_wrapper, impl_args, impl_kwargs,
+                                             injected_name, f_args_name, f_kwargs_name, f_item_name, f_bound_name,
+                                             preserve_signature, f_arg_names, f_arg_getters, metadata)
+
+    # the namespace in which the wrapper is generated. It will become its `__globals__`
+    evaldict = {IMPL_NAME: user_provided_wrapper}
+
+    # arguments of the call to the implementation: first the ones received by the decorator. Their names are interned,
+    # so that the namespaces of all wrappers share the same key strings, that are also the ones used in the code
+    call_args = []
+    for i, v in enumerate(impl_args):
+        varname = intern("%sa%s_" % (GENERATED_PREFIX, i))
+        evaldict[varname] = v
+        call_args.append(varname)
+    if injected_name is not None:
+        evaldict[_DECORATED_NAME] = decorated
+        call_args.append("%s=%s" % (injected_name, _DECORATED_NAME))
+    extra_kwargs = None
+    for i, (k, v) in enumerate(impl_kwargs.items()):
+        if is_valid_identifier(k):
+            varname = intern("%sk%s_" % (GENERATED_PREFIX, i))
+            evaldict[varname] = v
+            call_args.append("%s=%s" % (k, varname))
+        else:
+            # this can only happen for names received in a var-keyword argument
+            if extra_kwargs is None:
+                extra_kwargs = dict()
+            extra_kwargs[k] = v
+
+    # then the ones received by the wrapper, if required
+    params_str, f_args_expr, f_kwargs_expr, forward_str = get_wrapper_params_and_call_exprs(wrapped_sig)
+    if f_kwargs_name is not None and DICT_NAME in f_kwargs_expr:
+        # python < 3.5: builtins are not available in the wrapper namespace
+        evaldict[DICT_NAME] = dict
+    before_call = []
+    if f_item_name is not None and f_args_name is not None:
+        # per-item mode: create the object once per call
+        before_call.append("%sf_args_ = %s" % (GENERATED_PREFIX, f_args_expr))
+        f_args_expr = GENERATED_PREFIX + "f_args_"
+    if f_item_name is not None and f_kwargs_name is not None:
+        before_call.append("%sf_kwargs_ = %s" % (GENERATED_PREFIX, f_kwargs_expr))
+        f_kwargs_expr = GENERATED_PREFIX + "f_kwargs_"
+    if f_bound_name is not None:
+        if preserve_signature:
+            evaldict[_F_BOUND_NAME] = FBoundArguments
+            evaldict[_F_BOUND_INDEX_NAME] = get_f_bound_index(wrapped_sig)
+            f_bound_expr = "%s(%s, (%s))" % (_F_BOUND_NAME, _F_BOUND_INDEX_NAME,
+                                             "".join("%s, " % n for n in wrapped_sig.parameters))
+        else:
+            # the signature of `decorated` is unknown: bind lazily
+            evaldict[_F_BOUND_NAME] = LateFBoundArguments
+            evaldict[_DECORATED_NAME] = decorated
+            f_bound_expr = "%s(%s, args, kwargs)" % (_F_BOUND_NAME, _DECORATED_NAME)
+        if f_item_name is not None:
+            before_call.append("%sf_bound_ = %s" % (GENERATED_PREFIX, f_bound_expr))
+            f_bound_expr = GENERATED_PREFIX + "f_bound_"
+        call_args.append("%s=%s" % (f_bound_name, f_bound_expr))
+    if f_arg_names is not None:
+        for i, (impl_arg_name, arg_name) in enumerate(f_arg_names.items()):
+            if preserve_signature:
+                # the wrapper has the same signature: the value is directly available
+                call_args.append("%s=%s" % (impl_arg_name, arg_name))
+            else:
+                getter_name = "%sf_arg%s_" % (GENERATED_PREFIX, i)
+                evaldict[getter_name] = f_arg_getters[impl_arg_name]
+                getter_expr = "%s(args, kwargs)" % getter_name
+                if f_item_name is not None:
+                    before_call.append("%sf_arg%s_value_ = %s" % (GENERATED_PREFIX, i, getter_expr))
+                    getter_expr = "%sf_arg%s_value_" % (GENERATED_PREFIX, i)
+                call_args.append("%s=%s" % (impl_arg_name, getter_expr))
+    if f_args_name is not None:
+        call_args.append("%s=%s" % (f_args_name, f_args_expr))
+    if f_kwargs_name is not None:
+        call_args.append("%s=%s" % (f_kwargs_name, f_kwargs_expr))
+    if f_item_name is not None:
+        call_args.append("%s=%sitem_" % (f_item_name, GENERATED_PREFIX))
+    if extra_kwargs is not None:
+        evaldict[GENERATED_PREFIX + 'kw_'] = extra_kwargs
+        call_args.append("**%skw_" % GENERATED_PREFIX)
+
+    # generate the code
+    check_reserved_names(wrapped_sig, func_name)
+    impl_call = "%s(%s)" % (IMPL_NAME, ", ".join(call_args))
+    if f_item_name is not None:
+        # per-item mode: iterate on the decorated generator and call the implementation on each item
+        evaldict[_DECORATED_NAME] = decorated
+        decorated_call = "%s(%s)" % (_DECORATED_NAME, forward_str)
+        if isasyncgenfunction(decorated):
+            is_async = True
+            evaldict.update(ASYNC_FOR_BUILTINS)
+            if iscoroutinefunction(user_provided_wrapper):
+                impl_call = "await " + impl_call
+            body_lines = before_call + ["async for %sitem_ in %s:" % (GENERATED_PREFIX, decorated_call),
+                                        "    yield " + impl_call]
+        elif isgeneratorfunction(decorated):
+            is_async = False
+            body_lines = before_call + ["for %sitem_ in %s:" % (GENERATED_PREFIX, decorated_call),
+                                        "    yield " + impl_call]
+        else:
+            raise TypeError("`F_ITEM` can only be used to decorate generator functions or asynchronous generator "
+                            "functions, and '%s' is not one of them" % func_name)
+
+    elif isasyncgenfunction(decorated) or isasyncgenfunction(user_provided_wrapper):
+        # delegate to the asynchronous iterable returned by the implementation
+        is_async = True
+        evaldict.update(ASYNC_FOR_BUILTINS)
+        body_lines = ["async for %sitem_ in %s:" % (GENERATED_PREFIX, impl_call),
+                      "    yield %sitem_" % GENERATED_PREFIX]
+
+    elif isgeneratorfunction(decorated) or isgeneratorfunction(user_provided_wrapper):
+        # delegate to the iterable returned by the implementation
+        is_async = False
+        if sys.version_info >= (3, 3):
+            body_lines = ["return (yield from %s)" % impl_call]
+        else:
+            body_lines = ["for %sitem_ in %s:" % (GENERATED_PREFIX, impl_call),
+                          "    yield %sitem_" % GENERATED_PREFIX]
+
+    elif iscoroutinefunction(decorated) or iscoroutinefunction(user_provided_wrapper):
+        is_async = True
+        body_lines = ["return await %s" % impl_call]
+    else:
+        is_async = False
+        body_lines = ["return %s" % impl_call]
+
+    # the code is compiled once per signature shape, then each wrapper is created from it with its own namespace.
+    # Finally set the metadata, as `makefun.wraps` would do
+    attrs = get_wrapper_attrs(decorated)
+    _, qualname, doc, module_name = metadata
+    wrapper = make_function(get_function_code(params_str, body_lines, is_async=is_async), evaldict, wrapped_sig,
+                            func_name=func_name, qualname=qualname, doc=doc, module_name=module_name, attrs=attrs)
+
+    return wrapper
 
-            # inject `decorated` under the correct name
-            # fix in case of var-positional arguments
-            if injected_pos >= 0:
-                new_args = args[:injected_pos] + (decorated,) + args[injected_pos:]
+
+def _create_wrapper_from_template(decorated, wrapped_sig, user_provided_wrapper, impl_args, impl_kwargs,
+                                  injected_name, f_args_name, f_kwargs_name, f_item_name, f_bound_name,
+                                  preserve_signature, f_arg_names, f_arg_getters, metadata):
+    """
+    Same as `create_wrapper`, with the 'templates' engine: the code of the wrapper is obtained with `get_template_code`,
+    and sends the received arguments to a dispatcher closure that calls `user_provided_wrapper`. There are therefore
+    two frames between the caller and `user_provided_wrapper`, but neither `compile` nor `exec` is ever called.
+    """
+    func_name, qualname, doc, module_name = metadata
+    check_reserved_names(wrapped_sig, func_name)
+
+    names = get_arguments_names(wrapped_sig)
+    f_bound_index = get_f_bound_index(wrapped_sig) if (f_bound_name is not None and preserve_signature) else None
+
+    # the keyword arguments that do not depend on the call are built once. Note that we never modify `impl_kwargs`,
+    # as it is shared by all usages of the decorator
+    base_kwargs = dict(impl_kwargs)
+    if injected_name is not None:
+        base_kwargs[injected_name] = decorated
+    has_call_kwargs = f_args_name is not None or f_kwargs_name is not None or f_bound_name is not None \
+        or f_arg_names is not None or f_item_name is not None
+
+    def _impl_kwargs(arguments):
+        """Returns the keyword arguments for `user_provided_wrapper`, as `create_wrapper` would send them"""
+        if not has_call_kwargs:
+            # they are unpacked in the call, so they can be shared by all calls
+            return base_kwargs
+        new_kwargs = base_kwargs.copy()
+        if f_args_name is not None or f_kwargs_name is not None:
+            f_args, f_kwargs = split_arguments(arguments, *names)
+            if f_args_name is not None:
+                new_kwargs[f_args_name] = f_args
+            if f_kwargs_name is not None:
+                new_kwargs[f_kwargs_name] = f_kwargs
+        if f_bound_name is not None:
+            if f_bound_index is not None:
+                new_kwargs[f_bound_name] = FBoundArguments(f_bound_index, tuple(arguments[n] for n in f_bound_index))
             else:
-                new_args = args
-                kwargs[injected_name] = decorated
+                new_kwargs[f_bound_name] = LateFBoundArguments(decorated, arguments['args'], arguments['kwargs'])
+        if f_arg_names is not None:
+            for impl_arg_name, arg_name in f_arg_names.items():
+                if preserve_signature:
+                    new_kwargs[impl_arg_name] = arguments[arg_name]
+                else:
+                    new_kwargs[impl_arg_name] = f_arg_getters[impl_arg_name](arguments['args'], arguments['kwargs'])
+        return new_kwargs
+
+    if f_item_name is not None:
+        if isasyncgenfunction(decorated):
+            from decopatch._codegen_templates_py38_and_higher import iterate_async_items
+            kind = 'async_generator'
+            await_result = iscoroutinefunction(user_provided_wrapper)
+
+            def _dispatch(arguments):
+                args, kwargs = split_arguments(arguments, *names)
+                return iterate_async_items(decorated(*args, **kwargs), user_provided_wrapper, impl_args,
+                                           _impl_kwargs(arguments), f_item_name, await_result)
+
+        elif isgeneratorfunction(decorated):
+            kind = 'generator'
+
+            def _dispatch(arguments):
+                new_kwargs = _impl_kwargs(arguments)
+                args, kwargs = split_arguments(arguments, *names)
+                for item in decorated(*args, **kwargs):
+                    new_kwargs[f_item_name] = item
+                    yield user_provided_wrapper(*impl_args, **new_kwargs)
+        else:
+            raise TypeError("`F_ITEM` can only be used to decorate generator functions or asynchronous generator "
+                            "functions, and '%s' is not one of them" % func_name)
+    else:
+        if isasyncgenfunction(decorated) or isasyncgenfunction(user_provided_wrapper):
+            kind = 'async_generator'
+        elif isgeneratorfunction(decorated) or isgeneratorfunction(user_provided_wrapper):
+            kind = 'generator'
+        elif iscoroutinefunction(decorated) or iscoroutinefunction(user_provided_wrapper):
+            kind = 'coroutine'
+        else:
+            kind = 'function'
+
+        def _dispatch(arguments):
+            return user_provided_wrapper(*impl_args, **_impl_kwargs(arguments))
+
+    attrs = get_wrapper_attrs(decorated)
+    return make_function(get_template_code(wrapped_sig, kind), {IMPL_NAME: _dispatch, LOCALS_NAME: locals},
+                         wrapped_sig, func_name=func_name, qualname=qualname, doc=doc, module_name=module_name,
+                         attrs=attrs)
+
+
+def make_arg_getter(sig,        # type: Signature
+                    arg_name,   # type: str
+                    func_name,  # type: str
+                    ):
+    # type: (...) -> Callable[[Tuple[Any, ...], Dict[str, Any]], Any]
+    """
+    Returns a function `(args, kwargs) -> value` returning the value of argument `arg_name`, when a function with
+    signature `sig` is called with `*args, **kwargs`. The position and default value of the argument are resolved
+    here, once.
 
-            # create a signature-preserving wrapper using `makefun.wraps`
-            @wraps(decorated)
-            def wrapper(*f_args, **f_kwargs):
-                # if the user wishes us to inject the actual args and kwargs, let's inject them
-                # note: for these it is always keyword-based.
-                if f_args_name is not None:
-                    kwargs[f_args_name] = f_args
-                if f_kwargs_name is not None:
-                    kwargs[f_kwargs_name] = f_kwargs
+    :param sig:
+    :param arg_name:
+    :param func_name: the name of the function with signature `sig`, used in error messages
+    :return:
+    """
+    try:
+        p = sig.parameters[arg_name]
+    except KeyError:
+        raise TypeError("`F_ARG(%r)` can not be used to decorate '%s': it has no argument named %r. Available "
+                        "arguments: %s" % (arg_name, func_name, arg_name, list(sig.parameters)))
 
-                # finally call the user-provided implementation
-                return user_provided_wrapper(*new_args, **kwargs)
+    default = _get_default(p)
+    if p.kind is Parameter.VAR_POSITIONAL:
+        pos = len([q for q in sig.parameters.values()
+                   if q.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)])
 
-            return wrapper
+        def _get(args, kwargs):
+            return args[pos:]
 
-        return _apply_decorator
+    elif p.kind is Parameter.VAR_KEYWORD:
+        named = set(sig.parameters)
 
-    return _decorator
+        def _get(args, kwargs):
+            return dict((k, v) for k, v in kwargs.items() if k not in named)
+
+    elif p.kind is Parameter.KEYWORD_ONLY:
+        def _get(args, kwargs):
+            try:
+                return kwargs[arg_name]
+            except KeyError:
+                return _get_default_or_raise(default, func_name, arg_name)
+
+    else:
+        pos = list(sig.parameters).index(arg_name)
+        positional_only = p.kind is Parameter.POSITIONAL_ONLY
+
+        def _get(args, kwargs):
+            if len(args) > pos:
+                return args[pos]
+            elif not positional_only and arg_name in kwargs:
+                return kwargs[arg_name]
+            else:
+                return _get_default_or_raise(default, func_name, arg_name)
+
+    return _get
+
+
+def get_self_arg_name(sig,       # type: Signature
+                      func_name,  # type: str
+                      ):
+    # type: (...) -> str
+    """
+    Returns the name of the first argument in `sig`, that will receive `self` (or `cls`) if the function is a method.
+
+    :param sig:
+    :param func_name: the name of the function with signature `sig`, used in error messages
+    :return:
+    """
+    for p_name, p in sig.parameters.items():
+        if p.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD):
+            return p_name
+        break
+
+    raise TypeError("`F_SELF` can not be used to decorate '%s': its first argument should be a positional argument "
+                    "receiving `self` or `cls`" % func_name)
+
+
+def _get_default_or_raise(default, func_name, arg_name):
+    if default is Parameter.empty:
+        raise TypeError("%s() missing required argument: %r" % (func_name, arg_name))
+    return default
+
+
+_F_BOUND_NAME = GENERATED_PREFIX + 'f_bound_cls_'
+_F_BOUND_INDEX_NAME = GENERATED_PREFIX + 'f_bound_index_'
+
+
+def get_f_bound_index(sig  # type: Signature
+                      ):
+    # type: (...) -> Dict[str, int]
+    """
+    Returns the dictionary of argument name -> position in `sig`, used by `FBoundArguments`.
+
+    :param sig:
+    :return:
+    """
+    return dict((name, i) for i, name in enumerate(sig.parameters))
+
+
+class FBoundArguments(Mapping):
+    """
+    The read-only mapping of argument name -> value injected as `F_BOUND` in double-flat implementations. It is
+    equivalent to `signature(f).bind(*f_args, **f_kwargs).arguments` after `apply_defaults()`, but much cheaper: the
+    wrapper already received the arguments with their defaults applied, so it only has to pack them in a tuple.
+    The index of each name in this tuple is computed once per decorated object, and nothing else is done unless an
+    argument is actually read.
+
+    As with `BoundArguments`, the var-positional argument (if any) is a tuple and the var-keyword (if any) is a dict.
+    """
+    __slots__ = ('_index', '_values')
+
+    def __init__(self,
+                 index,   # type: Dict[str, int]
+                 values,  # type: Tuple[Any, ...]
+                 ):
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, name):
+        return self._values[self._index[name]]
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, ", ".join("%s=%r" % (k, self[k]) for k in self))
+
+
+class LateFBoundArguments(FBoundArguments):
+    """
+    The `FBoundArguments` injected when the wrapper does not preserve the signature of the decorated object. In that
+    case binding is done lazily, the first time an argument is read.
+    """
+    __slots__ = ('_received',)
+
+    def __init__(self, decorated, args, kwargs):
+        self._received = (decorated, args, kwargs)
+
+    def _bind(self):
+        try:
+            return self._values
+        except AttributeError:
+            decorated, args, kwargs = self._received
+            sig = signature(decorated)
+            arguments = sig.bind(*args, **kwargs).arguments
+            self._index = get_f_bound_index(sig)
+            self._values = tuple(arguments[n] if n in arguments else _get_default(p)
+                                 for n, p in sig.parameters.items())
+            return self._values
+
+    def __getitem__(self, name):
+        return self._bind()[self._index[name]]
+
+    def __iter__(self):
+        self._bind()
+        return iter(self._index)
+
+    def __len__(self):
+        self._bind()
+        return len(self._index)
+
+    def __contains__(self, name):
+        self._bind()
+        return name in self._index
+
+
+def _get_default(p  # type: Parameter
+                 ):
+    """Returns the value of parameter `p` when it is not provided, as `BoundArguments.apply_defaults` would do"""
+    if p.kind is Parameter.VAR_POSITIONAL:
+        return ()
+    elif p.kind is Parameter.VAR_KEYWORD:
+        return {}
+    else:
+        return p.default
 
 
 class InvalidSignatureError(Exception):
@@ -214,6 +990,9 @@ def extract_mode_info(impl_sig,                      # type: Signature
     position_of_varpos = -1
     f_args = None
     f_kwargs = None
+    f_item = None
+    f_bound = None
+    f_arg_names = None
 
     if flat_mode_decorated_name is not None:
         # validate that the 'decorated' parameter is a string representing a real parameter of the function
@@ -242,8 +1021,10 @@ def extract_mode_info(impl_sig,                      # type: Signature
         for i, (p_name, p) in enumerate(impl_sig.parameters.items()):
             if p.kind is Parameter.VAR_POSITIONAL:
                 position_of_varpos = i
-                if f_args is not None or f_kwargs is not None:
-                    raise InvalidSignatureError("f_args and f_kwargs can only be used *after* var-positional arguments")
+                if f_args is not None or f_kwargs is not None or f_item is not None or f_bound is not None \
+                        or f_arg_names is not None:
+                    raise InvalidSignatureError("f_args, f_kwargs, f_item, f_bound and F_ARG arguments can only be "
+                                                "used *after* var-positional arguments")
             elif p.default is DECORATED:
                 if mode is not None:
                     raise InvalidSignatureError("only one of `DECORATED` or `WRAPPED` can be used in your signature")
@@ -262,9 +1043,19 @@ def extract_mode_info(impl_sig,                      # type: Signature
                 f_args = p
             elif p.default is F_KWARGS:
                 f_kwargs = p
-
-        if mode in {None, DECORATED} and (f_args is not None or f_kwargs is not None):
-            raise InvalidSignatureError("`F_ARGS` or `F_KWARGS` should only be used if you use `WRAPPED`")
+            elif p.default is F_ITEM:
+                f_item = p
+            elif p.default is F_BOUND:
+                f_bound = p
+            elif isinstance(p.default, _ArgSymbol):
+                if f_arg_names is None:
+                    f_arg_names = dict()
+                f_arg_names[p_name] = p.default.arg_name
+
+        if mode in {None, DECORATED} and (f_args is not None or f_kwargs is not None or f_item is not None
+                                          or f_bound is not None or f_arg_names is not None):
+            raise InvalidSignatureError("`F_ARGS`, `F_KWARGS`, `F_ITEM`, `F_BOUND` or `F_ARG` should only be used if "
+                                        "you use `WRAPPED`")
 
     # argnames_before_varpos_arg = None
     # if position_of_varpos > 0:
@@ -280,8 +1071,10 @@ def extract_mode_info(impl_sig,                      # type: Signature
         # do not inject as positional but as keyword argument
         injected_pos = -1
 
-    return mode, (injected.name if injected is not None else None), contains_varpositional, injected_pos, \
-           injected, (f_args.name if f_args is not None else None), (f_kwargs.name if f_kwargs is not None else None)
+    return (mode, (injected.name if injected is not None else None), contains_varpositional, injected_pos,
+            injected, (f_args.name if f_args is not None else None), (f_kwargs.name if f_kwargs is not None else None),
+            (f_item.name if f_item is not None else None), (f_bound.name if f_bound is not None else None),
+            f_arg_names)
 
 
 # -----------
@@ -293,7 +1086,7 @@ class SignatureInfo(object):
     Provides handy properties to separate the code requirements from the implementation (and possibly cache).
     """
     __slots__ = '_exposed_signature', 'first_arg_def', '_use_signature_trick', 'contains_varpositional', \
-                'injected_pos'
+                'injected_pos', '_defaults_vector'
 
     def __init__(self, decorator_signature, contains_varpositional, injected_pos):
         self._exposed_signature = decorator_signature
@@ -301,6 +1094,7 @@ class SignatureInfo(object):
         self._use_signature_trick = False
         self.contains_varpositional = contains_varpositional
         self.injected_pos = injected_pos
+        self._defaults_vector = None
 
     # --
 
@@ -334,6 +1128,30 @@ class SignatureInfo(object):
         self._exposed_signature = new_sig
         self.contains_varpositional = any(p.kind is Parameter.VAR_POSITIONAL for p in new_sig.parameters.values())
         _, self.first_arg_def = get_first_parameter(new_sig)
+        self._defaults_vector = None
+
+    @property
+    def defaults_vector(self):
+        """
+        Describes the default values of all arguments except the first one, in the form they are received by a function
+        with the exposed signature that is called through `with_signature` (see `utils_codegen.get_arguments_names`).
+        It is computed once, and used by `utils_disambiguation.are_other_args_default`.
+
+        :return: a tuple (nb_pos, pos_defaults, nb_kw, kw_defaults) where `nb_pos` is the number of arguments received
+            as positional (excluding the var-positional, unless it is the first argument), `pos_defaults` is a tuple of
+            (index, default) for the positional arguments, `nb_kw` is the number of arguments received as keyword
+            (excluding the var-keyword) and `kw_defaults` a tuple of (name, default) for the keyword arguments.
+        """
+        if self._defaults_vector is None:
+            pos_names, _, kw_names, _ = get_arguments_names(self._exposed_signature)
+            params = self._exposed_signature.parameters
+            first_arg_name = self.first_arg_name
+            pos_defaults = tuple((i, params[n].default) for i, n in enumerate(pos_names) if n != first_arg_name)
+            kw_defaults = tuple((n, params[n].default) for n in kw_names if n != first_arg_name)
+            # if the first argument is a var-positional, it is received at the end of the positional arguments
+            nb_pos = len(pos_names) + (1 if self.is_first_arg_varpositional else 0)
+            self._defaults_vector = nb_pos, pos_defaults, len(kw_names), kw_defaults
+        return self._defaults_vector
 
     # --
 
@@ -0,0 +1,14 @@
+from decopatch import function_decorator, WRAPPED, F_ARGS, F_KWARGS
+
+
+def create_test_wrapped_kwonly():
+
+    @function_decorator
+    def my_deco(*, tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f_args, f_kwargs, f(*f_args, **f_kwargs)
+
+    @my_deco(tag="hi")
+    def foo(a, *args, b: int = 2, **kwargs) -> int:
+        return a + b
+
+    return foo
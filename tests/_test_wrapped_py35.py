@@ -0,0 +1,20 @@
+from decopatch import function_decorator, WRAPPED, F_ARGS, F_KWARGS
+
+
+def create_test_wrapped_coroutine(async_impl):
+
+    if async_impl:
+        @function_decorator
+        async def add_one(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+            return (await f(*f_args, **f_kwargs)) + 1
+    else:
+        @function_decorator
+        def add_one(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+            # a normal function returning an awaitable
+            return f(*f_args, **f_kwargs)
+
+    @add_one
+    async def foo(a, b=2):
+        return a + b
+
+    return foo
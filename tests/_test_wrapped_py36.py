@@ -0,0 +1,28 @@
+from decopatch import function_decorator, WRAPPED, F_ARGS, F_KWARGS, F_ITEM
+
+
+def create_test_wrapped_async_generator(per_item, async_impl, lazy_wrapping=False):
+
+    if not per_item:
+        @function_decorator(lazy_wrapping=lazy_wrapping)
+        def my_deco(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+            return f(*f_args, **f_kwargs)
+    elif async_impl:
+        @function_decorator(lazy_wrapping=lazy_wrapping)
+        async def my_deco(f=WRAPPED, item=F_ITEM):
+            return item * 2
+    else:
+        @function_decorator(lazy_wrapping=lazy_wrapping)
+        def my_deco(f=WRAPPED, item=F_ITEM):
+            return item * 2
+
+    @my_deco
+    async def agen(n):
+        for i in range(n):
+            yield i
+
+    return agen
+
+
+async def consume(agen):
+    return [i async for i in agen]
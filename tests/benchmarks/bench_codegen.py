@@ -0,0 +1,162 @@
+"""
+Compares the code generation engines on the creation of decorators and signature-preserving wrappers, which mostly
+happens at import time of the modules using decopatch. The reference is the creation with `makefun.with_signature`
+and `makefun.wraps`, as done by decopatch 1.4.
+
+ - creation of a decorator and of wrappers for `nb_shapes` distinct signature shapes,
+ - import time of a generated module defining `nb_decorators` decorators, each applied to a function. Each import
+   is performed in a new python process.
+
+    python -m tests.benchmarks.bench_codegen [nb_shapes] [nb_decorators]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from timeit import default_timer
+
+from makefun import with_signature, wraps
+
+from decopatch import function_decorator, WRAPPED, F_ARGS, F_KWARGS
+from decopatch.utils_codegen import clear_code_cache
+
+
+def make_targets(nb_shapes):
+    """Returns `nb_shapes` functions that all have a different signature shape"""
+    targets = []
+    for i in range(nb_shapes):
+        def target(*args, **kwargs):
+            return args, kwargs
+        target.__signature__ = _make_signature(i)
+        targets.append(target)
+    return targets
+
+
+def _make_signature(i):
+    from inspect import Parameter, Signature
+    params = [Parameter("a%s" % j, Parameter.POSITIONAL_OR_KEYWORD) for j in range(i % 20)]
+    params += [Parameter("k%s" % j, Parameter.KEYWORD_ONLY, default=j) for j in range(i // 20)]
+    return Signature(params)
+
+
+def bench(engine, targets):
+    """Returns the time needed to create a decorator with `engine` and to apply it on all `targets`"""
+    clear_code_cache()
+    start = default_timer()
+
+    @function_decorator(codegen_engine=engine)
+    def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return f(*f_args, **f_kwargs)
+
+    d = my_deco("hi")
+    for t in targets:
+        d(t)
+    return default_timer() - start
+
+
+def bench_makefun(targets):
+    """Same as `bench`, with the decorator and the wrappers created by `makefun`, as in decopatch 1.4"""
+    start = default_timer()
+
+    @with_signature("my_deco(tag='hello')")
+    def my_deco(tag):
+        def _apply(f):
+            @wraps(f)
+            def _wrapper(*f_args, **f_kwargs):
+                return f(*f_args, **f_kwargs)
+            return _wrapper
+        return _apply
+
+    d = my_deco("hi")
+    for t in targets:
+        d(t)
+    return default_timer() - start
+
+
+def make_module_source(nb_decorators, reference=False, lazy=False):
+    """
+    Returns the source of a module defining `nb_decorators` decorators with various signatures, each applied to a
+    function. If `reference` is True they are created with `makefun` as in decopatch 1.4, otherwise with decopatch.
+    """
+    if reference:
+        lines = ["from makefun import with_signature, wraps", ""]
+    else:
+        lines = ["from decopatch import function_decorator, WRAPPED, F_ARGS, F_KWARGS", ""]
+    for i in range(nb_decorators):
+        deco_params = ", ".join("t%s=%s" % (j, j) for j in range(i % 5))
+        func_params = ", ".join("a%s" % j for j in range(i % 7))
+        if reference:
+            lines += ["@with_signature('deco_%s(%s)')" % (i, deco_params),
+                      "def deco_%s(**kwargs):" % i,
+                      "    def _apply(f):",
+                      "        @wraps(f)",
+                      "        def _wrapper(*f_args, **f_kwargs):",
+                      "            return f(*f_args, **f_kwargs)",
+                      "        return _wrapper",
+                      "    return _apply"]
+        else:
+            lines += ["@function_decorator(lazy=%s)" % lazy,
+                      "def deco_%s(%sf=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):"
+                      % (i, deco_params + ", " if deco_params else ""),
+                      "    return f(*f_args, **f_kwargs)"]
+        lines += ["", "",
+                  "@deco_%s()" % i,
+                  "def func_%s(%s):" % (i, func_params),
+                  "    return %s" % i,
+                  "", ""]
+    return "\n".join(lines)
+
+
+_IMPORT_SCRIPT = """
+import sys
+from timeit import default_timer
+sys.path.insert(0, %r)
+# import decopatch and makefun beforehand, so that only the import of the module is measured
+from decopatch import utils_codegen
+from decopatch.utils_modes import create_wrapper
+engine = %r
+if engine is not None:
+    utils_codegen.set_default_codegen_engine(engine)
+start = default_timer()
+import %s
+print(default_timer() - start)
+"""
+
+
+def bench_import(engine, nb_decorators, reference=False, lazy=False):
+    """
+    Returns the time needed to import a generated module defining `nb_decorators` decorators (see
+    `make_module_source`), in a new python process where decopatch and makefun are already imported. The on-disk code
+    cache is disabled.
+    """
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        module_name = "bench_decorators_module"
+        with open(os.path.join(tmp_dir, module_name + ".py"), "w") as f:
+            f.write(make_module_source(nb_decorators, reference=reference, lazy=lazy))
+        env = dict(os.environ)
+        env.pop("DECOPATCH_CODE_CACHE_DIR", None)
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        script = _IMPORT_SCRIPT % (tmp_dir, engine, module_name)
+        return float(subprocess.check_output([sys.executable, "-c", script], env=env).decode().strip())
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    nb_shapes = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    nb_decorators = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    engines = ('compile', 'templates') if sys.version_info >= (3, 8) else ('compile',)
+
+    print("Creation of a decorator and of wrappers for %s distinct signature shapes:" % nb_shapes)
+    targets = make_targets(nb_shapes)
+    print("  %-20s: %.1fms" % ('makefun (reference)', bench_makefun(targets) * 1000))
+    for engine in engines:
+        print("  %-20s: %.1fms" % (engine, bench(engine, targets) * 1000))
+
+    print("Import of a module defining %s decorators, each applied to a function:" % nb_decorators)
+    print("  %-20s: %.1fms" % ('makefun (reference)', bench_import(None, nb_decorators, reference=True) * 1000))
+    for engine in engines:
+        print("  %-20s: %.1fms" % (engine, bench_import(engine, nb_decorators) * 1000))
+        print("  %-20s: %.1fms" % (engine + ", lazy=True", bench_import(engine, nb_decorators, lazy=True) * 1000))
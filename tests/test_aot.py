@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import decopatch
+
+
+PACKAGE_INIT = """
+from decopatch import function_decorator, DECORATED, WRAPPED, F_ARGS, F_KWARGS
+
+
+@function_decorator
+def tag(label='a', f=DECORATED):
+    f.label = label
+    return f
+
+
+@function_decorator
+def trace(prefix='>', f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+    return prefix, f(*f_args, **f_kwargs)
+
+
+@tag(label='b')
+def foo(a, b=1, *args, **kwargs):
+    return a
+
+
+@trace
+def bar(x, y=2):
+    return x + y
+"""
+
+CHECK_NO_COMPILE = """
+from decopatch import utils_codegen
+
+def _fail(source, *args, **kwargs):
+    raise AssertionError("compiled at runtime: %r" % source)
+
+utils_codegen.compile = _fail
+
+import decopatch_aot_pkg
+assert decopatch_aot_pkg.foo.label == 'b'
+assert decopatch_aot_pkg.bar(1) == ('>', 3)
+assert 'decopatch_aot_pkg._decopatch_compiled' in __import__('sys').modules
+"""
+
+
+def _run(tmp_path, *args):
+    env = dict(os.environ)
+    src_dir = os.path.dirname(os.path.dirname(decopatch.__file__))
+    env['PYTHONPATH'] = os.pathsep.join([str(tmp_path), src_dir] + [p for p in (env.get('PYTHONPATH'),) if p])
+    return subprocess.run((sys.executable,) + args, env=env, cwd=str(tmp_path),
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+
+
+def test_compile_package(tmp_path):
+    """Checks that `python -m decopatch compile` creates a companion module, used at runtime instead of compiling"""
+    pkg_dir = tmp_path / "decopatch_aot_pkg"
+    pkg_dir.mkdir()
+    (pkg_dir / "__init__.py").write_text(PACKAGE_INIT)
+
+    # without the companion module, code is compiled at runtime
+    res = _run(tmp_path, "-c", CHECK_NO_COMPILE)
+    assert res.returncode != 0
+    assert "compiled at runtime" in res.stdout
+
+    res = _run(tmp_path, "-m", "decopatch", "compile", "decopatch_aot_pkg")
+    assert res.returncode == 0, res.stdout
+    assert (pkg_dir / "_decopatch_compiled.py").exists()
+
+    res = _run(tmp_path, "-c", CHECK_NO_COMPILE)
+    assert res.returncode == 0, res.stdout
+
+
+def test_compile_not_a_package(tmp_path):
+    """Checks that an explicit error is reported for modules that are not packages"""
+    (tmp_path / "decopatch_aot_mod.py").write_text(u"")
+    res = _run(tmp_path, "-m", "decopatch", "compile", "decopatch_aot_mod")
+    assert res.returncode == 1
+    assert "is not a package" in res.stdout
@@ -0,0 +1,335 @@
+import os
+import sys
+
+import pytest
+
+try:  # python 3.3+
+    from inspect import signature
+except ImportError:
+    from funcsigs import signature
+
+from decopatch import function_decorator, decorator, WRAPPED, F_ARGS, F_KWARGS, F_ITEM, F_BOUND, F_ARG, DECORATED
+from decopatch import utils_codegen
+from decopatch.utils_codegen import get_function_code, clear_code_cache
+from decopatch import utils_diskcache
+from decopatch.utils_diskcache import set_code_cache_dir
+
+
+def test_wrapper_code_is_shared():
+    """Checks that the code of wrappers is compiled once per signature shape"""
+
+    @function_decorator
+    def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f(*f_args, **f_kwargs)
+
+    def foo(a, b=1):
+        return a + b
+
+    def bar(a, b=2):
+        return a * b
+
+    def baz(a, c=2):
+        return a * c
+
+    wfoo = my_deco(foo)
+    nb_codes = len(utils_codegen._code_cache)
+
+    # same shape, different defaults: same compiled code
+    wbar = my_deco(bar)
+    assert len(utils_codegen._code_cache) == nb_codes
+    if sys.version_info >= (3, 8):
+        # code objects are renamed
+        assert wfoo.__code__.co_name == 'foo'
+        assert wbar.__code__.co_name == 'bar'
+
+    # different shape, new code
+    wbaz = my_deco('hi')(baz)
+    assert len(utils_codegen._code_cache) == nb_codes + 1
+
+    # but each wrapper has its own namespace and defaults
+    assert wfoo(1) == ('hello', 2)
+    assert wbar(3) == ('hello', 6)
+    assert wbaz(3) == ('hi', 6)
+    assert wbaz.__defaults__ == (2,)
+
+
+def test_code_cache():
+    """Checks that the code cache is used and bounded"""
+    clear_code_cache()
+    c1 = get_function_code("a, b=None", ["return a"])
+    c2 = get_function_code("a, b=None", ["return a"])
+    assert c1 is c2
+    assert len(utils_codegen._code_cache) == 1
+
+    clear_code_cache()
+    assert get_function_code("a, b=None", ["return a"]) is not c1
+
+
+def test_code_cache_eviction(monkeypatch):
+    """Checks that the oldest entries are evicted when the code cache is full"""
+    clear_code_cache()
+    monkeypatch.setattr(utils_codegen, 'CODE_CACHE_MAXSIZE', 2)
+    get_function_code("a", ["return a"])
+    get_function_code("b", ["return b"])
+    get_function_code("c", ["return c"])
+    assert len(utils_codegen._code_cache) == 2
+    clear_code_cache()
+
+
+@pytest.fixture
+def code_cache_dir(tmp_path):
+    """Enables the on-disk code cache in a temporary directory"""
+    cache_dir = tmp_path / "codecache"
+    set_code_cache_dir(str(cache_dir))
+    yield cache_dir
+    set_code_cache_dir(None)
+
+
+def test_disk_code_cache(code_cache_dir, monkeypatch):
+    """Checks that compiled code is stored on disk and reused instead of being compiled again"""
+    clear_code_cache()
+    c1 = get_function_code("a, b=None", ["return a, b"])
+    entries = os.listdir(str(code_cache_dir))
+    assert len(entries) == 1 and entries[0].endswith(utils_diskcache.CACHE_SUFFIX)
+
+    # a new process: the code is loaded from disk
+    clear_code_cache()
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("the code should not be compiled")
+
+    monkeypatch.setattr(utils_codegen, 'compile', _fail, raising=False)
+    c2 = get_function_code("a, b=None", ["return a, b"])
+    assert c2 is not c1
+    assert c2 == c1
+    clear_code_cache()
+
+
+def test_disk_code_cache_eviction(code_cache_dir):
+    """Checks that the least recently used entries are removed when the on-disk code cache is too big"""
+    clear_code_cache()
+    for i in range(4):
+        get_function_code("a%s" % i, ["return a%s" % i])
+    paths = [str(code_cache_dir / name) for name in os.listdir(str(code_cache_dir))]
+    assert len(paths) == 4
+    for i, path in enumerate(sorted(paths)):
+        os.utime(path, (i, i))
+
+    entry_size = os.path.getsize(paths[0])
+    assert utils_diskcache.evict(maxsize=2 * entry_size) == 2
+    assert sorted(os.listdir(str(code_cache_dir))) == sorted(os.path.basename(p) for p in sorted(paths)[2:])
+    assert utils_diskcache.evict(maxsize=0) == 2
+    assert os.listdir(str(code_cache_dir)) == []
+    clear_code_cache()
+
+
+def test_decorator_code_is_shared():
+    """Checks that the decorators generated by decopatch share their code when their signature have the same shape"""
+
+    @decorator(use_signature_trick=False)
+    def one(tag="hello", f=DECORATED):
+        return f
+
+    nb_codes = len(utils_codegen._code_cache)
+
+    @decorator(use_signature_trick=False)
+    def two(tag="hi", f=DECORATED):
+        return f
+
+    assert len(utils_codegen._code_cache) == nb_codes
+    assert one.__name__ == 'one'
+    assert two.__name__ == 'two'
+    assert str(signature(two)) == "(tag='hi')"
+
+
+def test_f_kwargs_without_dict_unpacking(monkeypatch):
+    """Checks the `f_kwargs` expression used on python < 3.5, where `{**kwargs}` is not available: it calls `dict`,
+    that has to be bound in the wrapper namespace since builtins are not available there"""
+
+    class _OldSys(object):
+        version_info = (3, 4)
+
+    monkeypatch.setattr(utils_codegen, 'sys', _OldSys)
+
+    @function_decorator
+    def trace(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return f_args, f_kwargs
+
+    @trace
+    def foo(a, b=2, **kwargs):
+        pass
+
+    assert foo.__globals__[utils_codegen.DICT_NAME] is dict
+    assert foo(1, c=3) == ((), {'a': 1, 'b': 2, 'c': 3})
+
+
+@pytest.mark.parametrize('engine', ['compile', 'templates'], ids="engine={}".format)
+def test_reserved_names(engine):
+    """Checks that names reserved by decopatch can not be used in the wrapped functions"""
+    if engine == 'templates' and sys.version_info < (3, 8):
+        pytest.skip("the 'templates' engine requires python 3.8+")
+
+    @function_decorator(codegen_engine=engine)
+    def my_deco(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return f(*f_args, **f_kwargs)
+
+    def foo(_decopatch_impl_):
+        pass
+
+    with pytest.raises(NameError):
+        my_deco(foo)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="the 'templates' engine requires python 3.8+")
+def test_templates_engine():
+    """Checks that the 'templates' engine creates the same decorators and wrappers, without compiling any code"""
+
+    @function_decorator(codegen_engine='templates')
+    def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS, f_bound=F_BOUND, a=F_ARG('a')):
+        """doc"""
+        assert f_bound['a'] == a == f_args[0]
+        return tag, f_args, f_kwargs, f(*f_args, **f_kwargs)
+
+    def foo(a, b=2, *args, c, **kwargs):
+        """foo doc"""
+        return a + b + c
+
+    nb_compiled = sum(isinstance(k, str) for k in utils_codegen._code_cache)
+    wfoo = my_deco('hi')(foo)
+    assert sum(isinstance(k, str) for k in utils_codegen._code_cache) == nb_compiled
+
+    assert str(signature(my_deco)) == "(tag='hello')"
+    assert my_deco.__doc__ == "doc"
+    assert str(signature(wfoo)) == "(a, b=2, *args, c, **kwargs)"
+    assert wfoo.__name__ == 'foo'
+    assert wfoo.__doc__ == 'foo doc'
+    assert wfoo.__wrapped__ is foo
+    assert wfoo(1, c=1) == ('hi', (1, 2), {'c': 1}, 4)
+    assert wfoo(1, 3, 4, c=1, d=2) == ('hi', (1, 3, 4), {'c': 1, 'd': 2}, 5)
+
+    # signature is enforced by python
+    with pytest.raises(TypeError):
+        wfoo(1)
+    with pytest.raises(TypeError):
+        my_deco('hi', 'ho')
+
+    # without per-call arguments, the same keyword arguments are sent to each call
+    @function_decorator(codegen_engine='templates')
+    def my_deco2(tag="hello", f=WRAPPED):
+        return tag, f
+
+    wfoo = my_deco2('hi')(foo)
+    assert wfoo(1, c=1) == ('hi', foo)
+    assert wfoo(2, c=2) == ('hi', foo)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="the 'templates' engine requires python 3.8+")
+def test_templates_engine_generators_and_coroutines():
+    """Checks that the 'templates' engine supports generators, the F_ITEM hook and coroutines"""
+    from asyncio import new_event_loop
+    from inspect import isgeneratorfunction, iscoroutinefunction
+    from ._test_wrapped_py35 import create_test_wrapped_coroutine
+
+    @function_decorator(codegen_engine='templates')
+    def double_items(f=WRAPPED, item=F_ITEM):
+        return item * 2
+
+    @double_items
+    def gen(n):
+        for i in range(n):
+            yield i
+
+    assert isgeneratorfunction(gen)
+    assert list(gen(3)) == [0, 2, 4]
+
+    utils_codegen.set_default_codegen_engine('templates')
+    try:
+        foo = create_test_wrapped_coroutine(async_impl=True)
+    finally:
+        utils_codegen.set_default_codegen_engine('compile')
+
+    assert iscoroutinefunction(foo)
+    loop = new_event_loop()
+    try:
+        assert loop.run_until_complete(foo(1)) == 4
+    finally:
+        loop.close()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="the 'templates' engine requires python 3.8+")
+def test_templates_engine_lazy(monkeypatch):
+    """Checks that with the 'templates' engine, the stubs created with `lazy=True` are not compiled"""
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("the code should not be compiled")
+
+    monkeypatch.setattr(utils_codegen, 'compile', _fail, raising=False)
+    clear_code_cache()
+
+    @decorator(codegen_engine='templates', lazy=True, use_signature_trick=False)
+    def tag(tag="hello", f=DECORATED):
+        f.tag = tag
+        return f
+
+    @function_decorator(codegen_engine='templates', lazy=True)
+    def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f(*f_args, **f_kwargs)
+
+    def foo(a, b=2):
+        return a + b
+
+    stub_code = tag.__code__
+    assert tag(foo).tag == 'hello'
+    assert tag('hi')(foo).tag == 'hi'
+    # the stub has become the decorator
+    assert tag.__code__ is not stub_code
+    assert tag(foo).tag == 'hello'
+
+    assert my_deco(foo)(1) == ('hello', 3)
+    assert my_deco('hi')(foo)(1) == ('hi', 3)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 8), reason="the 'templates' engine requires python 3.8+")
+def test_templates_engine_lazy_wrapping(monkeypatch):
+    """Checks that with the 'templates' engine, the trampolines created with `lazy_wrapping=True` are not compiled"""
+    from inspect import isgeneratorfunction
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("the code should not be compiled")
+
+    monkeypatch.setattr(utils_codegen, 'compile', _fail, raising=False)
+    clear_code_cache()
+
+    @function_decorator(codegen_engine='templates', lazy_wrapping=True)
+    def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f(*f_args, **f_kwargs)
+
+    @function_decorator(codegen_engine='templates', lazy_wrapping=True)
+    def double_items(f=WRAPPED, item=F_ITEM):
+        return item * 2
+
+    def foo(a, b=2):
+        return a + b
+
+    def gen(n):
+        for i in range(n):
+            yield i
+
+    wfoo = my_deco('hi')(foo)
+    trampoline_code = wfoo.__code__
+    assert wfoo(1) == ('hi', 3)
+    assert wfoo.__code__ is not trampoline_code
+    assert wfoo(1, b=3) == ('hi', 4)
+
+    wgen = double_items(gen)
+    assert isgeneratorfunction(wgen)
+    assert list(wgen(3)) == [0, 2, 4]
+    assert list(wgen(2)) == [0, 2]
+
+
+def test_invalid_engine():
+    """Checks that an invalid engine name raises an error"""
+    with pytest.raises(ValueError):
+        @decorator(codegen_engine='foo')
+        def my_deco(f=DECORATED):
+            return f
@@ -0,0 +1,114 @@
+import sys
+from threading import Thread
+
+import pytest
+
+from decopatch import function_decorator, DECORATED, WRAPPED, F_ARGS, F_KWARGS
+
+
+@pytest.fixture
+def fast_thread_switch():
+    """Makes thread switches as frequent as possible during the test"""
+    try:
+        previous = sys.getswitchinterval()
+    except AttributeError:
+        # python 2
+        yield
+    else:
+        sys.setswitchinterval(1e-6)
+        yield
+        sys.setswitchinterval(previous)
+
+
+def run_in_threads(target, nb_threads=8):
+    """Runs `target(i)` in `nb_threads` threads and returns the list of exceptions raised, if any"""
+    errors = []
+
+    def _run(i):
+        try:
+            target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [Thread(target=_run, args=(i,)) for i in range(nb_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+@pytest.mark.parametrize('mode', ['flat', 'double-flat'], ids="mode={}".format)
+def test_concurrent_application(fast_thread_switch, mode):
+    """Checks that the same decorator usage can be applied concurrently on several objects from several threads"""
+
+    if mode == 'flat':
+        @function_decorator
+        def tag_with(tag, f=DECORATED):
+            def _wrapper():
+                return tag, f()
+            return _wrapper
+    else:
+        @function_decorator
+        def tag_with(tag, f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+            return tag, f(*f_args, **f_kwargs)
+
+    d = tag_with('hello')
+
+    def apply_many(i):
+        for j in range(200):
+            def foo(k=(i, j)):
+                return k
+            decorated = d(foo)
+            assert decorated() == ('hello', (i, j))
+
+    assert run_in_threads(apply_many) == []
+
+
+def test_concurrent_and_recursive_calls(fast_thread_switch):
+    """Checks that a WRAPPED-mode wrapper can be called concurrently and recursively"""
+
+    @function_decorator
+    def check_args(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        received = dict(f_kwargs)
+        res = f(*f_args, **f_kwargs)
+        # the recursive or concurrent calls did not modify what we received
+        assert f_kwargs == received
+        return res
+
+    @check_args
+    def fact(n):
+        return 1 if n <= 1 else n * fact(n - 1)
+
+    def call_many(i):
+        for n in range(i, i + 50):
+            assert fact(n) == fact(n - 1) * max(n, 1)
+
+    assert run_in_threads(call_many) == []
+
+
+@pytest.mark.parametrize('mode', ['flat', 'double-flat'], ids="mode={}".format)
+def test_application_does_not_modify_usage(mode):
+    """Checks that applying a decorator usage does not store the decorated object in the state shared by all
+    applications of the same usage: this is what makes concurrent applications safe."""
+
+    if mode == 'flat':
+        @function_decorator
+        def tag_with(tag, f=DECORATED):
+            return f
+    else:
+        @function_decorator
+        def tag_with(tag, f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+            return f(*f_args, **f_kwargs)
+
+    d = tag_with('hello')
+
+    def foo():
+        pass
+
+    d(foo)
+
+    # the applier only holds the arguments of the usage, and they were not modified
+    assert not hasattr(d, '__dict__')
+    assert d.args == ()
+    assert d.kwargs == {'tag': 'hello'}
@@ -0,0 +1,349 @@
+import pytest
+
+try:  # python 3.3+
+    from inspect import signature, Signature
+except ImportError:
+    from funcsigs import signature, Signature
+
+from decopatch import decorator, function_decorator, class_decorator, DECORATED, AmbiguousFirstArgumentTypeError, \
+    InvalidMandatoryArgError, FirstArgDisambiguation, InvalidParenthesisUsageError, ALWAYS_PARENTHESIS, \
+    NEVER_PARENTHESIS
+from decopatch.utils_disambiguation import DecoratorUsageInfo, disambiguate_call
+from decopatch.utils_modes import SignatureInfo
+
+
+@pytest.mark.parametrize('use_signature_trick', [True, False], ids="use_signature_trick={}".format)
+def test_dispatch_keyword_first_arg(use_signature_trick):
+    """Checks all the cases of the dispatcher, when the first argument can be provided as keyword"""
+
+    @decorator(use_signature_trick=use_signature_trick)
+    def tag(level=1, name='a', f=DECORATED):
+        f.tag = level, name
+        return f
+
+    def foo():
+        pass
+
+    assert tag(foo).tag == (1, 'a')
+    assert tag()(foo).tag == (1, 'a')
+    assert tag(2)(foo).tag == (2, 'a')
+    assert tag(name='b')(foo).tag == (1, 'b')
+
+    # a callable as first argument with another non-default argument: with parenthesis
+    assert tag(len, 'b')(foo).tag == (len, 'b')
+
+    @decorator(use_signature_trick=use_signature_trick)
+    def mandatory(level, name='a', f=DECORATED):
+        f.tag = level, name
+        return f
+
+    assert mandatory(2)(foo).tag == (2, 'a')
+    with pytest.raises(InvalidMandatoryArgError if use_signature_trick else TypeError):
+        mandatory(foo)
+
+
+@pytest.mark.parametrize('use_signature_trick', [True, False], ids="use_signature_trick={}".format)
+def test_dispatch_varpositional(use_signature_trick):
+    """Checks all the cases of the dispatcher, when the signature contains a var-positional"""
+
+    @decorator(use_signature_trick=use_signature_trick)
+    def tag(first=1, *others, **kw):
+        def apply(f):
+            f.tag = (first,) + others + tuple(kw.items())
+            return f
+        return apply
+
+    def foo():
+        pass
+
+    assert tag(foo).tag == (1,)
+    assert tag()(foo).tag == (1,)
+    assert tag(2, 3)(foo).tag == (2, 3)
+    assert tag(2, b=1)(foo).tag == (2, ('b', 1))
+    assert tag(len, b=1)(foo).tag == (len, ('b', 1))
+
+    # ambiguous case when the disambiguator can not decide
+    @decorator(use_signature_trick=use_signature_trick,
+               custom_disambiguator=lambda arg: FirstArgDisambiguation.is_ambiguous)
+    def tag2(first=1, *others):
+        return lambda f: f
+
+    with pytest.raises(AmbiguousFirstArgumentTypeError):
+        tag2(foo)
+
+
+def test_dispatch_varpositional_first():
+    """Checks the dispatcher without signature trick when the first argument is a var-positional"""
+
+    @decorator(use_signature_trick=False)
+    def tag(*tags, **kw):
+        def apply(f):
+            f.tag = tags, kw
+            return f
+        return apply
+
+    def foo():
+        pass
+
+    assert tag(foo).tag == ((), {})
+    assert tag('a', 'b')(foo).tag == (('a', 'b'), {})
+    assert tag(len, b=1)(foo).tag == ((len,), {'b': 1})
+
+
+def test_dispatch_no_bind(monkeypatch):
+    """Checks that without signature trick, disambiguation does not bind the arguments to the signature"""
+
+    @decorator(use_signature_trick=False)
+    def tag(level=1, name='a', f=DECORATED):
+        f.tag = level, name
+        return f
+
+    def foo():
+        pass
+
+    def fail(self, *args, **kwargs):
+        raise AssertionError("bind should not be called")
+
+    monkeypatch.setattr(Signature, 'bind', fail)
+    assert tag(foo).tag == (1, 'a')
+    assert tag(len, 'b')(foo).tag == (len, 'b')
+
+    # the generic disambiguation function does not bind either
+    sig_info = SignatureInfo(signature(tag), contains_varpositional=False, injected_pos=-1)
+    dk = DecoratorUsageInfo(sig_info, (), {'level': foo, 'name': 'a'})
+    assert disambiguate_call(dk, lambda arg: FirstArgDisambiguation.is_decorated_target) \
+        is FirstArgDisambiguation.is_decorated_target
+    dk = DecoratorUsageInfo(sig_info, (), {'level': foo, 'name': 'b'})
+    assert disambiguate_call(dk, lambda arg: FirstArgDisambiguation.is_decorated_target) \
+        is FirstArgDisambiguation.is_normal_arg
+
+
+@pytest.mark.parametrize('use_signature_trick', [True, False], ids="use_signature_trick={}".format)
+def test_intern_appliers(use_signature_trick):
+    """Checks that with `intern_appliers=True` the appliers are reused for the same hashable arguments"""
+    calls = []
+
+    @decorator(use_signature_trick=use_signature_trick, intern_appliers=True)
+    def tag(level=1, name='a', f=DECORATED):
+        calls.append(level)
+        f.tag = level, name
+        return f
+
+    def foo():
+        pass
+
+    d = tag(level=3)
+    assert tag(level=3) is d
+    assert tag(level=4) is not d
+    # values that are equal but have different types are not mixed up
+    assert tag(level=1) is not tag(level=True)
+    assert tag(level=1, name=1) is not tag(name=True, level=1)
+    assert tag(1) is not tag(True)
+    assert tag(1) is not tag(1.0)
+    # ... including inside containers
+    assert tag(level=(0, 'a')) is tag(level=(0, 'a'))
+    assert tag(level=(0, 'a')) is not tag(level=(False, 'a'))
+    assert tag(level=((1,),)) is not tag(level=((True,),))
+    assert tag(level=frozenset([1])) is not tag(level=frozenset([1.0]))
+    if not use_signature_trick:
+        # arguments are normalized by the generated signature
+        assert tag(3) is d
+        assert tag(name='a', level=3) is d
+
+    # unhashable arguments are not interned
+    assert tag(level=[1]) is not tag(level=[1])
+
+    # a pre-bound applier can be applied any number of times
+    for i in range(3):
+        def bar():
+            pass
+        assert d(bar).tag == (3, 'a')
+    assert d(foo).tag == (3, 'a')
+    assert calls == [3, 3, 3, 3]
+    assert tag(foo).tag == (1, 'a')
+
+
+def test_intern_appliers_maxsize():
+    """Checks that the interned appliers are kept in a bounded cache"""
+
+    @decorator(intern_appliers=2)
+    def tag(level=1, f=DECORATED):
+        return f
+
+    d1 = tag(1)
+    tag(2)
+    assert tag(1) is d1
+    tag(3)
+    assert tag(1) is not d1
+
+
+def test_intern_appliers_signature():
+    """Checks that interning appliers does not change the signature of the decorator"""
+
+    @decorator(intern_appliers=True)
+    def tag(level=1, f=DECORATED):
+        return f
+
+    assert str(signature(tag)) == "(level=1)"
+
+
+@pytest.mark.parametrize('nb_args', [0, 1, 2], ids="nb_args={}".format)
+def test_usage_always_parenthesis(nb_args):
+    """Checks that with `usage=ALWAYS_PARENTHESIS` the decorator can only be used with parenthesis"""
+
+    if nb_args == 0:
+        @decorator(usage=ALWAYS_PARENTHESIS)
+        def tag(f=DECORATED):
+            f.tag = ()
+            return f
+    elif nb_args == 1:
+        @decorator(usage='always_parenthesis')
+        def tag(level=1, f=DECORATED):
+            f.tag = (level,)
+            return f
+    else:
+        @decorator(usage=ALWAYS_PARENTHESIS)
+        def tag(level, name='a', f=DECORATED):
+            f.tag = (level, name)
+            return f
+
+    def foo():
+        pass
+
+    if nb_args == 0:
+        assert tag()(foo).tag == ()
+        assert str(signature(tag)) == "()"
+    elif nb_args == 1:
+        assert tag()(foo).tag == (1,)
+        assert tag(2)(foo).tag == (2,)
+        # a callable can be passed as keyword
+        assert tag(level=int)(foo).tag == (int,)
+    else:
+        assert tag(2)(foo).tag == (2, 'a')
+        assert tag(int, name='b')(foo).tag == (int, 'b')
+        with pytest.raises(TypeError):
+            tag()
+
+    with pytest.raises(InvalidParenthesisUsageError):
+        @tag
+        def bar():
+            pass
+
+
+def test_usage_never_parenthesis():
+    """Checks that with `usage=NEVER_PARENTHESIS` the decorator can only be used without parenthesis"""
+
+    @decorator(usage=NEVER_PARENTHESIS)
+    def tag(level=1, f=DECORATED):
+        f.tag = level
+        return f
+
+    @tag
+    def foo():
+        pass
+
+    assert foo.tag == 1
+
+    for args, kwargs in [((), {}), ((2,), {'level': 3}), ((), {'level': 3}), ((1, 2), {})]:
+        with pytest.raises(InvalidParenthesisUsageError):
+            tag(*args, **kwargs)
+
+    # mandatory arguments can not be used
+    with pytest.raises(ValueError):
+        @decorator(usage=NEVER_PARENTHESIS)
+        def tag2(level, f=DECORATED):
+            return f
+
+
+def test_usage_never_parenthesis_misuse():
+    """Checks that decorators with `usage=NEVER_PARENTHESIS` report explicitly the calls with invalid targets"""
+
+    @function_decorator(usage=NEVER_PARENTHESIS)
+    def tag(level=1, f=DECORATED):
+        f.tag = level
+        return f
+
+    def foo():
+        pass
+
+    # @tag(1)
+    with pytest.raises(InvalidParenthesisUsageError) as exc_info:
+        tag(1)
+    assert "not a function it can decorate" in str(exc_info.value)
+
+    # tag(a, b)
+    with pytest.raises(InvalidParenthesisUsageError):
+        tag(foo, foo)
+
+    # a class can not be decorated by a function decorator
+    with pytest.raises(InvalidParenthesisUsageError):
+        @tag
+        class Foo(object):
+            pass
+
+    @class_decorator(usage=NEVER_PARENTHESIS)
+    def ctag(f=DECORATED):
+        f.tag = True
+        return f
+
+    with pytest.raises(InvalidParenthesisUsageError) as exc_info:
+        ctag(foo)
+    assert "not a class it can decorate" in str(exc_info.value)
+
+    @ctag
+    class Bar(object):
+        pass
+
+    assert Bar.tag
+
+
+def test_usage_invalid():
+    """Checks the errors raised for invalid `usage` settings"""
+
+    with pytest.raises(ValueError):
+        @decorator(usage='sometimes')
+        def tag(f=DECORATED):
+            return f
+
+    with pytest.raises(ValueError):
+        @decorator(usage=ALWAYS_PARENTHESIS, custom_disambiguator=lambda f: FirstArgDisambiguation.is_normal_arg)
+        def tag2(f=DECORATED):
+            return f
+
+
+def test_custom_disambiguator_table():
+    """Checks that a mapping of types can be used as custom disambiguator, and is resolved according to the MRO"""
+    from abc import ABCMeta
+
+    # (python 2 and 3 compliant way to create an ABC)
+    Token = ABCMeta('Token', (object,), {})
+
+    class Retryable(object):
+        def __call__(self):
+            pass
+
+    @decorator(custom_disambiguator={BaseException: FirstArgDisambiguation.is_normal_arg,
+                                     Retryable: FirstArgDisambiguation.is_normal_arg,
+                                     Token: lambda arg: FirstArgDisambiguation.is_normal_arg})
+    def retry(on=None, f=DECORATED):
+        f.on = on
+        return f
+
+    def foo():
+        pass
+
+    # no matching entry: decorated target
+    assert retry(foo).on is None
+    # classes are resolved according to their MRO
+    assert retry(ValueError)(foo).on is ValueError
+    # other objects according to the MRO of their type
+    r = Retryable()
+    assert retry(r)(foo).on is r
+
+    class RetryableClass(object):
+        pass
+
+    # classes that are not registered are decorated targets, until a matching ABC is registered
+    assert retry(RetryableClass).on is None
+    Token.register(RetryableClass)
+    assert retry(RetryableClass)(foo).on is RetryableClass
@@ -0,0 +1,61 @@
+import os
+import sys
+from subprocess import Popen, PIPE
+
+import pytest
+
+import decopatch
+
+
+IMPORT_TIME_BUDGET_US = 20000
+"""Maximum cumulative time of `import decopatch` in microseconds, generous enough for slow CI machines and for the
+compilation of `__init__.py` when there is no bytecode cache"""
+
+
+def get_import_times(statement):
+    """Runs `statement` in a new interpreter with `-X importtime`, and returns the cumulative import time by module"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(os.path.dirname(decopatch.__file__))]
+                                        + [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+    p = Popen([sys.executable, '-X', 'importtime', '-c', statement], stdout=PIPE, stderr=PIPE, env=env)
+    _, err = p.communicate()
+    assert p.returncode == 0, err
+
+    times = dict()
+    for line in err.decode('utf-8').splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            try:
+                times[name.strip()] = int(cumulative)
+            except ValueError:
+                pass  # header
+    return times
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime and lazy imports require python 3.7+")
+def test_import_time():
+    """Checks that `import decopatch` is fast, and does not import any submodule nor dependency"""
+    times = get_import_times("import decopatch")
+
+    assert times['decopatch'] < IMPORT_TIME_BUDGET_US
+    for name in ('decopatch.main', 'decopatch.utils_modes', 'decopatch.utils_codegen', 'decopatch.utils_disambiguation',
+                 'makefun', 'setuptools_scm'):
+        assert name not in times
+
+    # standard library modules may be imported by the interpreter itself at startup (e.g. linecache on python 3.13)
+    baseline = get_import_times("pass")
+    for name in ('inspect', 'enum', 'linecache'):
+        assert name not in times or name in baseline
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime and lazy imports require python 3.7+")
+def test_lazy_symbols():
+    """Checks that public symbols and submodules are imported on first access"""
+    times = get_import_times("import decopatch; decopatch.function_decorator; decopatch.__version__")
+    assert 'decopatch.main' in times
+    assert 'setuptools_scm' not in times
+
+    assert 'decorator' in dir(decopatch)
+    assert decopatch.utils_lazy.LazyDecorator is not None
+    with pytest.raises(AttributeError):
+        decopatch.foo
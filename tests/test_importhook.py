@@ -0,0 +1,170 @@
+import os
+import sys
+
+import pytest
+
+from decopatch import utils_importhook
+from decopatch.utils_importhook import install_import_hook, uninstall_import_hook, SUPPORTS_IMPORT_HOOK
+
+
+MODULE_SOURCE = """
+from decopatch import decorator, DECORATED
+
+
+@decorator
+def tag(target=None, f=DECORATED):
+    f.target = target
+    return f
+
+
+def goo():
+    pass
+
+
+@tag
+def foo():
+    pass
+
+
+@tag(goo)
+def bar():
+    pass
+
+
+@tag(
+    goo
+)
+class Bar:
+    pass
+
+
+def hoo():
+    pass
+
+
+# manual application, disambiguated as usual
+hoo_tagged = tag(hoo)
+"""
+
+
+@pytest.fixture
+def hooked_package(tmp_path):
+    """Creates a package with a module using ambiguous decorators, and installs the import hook for it"""
+    pkg_dir = tmp_path / "decopatch_hooked_pkg"
+    pkg_dir.mkdir()
+    (pkg_dir / "__init__.py").write_text(u"")
+    (pkg_dir / "mod.py").write_text(MODULE_SOURCE)
+    sys.path.insert(0, str(tmp_path))
+    install_import_hook('decopatch_hooked_pkg')
+    yield pkg_dir
+    uninstall_import_hook()
+    sys.path.remove(str(tmp_path))
+    for name in ('decopatch_hooked_pkg.mod', 'decopatch_hooked_pkg'):
+        sys.modules.pop(name, None)
+
+
+@pytest.mark.skipif(not SUPPORTS_IMPORT_HOOK, reason="requires python 3.8+")
+def test_import_hook(hooked_package, monkeypatch):
+    """Checks that the import hook index disambiguates all usages, and is reused by warm imports"""
+    from decopatch_hooked_pkg import mod
+
+    # without the index, @tag(goo) would be considered as a no-parenthesis usage on goo
+    assert mod.foo.target is None
+    assert mod.bar.target is mod.goo
+    assert mod.Bar.target is mod.goo
+    assert mod.hoo_tagged is mod.hoo
+    assert mod.hoo.target is None
+
+    # the index is stored next to the bytecode cache
+    index_files = [f for f in os.listdir(str(hooked_package / "__pycache__")) if f.endswith('.decopatch')]
+    assert len(index_files) == 2
+
+    # warm import: the source is not parsed again
+    del sys.modules['decopatch_hooked_pkg.mod']
+    utils_importhook._indexes.clear()
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("the source should not be parsed")
+
+    monkeypatch.setattr(utils_importhook.ast, 'parse', _fail)
+    from decopatch_hooked_pkg import mod
+    assert mod.bar.target is mod.goo
+
+
+@pytest.mark.skipif(not SUPPORTS_IMPORT_HOOK, reason="requires python 3.8+")
+def test_import_hook_stale_index(hooked_package):
+    """Checks that an outdated index is not used"""
+    from decopatch_hooked_pkg import mod
+    mod_path = str(hooked_package / "mod.py")
+    assert utils_importhook.is_bare_decorator_line(mod_path, 15) is True
+    assert utils_importhook.is_bare_decorator_line(mod_path, 16) is None
+    assert utils_importhook.is_bare_decorator_line(mod_path, 20) is False
+    # lines outside of decorator expressions are not in the index
+    assert utils_importhook.is_bare_decorator_line(mod_path, 12) is None
+    assert utils_importhook.is_bare_decorator_line(mod_path, 37) is None
+
+    # add two lines at the top of the module
+    with open(mod_path, 'w') as f:
+        f.write("\n\n" + MODULE_SOURCE)
+    utils_importhook._indexes.clear()
+    assert utils_importhook.is_bare_decorator_line(mod_path, 15) is None
+    assert utils_importhook.is_bare_decorator_line(mod_path, 17) is True
+    assert utils_importhook.is_bare_decorator_line(mod_path, 22) is False
+    assert utils_importhook.is_bare_decorator_line('<string>', 1) is None
+
+
+LAZY_MODULE_SOURCE = """
+from decopatch import decorator, DECORATED
+
+
+@decorator(lazy=True)
+def tag(target=None, f=DECORATED):
+    f.target = target
+    return f
+
+
+def goo():
+    pass
+
+
+@tag
+def foo():
+    pass
+
+
+@tag(goo)
+def bar():
+    pass
+"""
+
+
+@pytest.mark.skipif(not SUPPORTS_IMPORT_HOOK, reason="requires python 3.8+")
+def test_import_hook_lazy(hooked_package):
+    """Checks that the frames of lazy decorators are skipped when looking up the index"""
+    (hooked_package / "lazy_mod.py").write_text(LAZY_MODULE_SOURCE)
+    try:
+        from decopatch_hooked_pkg import lazy_mod
+        assert lazy_mod.foo.target is None
+        assert lazy_mod.bar.target is lazy_mod.goo
+    finally:
+        sys.modules.pop('decopatch_hooked_pkg.lazy_mod', None)
+
+
+@pytest.mark.skipif(not SUPPORTS_IMPORT_HOOK, reason="requires python 3.8+")
+def test_import_hook_other_modules(hooked_package):
+    """Checks that modules outside of the hooked packages are neither claimed nor indexed"""
+    assert utils_importhook._finder.find_spec('decopatch_other_pkg', None) is None
+
+    # a decorator called from a module that was not loaded by the hook: no index is created
+    assert utils_importhook.is_bare_decorator_line(__file__, 1) is None
+    pycache_dir = os.path.join(os.path.dirname(__file__), '__pycache__')
+    if os.path.isdir(pycache_dir):
+        assert not any(f.endswith(utils_importhook.INDEX_SUFFIX) for f in os.listdir(pycache_dir))
+
+
+@pytest.mark.skipif(not SUPPORTS_IMPORT_HOOK, reason="requires python 3.8+")
+def test_import_hook_no_package():
+    """Checks that the packages to hook have to be provided"""
+    with pytest.raises(ValueError):
+        install_import_hook()
+    assert not utils_importhook.is_import_hook_installed()
@@ -1,7 +1,12 @@
+import sys
+
 import pytest
 
+from decopatch import decorator, DECORATED
 from decopatch.utils_disambiguation import disambiguate_using_introspection, FirstArgDisambiguation, \
     SUPPORTS_INTROSPECTION
+from decopatch.utils_introspection import SUPPORTS_BYTECODE_INTROSPECTION, is_bare_decorator_application, \
+    get_introspection_cache_info, clear_introspection_cache
 
 
 @pytest.mark.skipif(not SUPPORTS_INTROSPECTION, reason="not available on python 3.8+")
@@ -35,3 +40,62 @@ def test_on_functions():
         pass
 
     assert my_decorator.res == FirstArgDisambiguation.is_normal_arg
+
+
+@pytest.mark.skipif(not SUPPORTS_BYTECODE_INTROSPECTION, reason="requires python 3.8+")
+@pytest.mark.parametrize('codegen_engine', ['compile', 'templates'], ids="codegen_engine={}".format)
+@pytest.mark.parametrize('use_signature_trick', [True, False], ids="use_signature_trick={}".format)
+def test_bytecode_introspection(use_signature_trick, codegen_engine):
+    """Checks that the bytecode-based introspection disambiguates all usages, without access to the source code"""
+
+    @decorator(enable_stack_introspection=True, use_signature_trick=use_signature_trick,
+               codegen_engine=codegen_engine)
+    def tag(target=None, f=DECORATED):
+        f.target = target
+        return f
+
+    def goo():
+        pass
+
+    evaldict = dict(tag=tag, goo=goo)
+    exec("""
+@tag
+def foo():
+    pass
+
+@tag(goo)
+def bar():
+    pass
+
+@tag
+@tag(goo)
+class Foo:
+    pass
+
+baz = tag(goo)(goo)
+""", evaldict)
+    assert evaldict['foo'].target is None
+    assert evaldict['bar'].target is goo
+    assert evaldict['Foo'].target is None
+    assert goo.target is goo
+
+
+@pytest.mark.skipif(not SUPPORTS_BYTECODE_INTROSPECTION, reason="requires python 3.8+")
+def test_bytecode_introspection_cache():
+    """Checks that the verdict of the bytecode-based introspection is cached per call site"""
+
+    def my_decorator(arg):
+        frame = sys._getframe(1)
+        return is_bare_decorator_application(frame.f_code, frame.f_lasti)
+
+    clear_introspection_cache()
+    for i in range(3):
+        @my_decorator
+        def foo():
+            pass
+
+        assert foo is True
+        assert my_decorator(foo) is False
+
+    assert get_introspection_cache_info()[:2] == (4, 2)
+    clear_introspection_cache()
@@ -0,0 +1,230 @@
+import pytest
+
+try:  # python 3.3+
+    from inspect import signature
+except ImportError:
+    from funcsigs import signature
+
+from decopatch import function_decorator, decorator, class_decorator, DECORATED, WRAPPED, F_ARGS, F_KWARGS
+from decopatch.utils_lazy import LazyDecorator
+
+
+def test_lazy_decorator():
+    """Checks that with `lazy=True` the decorator is only created when it is first used"""
+
+    created = []
+
+    @function_decorator(lazy=True)
+    def tag(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        """tags the result"""
+        created.append(1)
+        return tag, f(*f_args, **f_kwargs)
+
+    assert isinstance(tag.__wrapped__, LazyDecorator)
+    assert tag.__wrapped__._decorator is None
+    assert tag.__name__ == 'tag'
+    assert tag.__doc__ == 'tags the result'
+    assert tag.__module__ == __name__
+
+    # the signature is computed lazily
+    assert str(signature(tag)) == "(tag='hello')"
+    d = tag.__wrapped__.get_decorator()
+    assert tag.__wrapped__.get_decorator() is d
+
+    @tag
+    def foo():
+        return 1
+
+    @tag('hi')
+    def bar():
+        return 2
+
+    assert foo() == ('hello', 1)
+    assert bar() == ('hi', 2)
+
+
+def test_lazy_decorator_becomes_decorator():
+    """Checks that when a generated decorator without closure is created, the stub becomes this decorator"""
+
+    @decorator(lazy=True, use_signature_trick=False)
+    def tag(tag="hello", f=DECORATED):
+        f.tag = tag
+        return f
+
+    stub_code = tag.__code__
+
+    @tag
+    def foo():
+        pass
+
+    d = tag.__wrapped__.get_decorator()
+    assert tag.__code__ is not stub_code
+    assert tag.__code__ is d.__code__
+    assert tag.__defaults__ == d.__defaults__
+    assert foo.tag == 'hello'
+
+    @tag('hi')
+    def bar():
+        pass
+
+    @tag
+    def baz():
+        pass
+
+    assert bar.tag == 'hi'
+    assert baz.tag == 'hello'
+    assert str(signature(tag)) == "(tag='hello')"
+
+
+def test_lazy_decorator_help():
+    """Checks that `help()` renders lazy decorators as the actual decorator"""
+    import pydoc
+
+    @function_decorator(lazy=True)
+    def tag(tag="hello", f=DECORATED):
+        """tags the function"""
+        f.tag = tag
+        return f
+
+    text = pydoc.render_doc(tag, renderer=pydoc.plaintext)
+    assert "tag(tag='hello')" in text
+    assert "tags the function" in text
+
+
+def test_lazy_decorator_method():
+    """Checks that lazy decorators are bound as methods when used as class attributes, as the actual decorators are"""
+    from types import MethodType
+
+    def tag(tag="hello", f=DECORATED):
+        f.tag = tag
+        return f
+
+    lazy_tag = function_decorator(lazy=True)(tag)
+    eager_tag = function_decorator(tag)
+
+    class Foo(object):
+        lazy = lazy_tag
+        eager = eager_tag
+
+    foo = Foo()
+    assert isinstance(foo.eager, MethodType)
+    assert isinstance(foo.lazy, MethodType)
+    assert foo.lazy.__func__ is lazy_tag
+
+
+def test_lazy_decorator_options():
+    """Checks that lazy decorators receive all options, and are not compatible with stack introspection"""
+
+    @class_decorator(lazy=True)
+    def add_tag(tag, c=DECORATED):
+        c.tag = tag
+        return c
+
+    def tag_fun():
+        pass
+
+    # not a function decorator: `add_tag(tag_fun)` means that `tag_fun` is the tag
+    @add_tag(tag_fun)
+    class Foo(object):
+        pass
+
+    assert Foo.tag is tag_fun
+
+    with pytest.raises(ValueError):
+        decorator(lazy=True, enable_stack_introspection=True)
+
+
+def test_lazy_wrapping():
+    """Checks that with `lazy_wrapping=True` the wrapper is only created on first call, and replaces the trampoline"""
+
+    @function_decorator(lazy_wrapping=True)
+    def tag(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f(*f_args, **f_kwargs)
+
+    def foo(a, b=2):
+        """foo doc"""
+        return a + b
+
+    wrapped = tag('hi')(foo)
+    trampoline_code = wrapped.__code__
+    assert wrapped.__code__.co_varnames == ('args', 'kwargs')
+    assert wrapped.__name__ == 'foo'
+    assert wrapped.__doc__ == 'foo doc'
+    assert wrapped.__wrapped__ is foo
+    assert str(signature(wrapped)) == "(a, b=2)"
+    # introspection did not create the wrapper
+    assert wrapped.__code__ is trampoline_code
+
+    assert wrapped(1) == ('hi', 3)
+    # the trampoline has become the wrapper
+    assert wrapped.__code__ is not trampoline_code
+    assert wrapped.__code__.co_varnames[:2] == ('a', 'b')
+    assert wrapped.__defaults__ == (2,)
+    assert wrapped(1, b=3) == ('hi', 4)
+    with pytest.raises(TypeError):
+        wrapped()
+
+
+def test_lazy_wrapping_generator_and_methods():
+    """Checks that lazy trampolines have the same kind as the wrapper, and work with methods"""
+    from inspect import isgeneratorfunction
+
+    @function_decorator(lazy_wrapping=True)
+    def double(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        for i in f(*f_args, **f_kwargs):
+            yield i * 2
+
+    class Foo(object):
+        @double
+        def gen(self, n):
+            for i in range(n):
+                yield i
+
+        @double
+        @classmethod
+        def cgen(cls, n):
+            for i in range(n):
+                yield i
+
+    assert isgeneratorfunction(Foo.gen)
+    assert list(Foo().gen(3)) == [0, 2, 4]
+    assert list(Foo().gen(2)) == [0, 2]
+    assert list(Foo.cgen(2)) == [0, 2]
+
+
+def test_warmup():
+    """Checks that `warmup` creates all pending lazy decorators and wrappers"""
+    from decopatch import warmup
+
+    @function_decorator(lazy=True)
+    def tag(tag="hello", f=DECORATED):
+        f.tag = tag
+        return f
+
+    @function_decorator(lazy_wrapping=True)
+    def trace(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return 'traced', f(*f_args, **f_kwargs)
+
+    @trace
+    def foo(a):
+        return a
+
+    trampoline_code = foo.__code__
+    assert tag.__wrapped__._decorator is None
+
+    report = warmup()
+    assert report.decorators >= 1
+    assert report.wrappers >= 1
+    assert report.codes >= 1
+    assert report.specs >= 1
+    assert not report.frozen
+
+    # everything was created
+    assert tag.__wrapped__._decorator is not None
+    assert foo.__code__ is not trampoline_code
+    assert foo.__code__.co_varnames[:1] == ('a',)
+    assert foo(1) == ('traced', 1)
+
+    # nothing is pending anymore
+    report = warmup()
+    assert (report.decorators, report.wrappers) == (0, 0)
@@ -0,0 +1,61 @@
+import gc
+
+from decopatch import function_decorator, decorator, DECORATED, WRAPPED, F_ARGS, F_KWARGS
+from decopatch import utils_modes
+from decopatch.utils_modes import get_spec_cache_info, clear_spec_cache
+
+
+def test_spec_cache():
+    """Checks that the analysis of an implementation function is done once, even if several decorators are created"""
+    clear_spec_cache()
+
+    def impl(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f(*f_args, **f_kwargs)
+
+    d1 = function_decorator(impl)
+    d2 = function_decorator(preserve_signature=False)(impl)
+    d3 = decorator(use_signature_trick=False)(impl)
+    assert get_spec_cache_info() == (2, 1, utils_modes.SPEC_CACHE_MAXSIZE, 1)
+
+    # the decorators are independent
+    def foo():
+        return 1
+
+    assert d1('a')(foo)() == ('a', 1)
+    assert d2(foo)() == ('hello', 1)
+    assert d3('b')(foo)() == ('b', 1)
+
+    # flat mode shortcut has a separate entry
+    def impl2(f):
+        return f
+
+    decorator(flat_mode_decorated_name='f')(impl2)
+    decorator(flat_mode_decorated_name='f')(impl2)
+    assert get_spec_cache_info()[:2] == (3, 2)
+
+    clear_spec_cache()
+    assert get_spec_cache_info() == (0, 0, utils_modes.SPEC_CACHE_MAXSIZE, 0)
+
+
+def test_spec_cache_weak_and_bounded(monkeypatch):
+    """Checks that the spec cache does not keep the implementations alive, and is bounded"""
+    clear_spec_cache()
+
+    def impl(f=DECORATED):
+        return f
+
+    function_decorator(impl)
+    assert get_spec_cache_info().currsize == 1
+    del impl
+    gc.collect()
+    assert get_spec_cache_info().currsize == 0
+
+    monkeypatch.setattr(utils_modes, 'SPEC_CACHE_MAXSIZE', 2)
+    impls = []
+    for i in range(3):
+        def impl(f=DECORATED):
+            return f
+        impls.append(impl)
+        function_decorator(impl)
+    assert get_spec_cache_info().currsize == 2
+    clear_spec_cache()
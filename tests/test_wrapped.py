@@ -0,0 +1,387 @@
+import sys
+from functools import partial
+from inspect import isgeneratorfunction, isfunction
+
+import pytest
+
+from decopatch import decorator, function_decorator, WRAPPED, F_ARGS, F_KWARGS, F_ITEM, F_BOUND, F_ARG, \
+    F_SELF, DECORATED, InvalidSignatureError
+
+try:  # python 3.3+
+    from inspect import signature
+except ImportError:
+    from funcsigs import signature
+
+
+def test_wrapped_single_frame():
+    """Checks that the generated wrapper directly calls the implementation, with a single frame in between"""
+
+    @function_decorator
+    def get_caller_frames(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        f_wrapper = sys._getframe(1)
+        return f_wrapper.f_code.co_name, f_wrapper.f_back.f_code.co_name, f(*f_args, **f_kwargs)
+
+    @get_caller_frames
+    def foo(a, b=2):
+        return a + b
+
+    assert foo(1) == ('foo', 'test_wrapped_single_frame', 3)
+
+
+def test_wrapped_signature_and_metadata():
+    """Checks that the generated wrapper preserves the signature and metadata of the decorated function"""
+
+    @function_decorator
+    def my_deco(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return f(*f_args, **f_kwargs)
+
+    @my_deco
+    def foo(a, b=2, *args, **kwargs):
+        """hello"""
+        return a, b, args, kwargs
+
+    foo.bar = 1
+
+    wrapped = my_deco(foo)
+    assert str(signature(wrapped)) == "(a, b=2, *args, **kwargs)"
+    assert wrapped.__name__ == 'foo'
+    assert wrapped.__doc__ == 'hello'
+    assert wrapped.__module__ == foo.__module__
+    assert wrapped.__wrapped__ is foo
+    assert wrapped.bar == 1
+
+    assert wrapped(1) == (1, 2, (), {})
+    assert wrapped(1, 3, 4, c=5) == (1, 3, (4,), {'c': 5})
+    with pytest.raises(TypeError):
+        wrapped()
+
+
+@pytest.mark.parametrize('lazy_wrapping', [False, True], ids="lazy_wrapping={}".format)
+@pytest.mark.parametrize('engine', ['compile', 'templates'], ids="engine={}".format)
+def test_wrapped_partial_and_class(engine, lazy_wrapping):
+    """Checks the metadata of the wrappers of `functools.partial` objects and of classes"""
+    if engine == 'templates' and sys.version_info < (3, 8):
+        pytest.skip("the 'templates' engine requires python 3.8+")
+
+    @decorator(codegen_engine=engine, lazy_wrapping=lazy_wrapping)
+    def my_deco(f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return f(*f_args, **f_kwargs)
+
+    def foo(a, b):
+        """hello"""
+        return a + b
+
+    # the metadata of a partial are the ones of the underlying function
+    wrapped = my_deco(partial(foo, 1))
+    assert wrapped.__name__ == 'foo'
+    assert wrapped.__qualname__ == foo.__qualname__
+    assert wrapped.__doc__ == 'hello'
+    assert wrapped.__module__ == foo.__module__
+    assert wrapped(2) == 3
+
+    class Foo(object):
+        """a class"""
+        def __init__(self, a):
+            self.a = a
+
+    # the wrapper of a class is a plain function with the signature of the constructor
+    wrapped = my_deco(Foo)
+    assert isfunction(wrapped)
+    assert wrapped.__name__ == 'Foo'
+    assert wrapped.__doc__ == 'a class'
+    assert str(signature(wrapped)) == "(a)"
+    assert isinstance(wrapped(1), Foo)
+
+
+@pytest.mark.parametrize('with_f_args', [False, True], ids="with_f_args={}".format)
+@pytest.mark.parametrize('with_f_kwargs', [False, True], ids="with_f_kwargs={}".format)
+def test_wrapped_injection(with_f_args, with_f_kwargs):
+    """Checks that `f_args` and `f_kwargs` are received as makefun would send them, and only if required"""
+
+    if with_f_args and with_f_kwargs:
+        @function_decorator
+        def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+            return tag, f_args, f_kwargs
+    elif with_f_args:
+        @function_decorator
+        def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS):
+            return tag, f_args
+    elif with_f_kwargs:
+        @function_decorator
+        def my_deco(tag="hello", f=WRAPPED, f_kwargs=F_KWARGS):
+            return tag, f_kwargs
+    else:
+        @function_decorator
+        def my_deco(tag="hello", f=WRAPPED):
+            return tag,
+
+    def foo(a, b=2):
+        pass
+
+    def varfoo(a, b=2, *args, **kwargs):
+        pass
+
+    expected_foo = ('hi',) + (((),) if with_f_args else ()) + (({'a': 1, 'b': 2},) if with_f_kwargs else ())
+    assert my_deco('hi')(foo)(1) == expected_foo
+
+    expected_varfoo = ('hello',) + (((1, 3, 4),) if with_f_args else ()) + (({'c': 5},) if with_f_kwargs else ())
+    assert my_deco(varfoo)(1, 3, 4, c=5) == expected_varfoo
+
+
+def test_wrapped_kwonly():
+    """Checks that keyword-only arguments and annotations are correctly handled, in the decorator and the wrapper"""
+    if sys.version_info < (3, 0):
+        pytest.skip("test skipped in python 2.x because syntax is not compliant")
+
+    from ._test_wrapped_py3 import create_test_wrapped_kwonly
+    foo = create_test_wrapped_kwonly()
+
+    assert str(signature(foo)) == "(a, *args, b: int = 2, **kwargs) -> int"
+    assert foo(1) == ("hi", (1,), {'b': 2}, 3)
+    assert foo(1, 0, b=3, c=4) == ("hi", (1, 0), {'b': 3, 'c': 4}, 4)
+
+
+def test_wrapped_no_signature_preservation():
+    """Checks that with `preserve_signature=False` the wrappers are generic, but still expose the right signature"""
+
+    @function_decorator(preserve_signature=False)
+    def my_deco(tag="hello", f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f_args, f_kwargs, f(*f_args, **f_kwargs)
+
+    def foo(a, b=2):
+        """hello"""
+        return a + b
+
+    wrapped = my_deco('hi')(foo)
+    assert wrapped.__code__.co_varnames == ('args', 'kwargs')
+    assert str(signature(wrapped)) == "(a, b=2)"
+    assert wrapped.__name__ == 'foo'
+    assert wrapped.__doc__ == 'hello'
+    assert wrapped.__wrapped__ is foo
+
+    # f_args and f_kwargs are exactly what was received
+    assert wrapped(1) == ('hi', (1,), {}, 3)
+    assert wrapped(1, b=3) == ('hi', (1,), {'b': 3}, 4)
+
+    # arguments are validated by the decorated function
+    with pytest.raises(TypeError):
+        wrapped()
+
+    # all wrappers share the same code
+    def bar(c, *args, **kwargs):
+        pass
+
+    assert my_deco(bar).__code__.co_code == wrapped.__code__.co_code
+
+
+@pytest.mark.parametrize('preserve_signature', [True, False], ids="preserve_signature={}".format)
+def test_wrapped_f_bound(preserve_signature):
+    """Checks that F_BOUND provides the arguments by name with defaults applied, as `Signature.bind` would"""
+
+    @function_decorator(preserve_signature=preserve_signature)
+    def my_deco(f=WRAPPED, f_bound=F_BOUND):
+        return dict(f_bound), f_bound['a'] if f_bound else None, 'b' in f_bound, f_bound.get('z', 0)
+
+    @my_deco
+    def foo(a, b=2, *args, **kwargs):
+        pass
+
+    assert foo(1) == ({'a': 1, 'b': 2, 'args': (), 'kwargs': {}}, 1, True, 0)
+    assert foo(1, 3, 4, c=5) == ({'a': 1, 'b': 3, 'args': (4,), 'kwargs': {'c': 5}}, 1, True, 0)
+    assert my_deco(lambda: None)() == ({}, None, False, 0)
+
+    # F_BOUND can only be used in WRAPPED mode
+    with pytest.raises(InvalidSignatureError):
+        @function_decorator
+        def my_deco(f=DECORATED, f_bound=F_BOUND):
+            pass
+
+
+@pytest.mark.parametrize('preserve_signature', [True, False], ids="preserve_signature={}".format)
+def test_wrapped_f_arg(preserve_signature):
+    """Checks that F_ARG injects the value of a specific argument, and fails fast if there is no such argument"""
+
+    @function_decorator(preserve_signature=preserve_signature)
+    def my_deco(f=WRAPPED, user=F_ARG('user_id'), b=F_ARG('b'), rest=F_ARG('args'), kw=F_ARG('kwargs')):
+        return user, b, rest, kw
+
+    @my_deco
+    def foo(user_id, b=2, *args, **kwargs):
+        pass
+
+    assert foo(1) == (1, 2, (), {})
+    assert foo(user_id=1, b=3) == (1, 3, (), {})
+    assert foo(1, 3, 4, c=5) == (1, 3, (4,), {'c': 5})
+
+    def bar(a, b=2):
+        pass
+
+    with pytest.raises(TypeError) as exc_info:
+        my_deco(bar)
+    assert "no argument named 'user_id'" in str(exc_info.value)
+
+    with pytest.raises(InvalidSignatureError):
+        @function_decorator
+        def my_deco(f=DECORATED, user=F_ARG('user_id')):
+            pass
+
+
+@pytest.mark.parametrize('preserve_signature', [True, False], ids="preserve_signature={}".format)
+def test_wrapped_methods(preserve_signature):
+    """Checks that F_SELF injects self or cls, and that decorators can be applied on top of classmethod/staticmethod"""
+
+    @function_decorator(preserve_signature=preserve_signature)
+    def tag(tag='hello', f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return tag, f(*f_args, **f_kwargs)
+
+    @function_decorator(preserve_signature=preserve_signature)
+    def get_self(f=WRAPPED, me=F_SELF, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        return me, f(*f_args, **f_kwargs)
+
+    class Foo(object):
+        @get_self
+        def meth(self, a):
+            return a
+
+        @get_self
+        @classmethod
+        def cmeth(cls, a):
+            return cls, a
+
+        @classmethod
+        @get_self
+        def cmeth2(cls, a):
+            return cls, a
+
+        @tag
+        @staticmethod
+        def smeth(a):
+            return a
+
+    foo = Foo()
+    assert foo.meth(1) == (foo, 1)
+    assert Foo.meth(foo, a=1) == (foo, 1)
+    assert Foo.cmeth(1) == (Foo, (Foo, 1))
+    assert foo.cmeth2(1) == (Foo, (Foo, 1))
+    assert Foo.smeth(1) == ('hello', 1)
+    assert foo.smeth(1) == ('hello', 1)
+    assert str(signature(Foo.meth)) == "(self, a)"
+
+    with pytest.raises(TypeError):
+        get_self(staticmethod(lambda a: a))
+
+    with pytest.raises(TypeError):
+        get_self(lambda *args: args)
+
+
+@pytest.mark.parametrize('async_impl', [False, True], ids="async_impl={}".format)
+def test_wrapped_coroutine(async_impl):
+    """Checks that native coroutine functions are wrapped with native coroutine functions"""
+    if sys.version_info < (3, 5):
+        pytest.skip("test skipped in python < 3.5 because syntax is not compliant")
+
+    from asyncio import new_event_loop
+    from inspect import iscoroutinefunction
+    from ._test_wrapped_py35 import create_test_wrapped_coroutine
+    foo = create_test_wrapped_coroutine(async_impl)
+
+    assert iscoroutinefunction(foo)
+    assert str(signature(foo)) == "(a, b=2)"
+
+    loop = new_event_loop()
+    try:
+        assert loop.run_until_complete(foo(1)) == (4 if async_impl else 3)
+    finally:
+        loop.close()
+
+
+def test_wrapped_generator():
+    """Checks that generator functions are wrapped with generator functions, lazily streaming the items"""
+
+    @function_decorator
+    def count_calls(counter, f=WRAPPED, f_args=F_ARGS, f_kwargs=F_KWARGS):
+        counter.append(1)
+        return f(*f_args, **f_kwargs)
+
+    counter = []
+
+    @count_calls(counter)
+    def gen(n):
+        for i in range(n):
+            yield i
+        return 'done'
+
+    assert isgeneratorfunction(gen)
+    g = gen(3)
+    assert counter == []
+    assert next(g) == 0
+    assert counter == [1]
+    assert list(g) == [1, 2]
+
+    if sys.version_info >= (3, 3):
+        # the return value is propagated thanks to 'yield from'
+        g = gen(1)
+        next(g)
+        with pytest.raises(StopIteration) as exc_info:
+            next(g)
+        assert exc_info.value.value == 'done'
+
+
+def test_wrapped_generator_item_hook():
+    """Checks that the implementation can declare a per-item hook with F_ITEM"""
+
+    @function_decorator
+    def multiply_items(factor=2, f=WRAPPED, f_kwargs=F_KWARGS, item=F_ITEM):
+        return item * factor + f_kwargs['offset']
+
+    @multiply_items
+    def gen(n, offset=0):
+        for i in range(n):
+            yield i
+
+    assert isgeneratorfunction(gen)
+    assert str(signature(gen)) == "(n, offset=0)"
+    assert list(gen(3, offset=1)) == [1, 3, 5]
+
+    # lazy
+    g = gen(10 ** 12)
+    assert next(g) == 0
+
+    # F_ITEM can only be used on generators
+    def foo():
+        pass
+
+    with pytest.raises(TypeError):
+        multiply_items(foo)
+
+    # and only in WRAPPED mode
+    with pytest.raises(InvalidSignatureError):
+        @function_decorator
+        def multiply_items(factor=2, f=DECORATED, item=F_ITEM):
+            pass
+
+
+@pytest.mark.parametrize('engine', ['compile', 'templates'], ids="engine={}".format)
+def test_wrapped_async_generator(engine):
+    """Checks that asynchronous generator functions are wrapped with asynchronous generator functions"""
+    if sys.version_info < (3, 6):
+        pytest.skip("test skipped in python < 3.6 because syntax is not compliant")
+    if engine == 'templates' and sys.version_info < (3, 8):
+        pytest.skip("the 'templates' engine requires python 3.8+")
+
+    from asyncio import new_event_loop
+    from inspect import isasyncgenfunction
+    from decopatch import set_default_codegen_engine
+    from ._test_wrapped_py36 import create_test_wrapped_async_generator, consume
+
+    loop = new_event_loop()
+    set_default_codegen_engine(engine)
+    try:
+        for per_item, async_impl in [(False, False), (True, False), (True, True)]:
+            for lazy_wrapping in (False, True):
+                agen = create_test_wrapped_async_generator(per_item, async_impl, lazy_wrapping)
+                assert isasyncgenfunction(agen)
+                assert loop.run_until_complete(consume(agen(3))) == ([0, 2, 4] if per_item else [0, 1, 2])
+    finally:
+        set_default_codegen_engine('compile')
+        loop.close()